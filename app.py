@@ -2,6 +2,9 @@ import streamlit as st
 import os
 import time
 from chatbot import JejuTravelChatbot
+from config import MODEL_ROUTING_ENABLED, MODEL_TIERS, PROMPT_VARIANTS
+from model_manager import get_model_manager
+from model_router import TIER_LABELS, get_model_router
 from conversation_manager import ConversationManager, create_conversation_sidebar, auto_save_session
 
 # 페이지 설정
@@ -36,12 +39,38 @@ if 'auto_loaded' not in st.session_state:
 
 # 사이드바: 모델 설정
 st.sidebar.subheader("🤖 모델 설정")
+model_options = ["gemma3:4b", "gemma:2b", "gemma:7b", "llama2", "llama2:7b", "mistral", "codellama"]
 model_name = st.sidebar.selectbox(
     "Ollama 모델 선택",
-    ["gemma3:4b", "gemma:2b", "gemma:7b", "llama2", "llama2:7b", "mistral", "codellama"],
+    model_options,
     index=0
 )
 
+# 선택한 모델을 백그라운드에서 미리 올리고 keep-alive 갱신 (앱 시작/모델 변경 시 한 번)
+model_manager = get_model_manager()
+if st.session_state.get('active_model') != model_name:
+    st.session_state.active_model = model_name
+    model_manager.activate(model_name)
+    # 질문 유형별로 따로 지정한 모델(정보 조회용 작은 모델 등)도 함께 올려 둠
+    if MODEL_ROUTING_ENABLED:
+        for tier_model in {m for m in MODEL_TIERS.values() if m and m != model_name}:
+            model_manager.preload(tier_model)
+
+# 답변 모드: 자동이면 질문 유형(정보 조회/추천/여행 일정)에 따라 모델과 프롬프트 선택
+tier_modes = {"자동": None, **{label: tier for tier, label in TIER_LABELS.items()}}
+tier_mode = st.sidebar.selectbox(
+    "답변 모드",
+    list(tier_modes),
+    index=0,
+    help="정보 조회는 작은 모델로 짧게, 여행 일정은 선택한 모델로 자세히 답합니다."
+)
+
+# 메모리에 올라와 있는 모델 표시 (Ollama /api/ps, 재실행마다 조회하지 않고 잠시 재사용)
+resident_models = {item['name'] for item in model_manager.resident()}
+st.sidebar.caption(" · ".join(
+    f"{'🟢' if model in resident_models else '⚪'} {model}" for model in model_options
+))
+
 # 사이드바: 데이터베이스 설정
 st.sidebar.subheader("📊 데이터베이스 설정")
 
@@ -100,8 +129,12 @@ st.markdown("제주도 여행 계획을 도와드립니다! 원하는 정보를
 tab1, tab2, tab3 = st.tabs(["💬 채팅", "✏️ 프롬프트 편집", "⚙️ 설정"])
 
 with tab1:
-    # 챗봇 초기화 (처음 실행 시 또는 모델 변경 시)
-    if st.session_state.chatbot is None or st.session_state.chatbot.model_name != model_name:
+    # 모델만 바뀌면 검색 색인/대화 메모리는 그대로 두고 모델 이름만 교체
+    if st.session_state.chatbot is not None and st.session_state.chatbot.model_name != model_name:
+        st.session_state.chatbot.set_model(model_name)
+
+    # 챗봇 초기화 (처음 실행 시)
+    if st.session_state.chatbot is None:
         with st.spinner("챗봇 초기화 중..."):
             try:
                 st.session_state.chatbot = JejuTravelChatbot(model_name)
@@ -109,27 +142,62 @@ with tab1:
             except Exception as e:
                 st.error(f"❌ 챗봇 초기화 실패: {e}")
                 st.stop()
+    
+    # 수동으로 고른 답변 모드 (세션별)
+    st.session_state.chatbot.tier_override = tier_modes[tier_mode]
 
     # 대화 히스토리 표시
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
+            if message.get("cached"):
+                st.caption("⚡ 캐시된 답변")
+            if message.get("route"):
+                st.caption(message["route"])
+            if message.get("failed"):
+                st.caption("⚠️ 답변을 끝내지 못한 턴 (대화 기록/자동 저장에서 제외)")
 
     # 사용자 입력 처리
     if prompt := st.chat_input("제주도 여행에 대해 궁금한 것을 물어보세요!"):
-        # 사용자 메시지 추가
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        # 질문이 있는 동안만 활성 모델의 keep-alive 갱신
+        model_manager.touch()
+        # 사용자 메시지 표시 (세션 기록에는 답변 스트림이 끝난 뒤 함께 추가)
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # 챗봇 응답 생성
+        # 챗봇 응답 생성 (토큰이 도착하는 대로 표시)
         with st.chat_message("assistant"):
-            with st.spinner("답변 생성 중..."):
-                response = st.session_state.chatbot.generate_response(prompt)
-                st.markdown(response)
+            placeholder = st.empty()
+            placeholder.markdown("답변 생성 중...")
+            response = ""
+            # 다른 세션의 답변 생성이 끝나기를 기다리는 동안 대기 순번 표시
+            on_queue = lambda position: placeholder.markdown(f"⏳ 답변 대기 중... {position}번째 순서입니다")
+            for chunk in st.session_state.chatbot.stream_response(prompt, on_queue=on_queue):
+                response += chunk
+                placeholder.markdown(response + "▌")
+            placeholder.markdown(response)
+            cached = st.session_state.chatbot.last_response_cached
+            generation = st.session_state.chatbot.last_generation
+            tier = st.session_state.chatbot.last_tier
+            failure = st.session_state.chatbot.last_failure
+            route_caption = None
+            if tier:
+                route_caption = f"🧭 {TIER_LABELS[tier['tier']]}{' (수동)' if tier['override'] else ''} · "
+                route_caption += "📇 DB 정보로 바로 답변" if tier.get('direct') else tier['model']
+                st.caption(route_caption)
+            if cached:
+                st.caption("⚡ 캐시된 답변")
+            elif generation:
+                queued = f" (대기 {generation['queue_ms']:.0f}ms 포함)" if generation['queue_ms'] >= 1 else ""
+                fallback = f" · 🔁 {generation['model']}로 대신 답변" if generation['fallback'] else ""
+                st.caption(f"⏱️ 첫 토큰 {generation['ttft_ms']:.0f}ms{queued} · {generation['tokens_per_sec']} 토큰/초{fallback}")
+            if failure:
+                st.caption("⚠️ 답변을 끝내지 못한 턴 (대화 기록/자동 저장에서 제외)")
                 
-        # 챗봇 응답 저장
-        st.session_state.messages.append({"role": "assistant", "content": response})
+        # 스트림이 끝난 뒤에만 질문/응답 저장 (중간에 끊기면 기록하지 않음)
+        st.session_state.messages.append({"role": "user", "content": prompt})
+        st.session_state.messages.append({"role": "assistant", "content": response, "cached": cached,
+                                          "route": route_caption, "failed": failure is not None})
         
         # 자동 저장
         auto_save_session(st.session_state.conversation_manager)
@@ -138,9 +206,18 @@ with tab2:
     st.subheader("✏️ 프롬프트 편집")
     st.markdown("아래에서 프롬프트를 편집하고 저장하면 챗봇에 자동으로 반영됩니다.")
     
+    # 질문 유형별 프롬프트 파일 선택
+    prompt_tier = st.selectbox(
+        "편집할 프롬프트",
+        list(PROMPT_VARIANTS),
+        index=list(PROMPT_VARIANTS).index("itinerary"),
+        format_func=lambda tier: f"{TIER_LABELS[tier]} ({PROMPT_VARIANTS[tier]})"
+    )
+    prompt_file = PROMPT_VARIANTS[prompt_tier]
+    
     # 현재 프롬프트 로드
     try:
-        with open("prompt.txt", "r", encoding="utf-8") as f:
+        with open(prompt_file, "r", encoding="utf-8") as f:
             current_prompt = f.read()
     except FileNotFoundError:
         current_prompt = "당신은 제주도 여행 전문가입니다. 사용자에게 유용한 여행 정보를 제공해주세요."
@@ -158,14 +235,15 @@ with tab2:
     with col1:
         if st.button("💾 프롬프트 저장"):
             try:
-                with open("prompt.txt", "w", encoding="utf-8") as f:
+                with open(prompt_file, "w", encoding="utf-8") as f:
                     f.write(edited_prompt)
                 st.success("✅ 프롬프트가 저장되었습니다!")
             except Exception as e:
                 st.error(f"❌ 프롬프트 저장 실패: {e}")
     
     with col2:
-        if st.button("🔄 프롬프트 리셋"):
+        # 기본값 리셋은 여행 일정(기본) 프롬프트만 지원
+        if st.button("🔄 프롬프트 리셋", disabled=prompt_file != "prompt.txt"):
             default_prompt = """당신은 제주도 여행 전문가입니다. 제주도의 음식, 숙소, 관광지, 행사에 대한 정보를 바탕으로 사용자에게 맞춤형 여행 추천을 제공합니다.
 
 **역할:**
@@ -241,6 +319,90 @@ with tab3:
     else:
         st.warning("⚠️ ChromaDB가 초기화되지 않았습니다.")
     
+    # 질문 임베딩 지연 시간 (프로세스 전체 공유 클라이언트)
+    if st.session_state.chatbot and st.session_state.chatbot.query_embedder:
+        embed_stats = st.session_state.chatbot.query_embedder.stats()
+        st.markdown("**🔎 질문 임베딩 지연 시간**")
+        st.markdown(
+            f"- 호출 {embed_stats['count']}회 (동시 요청 합침 {embed_stats['coalesced']}회)\n"
+            f"- 평균 {embed_stats['mean_ms']}ms / p50 {embed_stats['p50_ms']}ms / "
+            f"p95 {embed_stats['p95_ms']}ms / p99 {embed_stats['p99_ms']}ms"
+        )
+    
+    # 답변 캐시 상태
+    if st.session_state.chatbot and st.session_state.chatbot.response_cache:
+        cache_stats = st.session_state.chatbot.response_cache.stats()
+        st.markdown("**⚡ 답변 캐시**")
+        st.markdown(
+            f"- 저장된 답변 {cache_stats['entries']}개 / 적중 {cache_stats['hits']}회, "
+            f"미적중 {cache_stats['misses']}회 (적중률 {cache_stats['hit_rate']:.0%})"
+        )
+        if st.button("🧹 답변 캐시 비우기"):
+            st.session_state.chatbot.response_cache.clear()
+            st.success("✅ 답변 캐시를 비웠습니다.")
+    
+    # 답변 생성 속도 (프로세스 전체 공유)
+    if st.session_state.chatbot:
+        generation_stats = st.session_state.chatbot.generation_stats.summary()
+        st.markdown("**⏱️ 답변 생성 속도**")
+        st.markdown(
+            f"- 생성 {generation_stats['turns']}회 / 첫 토큰 p50 {generation_stats['ttft_p50_ms']}ms, "
+            f"p95 {generation_stats['ttft_p95_ms']}ms\n"
+            f"- 평균 {generation_stats['tokens_per_sec_mean']} 토큰/초 (p50 {generation_stats['tokens_per_sec_p50']})\n"
+            f"- 턴당 새로 평가한 프롬프트 {generation_stats['prompt_eval_mean']}토큰 "
+            f"(접두어 재사용 {generation_stats['prompt_reuse']:.0%})\n"
+            f"- 시간 초과 {generation_stats['timeouts']}회, 오류 {generation_stats['errors']}회, 중단 {generation_stats['cancelled']}회 / "
+            f"헤지 {generation_stats['hedges']}회, 재시도 {generation_stats['retries']}회 (대신 답변 {generation_stats['fallback_wins']}회)"
+        )
+        
+        # 대화 메모리 (최근 턴 링 버퍼 + 누적 요약)
+        memory = st.session_state.chatbot.memory
+        memory_stats = memory.stats()
+        st.markdown("**🧠 대화 메모리**")
+        st.markdown(
+            f"- 원문 보관 {memory_stats['turns']}/{memory.max_turns}턴 (전체 {memory_stats['total_turns']}턴, "
+            f"요약 반영 {memory_stats['summarized_turns']}턴, 버림 {memory_stats['dropped_turns']}턴)\n"
+            f"- 요약 {memory_stats['summary_tokens']}토큰 / 갱신 {memory_stats['refresh']['count']}회, "
+            f"p50 {memory_stats['refresh']['p50_ms']}ms"
+        )
+        if memory.summary:
+            with st.expander("이전 대화 요약"):
+                st.markdown(memory.summary)
+    
+    # 추론 스케줄러 (모든 세션 공유)
+    if st.session_state.chatbot:
+        scheduler_stats = st.session_state.chatbot.scheduler.stats()
+        st.markdown("**🚦 추론 스케줄러**")
+        st.markdown(
+            f"- 실행 중 {scheduler_stats['active']}/{scheduler_stats['max_concurrency']}, "
+            f"대기 {scheduler_stats['waiting']}건 ({scheduler_stats['waiting_sessions']}개 세션, 최대 {scheduler_stats['max_waiting']}건)\n"
+            f"- 완료 {scheduler_stats['completed']}건 / 대기 시간 p50 {scheduler_stats['wait_p50_ms']}ms, "
+            f"p95 {scheduler_stats['wait_p95_ms']}ms, p99 {scheduler_stats['wait_p99_ms']}ms"
+        )
+    
+    # 질문 유형 라우팅 (모든 세션 공유)
+    router_stats = get_model_router().stats()
+    st.markdown("**🧭 질문 유형 라우팅**")
+    st.markdown("\n".join(
+        f"- {TIER_LABELS[tier]} ({MODEL_TIERS.get(tier) or model_name}): {item['turns']}턴, "
+        f"DB 바로 답변 {item['direct']}회 / 답변 시간 p50 {item['p50_ms']}ms, p95 {item['p95_ms']}ms"
+        for tier, item in router_stats['tiers'].items()
+    ) + f"\n- 수동 지정 {router_stats['overrides']}회")
+    
+    # 모델 상주 상태와 로드/언로드 시간 (프로세스 전체 공유)
+    manager_stats = model_manager.stats()
+    st.markdown("**🔥 모델 상주 상태**")
+    st.markdown(f"- 활성 모델: {manager_stats['active']} (keep-alive {model_manager.keep_alive}, 갱신 {manager_stats['pings']}회)")
+    for model, timing in manager_stats['models'].items():
+        st.markdown(
+            f"- {'🟢' if model in resident_models else '⚪'} {model}: 로드 {timing['loads']}회, "
+            f"최근 {timing['last_load_ms']}ms (p50 {timing['load_p50_ms']}ms), 언로드 {timing['unloads']}회"
+        )
+    for model in sorted(resident_models - {model_name}):
+        if st.button(f"⏏️ {model} 내리기", key=f"unload_{model}"):
+            model_manager.unload(model)
+            st.experimental_rerun()
+    
     # 데이터 파일 존재 확인
     st.markdown("### 📁 데이터 파일 상태")
     data_files = [
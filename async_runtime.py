@@ -0,0 +1,85 @@
+import asyncio
+import concurrent.futures
+import threading
+import weakref
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+import ollama
+
+from config import OLLAMA_HOST
+
+# 이벤트 루프별 비동기 Ollama 클라이언트 (httpx 비동기 연결은 만든 루프에서만 쓸 수 있음)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ollama.AsyncClient]" = weakref.WeakKeyDictionary()
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_lock = threading.Lock()
+
+
+def get_async_ollama_client() -> ollama.AsyncClient:
+    """현재 이벤트 루프에서 공유하는 비동기 Ollama 클라이언트 (처음 호출 시 생성, 연결 재사용)"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = ollama.AsyncClient(host=OLLAMA_HOST)
+        _async_clients[loop] = client
+    return client
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """동기 API용으로 계속 실행되는 백그라운드 이벤트 루프 (처음 호출 시 데몬 스레드로 시작)"""
+    global _background_loop
+    with _lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="chatbot-event-loop", daemon=True).start()
+            _background_loop = loop
+        return _background_loop
+
+
+def run_sync(coro):
+    """
+    코루틴을 동기 코드에서 실행하고 결과 반환
+
+    매번 새 루프를 만들지 않고 백그라운드 루프 하나에서 실행하므로
+    루프별 비동기 클라이언트의 연결이 호출 사이에 재사용됩니다.
+
+    Args:
+        coro: 실행할 코루틴
+
+    Returns:
+        코루틴 결과
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result()
+
+
+def iterate_sync(agen: AsyncIterator, on_wait: Optional[Callable[[], None]] = None,
+                 poll_seconds: float = 0.2) -> Iterator:
+    """
+    비동기 제너레이터를 동기 반복자로 사용 (백그라운드 루프에서 한 항목씩 가져옴)
+
+    반복을 중간에 멈추면(Streamlit 재실행 등) 비동기 제너레이터도 닫아 연결을 정리합니다.
+
+    Args:
+        agen: 비동기 제너레이터
+        on_wait: 다음 항목을 기다리는 동안 poll_seconds마다 호출자 스레드에서 실행할 함수
+            (Streamlit 화면은 스크립트 스레드에서만 갱신할 수 있음)
+        poll_seconds: on_wait 호출 간격
+
+    Yields:
+        비동기 제너레이터의 항목
+    """
+    loop = _get_background_loop()
+    try:
+        while True:
+            future = asyncio.run_coroutine_threadsafe(agen.__anext__(), loop)
+            try:
+                while on_wait is not None:
+                    try:
+                        future.result(timeout=poll_seconds)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        on_wait()
+                yield future.result()
+            except StopAsyncIteration:
+                return
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
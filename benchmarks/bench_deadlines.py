@@ -0,0 +1,122 @@
+"""
+답변 생성 마감 시간 / 헤지 / 오류 재시도 효과 측정 (가짜 Ollama 서버 사용)
+
+가짜 서버가 답변 모델(--model) 요청의 --stall-probability만큼을 첫 토큰 전에 --stall-seconds 동안 멈추고
+--error-probability만큼은 500 오류로 돌려주는 상황에서(시나리오마다 같은 난수 시드), --users명이 --turns개씩 질문할 때
+보호 없음 / 마감 시간만 / 마감 시간 + 헤지·재시도(--fallback-model)의 응답 시간 p50/p95/p99와
+답변 완료·시간 초과·오류 턴 수를 비교합니다. 시간 초과/오류 턴은 챗봇에서 검색 결과 안내 답변으로 대체됩니다.
+
+    python benchmarks/bench_deadlines.py --stall-probability 0.2 --stall-seconds 8 --output benchmarks/results/deadlines.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.mock_ollama import MockOllamaState, start  # noqa: E402
+
+QUESTION = "제주도 동쪽 관광지 추천해줘"
+
+
+def percentiles(values: list) -> dict:
+    """nearest-rank p50/p95/p99 (ms)"""
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+
+    def rank(pct):
+        return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))]
+    return {"p50_ms": round(rank(50), 1), "p95_ms": round(rank(95), 1), "p99_ms": round(rank(99), 1)}
+
+
+async def run(args, guards: dict) -> dict:
+    """사용자 세션을 동시에 실행하고 응답 시간과 턴 결과 요약"""
+    from generation import GuardedGeneration
+    from scheduler import InferenceScheduler
+
+    scheduler = InferenceScheduler(args.concurrency)
+    durations, outcomes, winners = [], Counter(), Counter()
+
+    async def user(index: int):
+        for _ in range(args.turns):
+            generation = GuardedGeneration(scheduler, f"user-{index}", [{'role': 'user', 'content': QUESTION}],
+                                           args.model, **guards)
+            started = time.perf_counter()
+            async for _ in generation.stream():
+                pass
+            durations.append((time.perf_counter() - started) * 1000)
+            outcomes[generation.outcome] += 1
+            if generation.outcome == "ok":
+                winners[generation.winner.reason] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(args.users)))
+    return {
+        "wall_seconds": round(time.perf_counter() - started, 2),
+        "total": percentiles(durations),
+        "outcomes": dict(outcomes),
+        "answered_by": dict(winners)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="답변 생성 마감 시간/헤지 효과 측정")
+    parser.add_argument("--model", default="gemma3:4b")
+    parser.add_argument("--fallback-model", default="gemma3:1b")
+    parser.add_argument("--users", type=int, default=8, help="동시 사용자 수")
+    parser.add_argument("--turns", type=int, default=10, help="사용자당 질문 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="스케줄러 동시 실행 수")
+    parser.add_argument("--stall-probability", type=float, default=0.2, help="답변 모델이 멈출 확률")
+    parser.add_argument("--stall-seconds", type=float, default=8.0, help="멈추는 시간")
+    parser.add_argument("--error-probability", type=float, default=0.05, help="500 오류 확률")
+    parser.add_argument("--first-token-seconds", type=float, default=6.0, help="첫 토큰 마감 시간")
+    parser.add_argument("--hedge-after-seconds", type=float, default=1.0, help="헤지까지 기다릴 시간")
+    parser.add_argument("--output", default=None, help="결과 JSON 파일 경로")
+    args = parser.parse_args()
+
+    state = MockOllamaState(load_seconds=0.0, stall_probability=args.stall_probability,
+                            stall_seconds=args.stall_seconds, error_probability=args.error_probability,
+                            fault_models=[args.model])
+    server = start(0, state)
+    # generation/async_runtime이 config를 읽기 전에 가짜 서버 주소 지정
+    os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🧪 가짜 Ollama 서버: {os.environ['OLLAMA_HOST']} "
+          f"(멈춤 {args.stall_probability:.0%}/{args.stall_seconds}초, 오류 {args.error_probability:.0%})")
+
+    unlimited = args.stall_seconds * 10
+    scenarios = {
+        "none": {"fallback_model": "", "first_token_seconds": unlimited, "stall_seconds": unlimited,
+                 "deadline_seconds": unlimited, "hedge_after_seconds": 0},
+        "deadline": {"fallback_model": "", "first_token_seconds": args.first_token_seconds,
+                     "hedge_after_seconds": 0},
+        "hedge": {"fallback_model": args.fallback_model, "first_token_seconds": args.first_token_seconds,
+                  "hedge_after_seconds": args.hedge_after_seconds}
+    }
+    results = {}
+    for name, guards in scenarios.items():
+        state.reset_faults(0)
+        stalls, errors = state.stalls, state.errors
+        result = asyncio.run(run(args, guards))
+        result["injected"] = {"stalls": state.stalls - stalls, "errors": state.errors - errors}
+        results[name] = result
+        outcomes = result["outcomes"]
+        print(f"⏱️ {name:<8} 응답 p50 {result['total']['p50_ms']}ms / p95 {result['total']['p95_ms']}ms / "
+              f"p99 {result['total']['p99_ms']}ms, 완료 {outcomes.get('ok', 0)} (대신 답변 {result['answered_by'].get('hedge', 0)}"
+              f"+{result['answered_by'].get('retry', 0)}), 시간 초과 {outcomes.get('timeout', 0)}, 오류 {outcomes.get('error', 0)} "
+              f"(주입: 멈춤 {result['injected']['stalls']}, 오류 {result['injected']['errors']})")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+단일 벤치마크 실행 (run_benchmarks.py가 환경 변수를 설정해 하위 프로세스로 실행)
+
+CHROMA_DB_PATH / DATA_DIR / EMBEDDING_BACKEND 등은 호출하는 쪽에서 지정하며,
+결과는 마지막 줄에 JSON 한 줄로 출력합니다.
+
+    python benchmarks/bench_ingest.py ingest       # 적재
+    python benchmarks/bench_ingest.py query 20     # 새 프로세스에서 챗봇 시작 시간 + 검색
+"""
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+BENCH_QUERIES = [
+    "제주 감성 카페 추천해줘",
+    "애월 맛집",
+    "성산 근처 숙소",
+    "고기국수 맛집 알려줘",
+    "흑돼지 구이 잘하는 곳",
+    "아이와 가기 좋은 관광지",
+    "오션뷰 카페 브런치",
+    "서귀포 가족 펜션",
+    "제주 축제 일정",
+    "비 오는 날 실내 관광지"
+]
+
+# 한 카테고리만 찾는 질문 (상위 결과 중 기대 카테고리 비율 측정)
+BENCH_CATEGORY_QUERIES = [
+    ("성산 근처 숙소", "숙소"),
+    ("서귀포 가족 펜션", "숙소"),
+    ("오션뷰 호텔 추천", "숙소"),
+    ("애월 맛집", "음식"),
+    ("고기국수 맛집 알려줘", "음식"),
+    ("흑돼지 구이 잘하는 곳", "음식"),
+    ("아이와 가기 좋은 관광지", "관광지"),
+    ("오름 추천해줘", "관광지"),
+    ("제주 축제 일정", "행사"),
+    ("이번 달 공연 정보", "행사")
+]
+
+# 지역이 들어간 질문 (상위 결과 중 주소에 기대 지역이 있는 비율 측정)
+BENCH_REGION_QUERIES = [
+    ("성산 근처 숙소", "성산읍"),
+    ("애월 맛집", "애월읍"),
+    ("협재 카페", "한림읍"),
+    ("우도 관광지", "우도면"),
+    ("서귀포 가족 펜션", "서귀포시"),
+    ("구좌 해변 산책", "구좌읍")
+]
+
+# 카테고리별 하위 질문으로 나누는 일정형 질문 (다중 검색 vs 하위 질문 순차 검색)
+BENCH_ITINERARY_QUERIES = [
+    "2박3일 가족여행, 맛집·숙소·관광지",
+    "애월 당일치기 코스",
+    "성산 1박2일 일정 카페랑 숙소"
+]
+
+
+def percentile(values, pct: float) -> float:
+    """nearest-rank 백분위수"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def directory_size(path: str) -> int:
+    """디렉토리 전체 크기 (bytes)"""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+
+def peak_rss_mb() -> float:
+    """현재 프로세스의 최대 RSS (MB, Linux 기준 KB 단위 값을 변환)"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 if sys.platform != "darwin" else usage / (1024 * 1024)
+
+
+def run_ingest() -> dict:
+    from config import CHROMA_DB_PATH
+    from chroma_setup import initialize_chroma_db, load_data_to_chroma
+
+    # 로그는 숨기고 통계만 수집
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        started = time.perf_counter()
+        client, collection = initialize_chroma_db(reset=True)
+        stats = load_data_to_chroma(collection, incremental=False)
+        ingest_seconds = time.perf_counter() - started
+    rows = collection.count()
+    return {
+        "rows": rows,
+        "seconds": round(ingest_seconds, 3),
+        "rows_per_sec": round(rows / ingest_seconds, 1) if ingest_seconds else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "index_bytes": directory_size(CHROMA_DB_PATH),
+        "stages": (stats or {}).get("stages", {})
+    }
+
+
+def run_query(query_repeats: int = 20) -> dict:
+    # 1. 시작 시간 (모듈 import + 검색 백엔드/색인 로딩)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        from chatbot import JejuTravelChatbot
+        chatbot = JejuTravelChatbot()
+    cold_start_ms = (time.perf_counter() - started) * 1000
+    chatbot.search_relevant_info(BENCH_QUERIES[0])  # 워밍업
+
+    # 2. 검색 지연 시간
+    latencies = []
+    for _ in range(query_repeats):
+        for query in BENCH_QUERIES:
+            started = time.perf_counter()
+            chatbot.search_relevant_info(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    # 3. 단일 카테고리 질문의 상위 결과 카테고리 정확도
+    matched = total = 0
+    for query, expected in BENCH_CATEGORY_QUERIES:
+        for info in chatbot.hydrate_info(chatbot.search_relevant_info(query)):
+            matched += info['category'] == expected
+            total += 1
+
+    # 4. 지역 질문의 상위 결과 지역 정확도
+    region_matched = region_total = 0
+    for query, expected in BENCH_REGION_QUERIES:
+        for info in chatbot.hydrate_info(chatbot.search_relevant_info(query)):
+            region_matched += expected in str(info['address'])
+            region_total += 1
+
+    # 5. 태그 비트맵 사전 필터 시간 (질문 단어 → 태그 → 후보 id 집합)
+    prefilter_us = []
+    if chatbot.tag_index is not None:
+        for _ in range(query_repeats):
+            for query in BENCH_QUERIES:
+                started = time.perf_counter()
+                chatbot.tag_index.filter(None, chatbot.tag_index.match(query), min_results=3)
+                prefilter_us.append((time.perf_counter() - started) * 1e6)
+
+    # 6. 일정형 질문: 하위 질문을 search_many로 한 번에 vs 하나씩 순차 검색
+    from query_planner import decompose_query
+    batched_ms, serial_ms = [], []
+    for _ in range(query_repeats):
+        for query in BENCH_ITINERARY_QUERIES:
+            plan = decompose_query(query)
+            started = time.perf_counter()
+            chatbot.search_many([step['query'] for step in plan], 2,
+                                [{'categories': step['categories']} for step in plan])
+            batched_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            for step in plan:
+                chatbot.search_relevant_info(step['query'], 2, categories=step['categories'])
+            serial_ms.append((time.perf_counter() - started) * 1000)
+
+    # 7. MMR 재순위 단계 시간과 상위 결과끼리의 평균 코사인 유사도 (낮을수록 다양)
+    rerank = chatbot.rerank_latency.summary()
+    redundancy = []
+    for query in BENCH_QUERIES:
+        ids = [info['id'] for info in chatbot.search_relevant_info(query)]
+        if len(ids) > 1:
+            vectors = chatbot.vector_backend.embeddings(ids)
+            similarity = vectors @ vectors.T
+            redundancy.append(float(similarity[np.triu_indices(len(ids), 1)].mean()))
+    return {
+        "backend": type(chatbot.vector_backend).__name__,
+        "cold_start_ms": round(cold_start_ms, 1),
+        "rss_mb": round(peak_rss_mb(), 1),
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "category_precision": round(matched / total, 3) if total else 0.0,
+        "region_precision": round(region_matched / region_total, 3) if region_total else 0.0,
+        "tag_prefilter_p50_us": round(percentile(prefilter_us, 50), 1),
+        "multi_query_p50_ms": round(percentile(batched_ms, 50), 3),
+        "serial_query_p50_ms": round(percentile(serial_ms, 50), 3),
+        "mmr_p50_ms": round(rerank["p50_ms"], 3),
+        "mmr_p95_ms": round(rerank["p95_ms"], 3),
+        "result_redundancy": round(sum(redundancy) / len(redundancy), 3) if redundancy else 0.0
+    }
+
+
+if __name__ == "__main__":
+    phase = sys.argv[1] if len(sys.argv) > 1 else "ingest"
+    if phase == "query":
+        repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+        print(json.dumps(run_query(repeats), ensure_ascii=False))
+    else:
+        print(json.dumps(run_ingest(), ensure_ascii=False))
@@ -0,0 +1,114 @@
+"""
+모델 미리 올리기/keep-alive/다음 모델 예열 효과 측정
+
+--host를 주지 않으면 benchmarks/mock_ollama.py 서버를 띄워(모델 로드 --load-seconds초) 측정하므로
+GPU나 모델 없이 실행할 수 있습니다. 모델 전환 직후 첫 질문의 첫 토큰 시간(TTFT)을
+미리 올리기 없이 / 선택 즉시 미리 올리기 / 다음 모델 예열까지 켠 경우로 비교합니다.
+
+    python benchmarks/bench_models.py --load-seconds 3 --think-seconds 1
+    python benchmarks/bench_models.py --host http://localhost:11434 --models gemma3:4b gemma:2b
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ollama  # noqa: E402
+
+from benchmarks.mock_ollama import MockOllamaState, start  # noqa: E402
+from model_manager import ModelManager  # noqa: E402
+
+QUESTION = "제주도 동쪽 관광지 한 곳만 추천해줘"
+
+
+def first_token_ms(client: ollama.Client, model: str, keep_alive: str) -> float:
+    """스트리밍 요청의 첫 토큰까지 시간 (ms)"""
+    started = time.perf_counter()
+    ttft = None
+    for part in client.chat(model=model, messages=[{'role': 'user', 'content': QUESTION}],
+                            stream=True, keep_alive=keep_alive):
+        if ttft is None and part.get('message', {}).get('content'):
+            ttft = time.perf_counter() - started
+    return round((ttft if ttft is not None else time.perf_counter() - started) * 1000, 1)
+
+
+def run_scenario(host: str, models: list, switches: int, think_seconds: float,
+                 preload: bool, prewarm: bool, keep_alive: str) -> dict:
+    """
+    모델을 번갈아 고르며 전환 직후 첫 질문의 TTFT 측정
+
+    Args:
+        host: Ollama 서버 주소
+        models: 번갈아 고를 모델 목록
+        switches: 전환 횟수
+        think_seconds: 모델을 고른 뒤 질문을 보내기까지의 시간 (사용자가 입력하는 시간)
+        preload: 모델을 고르는 즉시 미리 올릴지
+        prewarm: 다음에 고를 모델도 예열할지
+        keep_alive: 요청마다 전달할 keep_alive
+
+    Returns:
+        TTFT 목록과 요약
+    """
+    client = ollama.Client(host=host)
+    manager = ModelManager(host=host, keep_alive=keep_alive, ping_seconds=0, prewarm=prewarm)
+    for model in models:
+        manager.unload(model)
+    ttfts = []
+    for i in range(switches):
+        model = models[i % len(models)]
+        if preload:
+            manager.activate(model)
+        time.sleep(think_seconds)
+        ttfts.append(first_token_ms(client, model, keep_alive))
+    ordered = sorted(ttfts)
+    return {
+        "preload": preload,
+        "prewarm": prewarm,
+        "ttft_ms": ttfts,
+        "ttft_p50_ms": ordered[(len(ordered) - 1) // 2],
+        "ttft_max_ms": ordered[-1],
+        "manager": manager.stats(),
+        "resident": [item["name"] for item in manager.resident(refresh=True)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="모델 미리 올리기/예열 효과 측정")
+    parser.add_argument("--host", default=None, help="Ollama 서버 주소 (없으면 가짜 서버 사용)")
+    parser.add_argument("--models", nargs="+", default=["gemma3:4b", "gemma:2b", "llama2"])
+    parser.add_argument("--switches", type=int, default=9, help="모델 전환 횟수")
+    parser.add_argument("--think-seconds", type=float, default=1.0, help="모델 선택 후 질문까지 시간")
+    parser.add_argument("--load-seconds", type=float, default=2.0, help="가짜 서버의 모델 로드 시간")
+    parser.add_argument("--max-loaded", type=int, default=2, help="가짜 서버의 동시 상주 모델 수")
+    parser.add_argument("--keep-alive", default="30m")
+    parser.add_argument("--output", default=None, help="결과 JSON 파일 경로")
+    args = parser.parse_args()
+
+    host = args.host
+    if host is None:
+        server = start(0, MockOllamaState(load_seconds=args.load_seconds, max_loaded=args.max_loaded))
+        host = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"🧪 가짜 Ollama 서버: {host} (로드 {args.load_seconds}초, 동시 상주 {args.max_loaded}개)")
+
+    results = []
+    for preload, prewarm in ((False, False), (True, False), (True, True)):
+        result = run_scenario(host, args.models, args.switches, args.think_seconds, preload, prewarm, args.keep_alive)
+        results.append(result)
+        label = "예열" if prewarm else ("미리 올리기" if preload else "없음")
+        print(f"⏱️ {label:<8} 전환 후 첫 토큰 p50 {result['ttft_p50_ms']}ms, 최대 {result['ttft_max_ms']}ms "
+              f"(상주: {', '.join(result['resident']) or '없음'})")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"host": args.host or "mock", "models": args.models, "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
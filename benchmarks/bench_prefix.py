@@ -0,0 +1,64 @@
+"""
+프롬프트 접두어 재사용 측정 (실행 중인 Ollama 서버 필요)
+
+같은 세션에서 여러 턴을 이어서 묻고, 턴마다 추정 프롬프트 토큰 수와 Ollama가 실제로 새로 평가한
+토큰 수(prompt_eval_count)를 비교합니다. 시스템 프롬프트와 이전 대화가 KV 캐시에서 재사용되면
+두 번째 턴부터 prompt_eval_count가 전체 프롬프트보다 훨씬 작아집니다.
+
+    python benchmarks/bench_prefix.py --model gemma3:4b --output benchmarks/results/prefix.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+CONVERSATION = [
+    "제주도 2박3일 가족여행 갈 건데 어디부터 가면 좋을까?",
+    "첫날 저녁은 흑돼지 맛집으로 추천해줘",
+    "애월 쪽 숙소도 알려줘",
+    "둘째 날 아이랑 갈 만한 관광지는?",
+    "비 오면 갈 만한 실내 관광지도 있어?"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="프롬프트 접두어(KV 캐시) 재사용 측정")
+    parser.add_argument("--model", default="gemma3:4b", help="Ollama 모델 이름")
+    parser.add_argument("--output", default=None, help="결과 JSON 파일 경로")
+    args = parser.parse_args()
+
+    # 답변 캐시가 턴을 건너뛰지 않도록 끔
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+    with contextlib.redirect_stdout(io.StringIO()):
+        from chatbot import JejuTravelChatbot
+        chatbot = JejuTravelChatbot(args.model)
+
+    turns = []
+    for i, question in enumerate(CONVERSATION, 1):
+        with contextlib.redirect_stdout(io.StringIO()):
+            chatbot.generate_response(question)
+        generation = chatbot.last_generation or {}
+        turns.append({"turn": i, **generation})
+        print(
+            f"🔁 {i}턴: 프롬프트 약 {generation.get('prompt_tokens')}토큰, "
+            f"새로 평가 {generation.get('prompt_eval_count')}토큰 ({generation.get('prompt_eval_ms')}ms), "
+            f"첫 토큰 {generation.get('ttft_ms')}ms"
+        )
+
+    summary = chatbot.generation_stats.summary()
+    print(f"📊 평균 새로 평가한 토큰 {summary['prompt_eval_mean']}, 재사용 비율 {summary['prompt_reuse']:.0%}")
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"model": args.model, "turns": turns, "summary": summary}, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
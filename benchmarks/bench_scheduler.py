@@ -0,0 +1,131 @@
+"""
+추론 스케줄러 부하 테스트 (가짜 Ollama 서버 사용)
+
+--users명의 사용자가 각각 --turns개의 질문을 차례로 보내고, 한 세션은 --burst개의 질문을 한꺼번에 보냅니다.
+스케줄러 없이 모두 바로 호출하는 경우와 InferenceScheduler(동시 실행 --concurrency개, 세션별 공정 대기열)를
+거치는 경우의 첫 토큰 시간과 전체 응답 시간 p50/p95/p99를 비교합니다. 가짜 서버는 동시 생성이
+--parallel개를 넘으면 처리량을 나눠 쓰고 초과 요청마다 --slowdown만큼 느려집니다.
+
+    python benchmarks/bench_scheduler.py --users 20 --burst 10 --output benchmarks/results/scheduler.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ollama  # noqa: E402
+
+from benchmarks.mock_ollama import MockOllamaState, start  # noqa: E402
+from scheduler import InferenceScheduler  # noqa: E402
+
+QUESTION = "제주도 동쪽 관광지 추천해줘"
+
+
+def percentiles(values: list) -> dict:
+    """nearest-rank p50/p95/p99 (ms)"""
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+
+    def rank(pct):
+        return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))]
+    return {"p50_ms": round(rank(50), 1), "p95_ms": round(rank(95), 1), "p99_ms": round(rank(99), 1)}
+
+
+async def ask(client: ollama.AsyncClient, model: str, scheduler, session_id: str, positions: list) -> tuple:
+    """질문 하나를 스트리밍으로 보내고 (첫 토큰 ms, 전체 ms) 반환"""
+    started = time.perf_counter()
+    first_token = None
+
+    async def consume():
+        nonlocal first_token
+        stream = await client.chat(model=model, messages=[{'role': 'user', 'content': QUESTION}], stream=True)
+        async for part in stream:
+            if first_token is None and part.get('message', {}).get('content'):
+                first_token = time.perf_counter() - started
+
+    if scheduler is None:
+        await consume()
+    else:
+        async with scheduler.slot(session_id, positions.append):
+            await consume()
+    total = time.perf_counter() - started
+    return (first_token if first_token is not None else total) * 1000, total * 1000
+
+
+async def run(host: str, model: str, users: int, turns: int, burst: int, think_seconds: float,
+              scheduler) -> dict:
+    """사용자 세션과 몰아 보내는 세션을 동시에 실행하고 지연 시간 요약"""
+    client = ollama.AsyncClient(host=host)
+    rng = random.Random(0)
+    positions = []
+    normal, bursty = [], []
+
+    async def user(index: int):
+        await asyncio.sleep(rng.uniform(0, think_seconds))
+        for _ in range(turns):
+            normal.append(await ask(client, model, scheduler, f"user-{index}", positions))
+            await asyncio.sleep(rng.uniform(0, think_seconds))
+
+    async def burster():
+        results = await asyncio.gather(*(ask(client, model, scheduler, "burst", positions) for _ in range(burst)))
+        bursty.extend(results)
+
+    started = time.perf_counter()
+    await asyncio.gather(burster(), *(user(i) for i in range(users)))
+    return {
+        "wall_seconds": round(time.perf_counter() - started, 2),
+        "requests": len(normal) + len(bursty),
+        "users_ttft": percentiles([ttft for ttft, _ in normal]),
+        "users_total": percentiles([total for _, total in normal]),
+        "burst_total": percentiles([total for _, total in bursty]),
+        "max_queue_position": max(positions, default=0),
+        "scheduler": scheduler.stats() if scheduler is not None else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추론 스케줄러 부하 테스트")
+    parser.add_argument("--host", default=None, help="Ollama 서버 주소 (없으면 가짜 서버 사용)")
+    parser.add_argument("--model", default="gemma3:4b")
+    parser.add_argument("--users", type=int, default=20, help="동시 사용자 수")
+    parser.add_argument("--turns", type=int, default=3, help="사용자당 질문 수")
+    parser.add_argument("--burst", type=int, default=10, help="한 세션이 한꺼번에 보내는 질문 수")
+    parser.add_argument("--think-seconds", type=float, default=1.0, help="질문 사이 최대 대기 시간")
+    parser.add_argument("--concurrency", type=int, default=4, help="스케줄러 동시 실행 수")
+    parser.add_argument("--parallel", type=int, default=4, help="가짜 서버가 느려지지 않는 동시 생성 수")
+    parser.add_argument("--slowdown", type=float, default=0.1, help="가짜 서버의 초과 요청당 감속 비율")
+    parser.add_argument("--output", default=None, help="결과 JSON 파일 경로")
+    args = parser.parse_args()
+
+    host = args.host
+    if host is None:
+        state = MockOllamaState(load_seconds=0.0, parallel=args.parallel, slowdown=args.slowdown)
+        server = start(0, state)
+        host = f"http://127.0.0.1:{server.server_address[1]}"
+        print(f"🧪 가짜 Ollama 서버: {host} (parallel {args.parallel}, slowdown {args.slowdown})")
+
+    results = {}
+    for mode in ("direct", "scheduler"):
+        scheduler = InferenceScheduler(args.concurrency) if mode == "scheduler" else None
+        result = asyncio.run(run(host, args.model, args.users, args.turns, args.burst, args.think_seconds, scheduler))
+        results[mode] = result
+        print(f"⏱️ {mode:<9} 사용자 첫 토큰 p50 {result['users_ttft']['p50_ms']}ms / p99 {result['users_ttft']['p99_ms']}ms, "
+              f"전체 p50 {result['users_total']['p50_ms']}ms / p99 {result['users_total']['p99_ms']}ms, "
+              f"몰아 보낸 세션 p99 {result['burst_total']['p99_ms']}ms, 최대 대기 순번 {result['max_queue_position']}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"host": args.host or "mock", "args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Ollama API를 흉내 내는 로컬 테스트 서버 (실제 모델/GPU 없이 로드·상주·스트리밍 동작 재현)
+
+/api/chat, /api/generate, /api/ps, /api/tags를 지원합니다. 상주하지 않은 모델에 요청하면
+--load-seconds만큼 기다린 뒤 올리고(응답의 load_duration에 기록), keep_alive가 지나면 내리며,
+--max-loaded개를 넘으면 가장 오래 쓰지 않은 모델을 내립니다. 빈 프롬프트의 /api/generate는
+실제 Ollama처럼 모델만 올리고, keep_alive=0이면 내립니다. 동시에 생성 중인 요청이 --parallel개를 넘으면
+처리량을 나눠 쓰고 초과 요청 하나당 --slowdown만큼 전체가 느려집니다(KV 캐시/메모리 경합).
+--stall-probability 확률로 첫 토큰 전에 --stall-seconds만큼 멈추고(멈춘 생성 재현), --error-probability 확률로
+500 오류를 돌려줍니다. --fault-models로 멈춤/오류를 특정 모델에만 넣을 수 있습니다.
+
+    python benchmarks/mock_ollama.py --port 11435 --load-seconds 3
+    OLLAMA_HOST=http://127.0.0.1:11435 streamlit run app.py
+"""
+import argparse
+import json
+import random
+import re
+import select
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+ANSWER = "제주 동쪽은 성산일출봉과 우도, 서쪽은 협재 해변과 애월 카페 거리를 추천합니다."
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_keep_alive(value, default: float = 300.0) -> float:
+    """keep_alive 값("30m", "1h", 초 단위 숫자, 음수면 무한)을 초로 변환"""
+    if value is None or value == "":
+        return default
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = re.fullmatch(r"(-?\d+(?:\.\d+)?)([smh]?)", str(value).strip())
+        if not match:
+            return default
+        seconds = float(match.group(1)) * DURATION_UNITS.get(match.group(2) or "s", 1)
+    return float("inf") if seconds < 0 else seconds
+
+
+class MockOllamaState:
+    def __init__(self, load_seconds: float = 2.0, first_token_seconds: float = 0.2,
+                 token_seconds: float = 0.03, max_loaded: int = 2, parallel: int = 4, slowdown: float = 0.1,
+                 stall_probability: float = 0.0, stall_seconds: float = 30.0, error_probability: float = 0.0,
+                 fault_models: Optional[list] = None, seed: int = 0):
+        """
+        가짜 Ollama 서버 상태 (상주 모델, 만료 시각, 요청 수)
+
+        Args:
+            load_seconds: 상주하지 않은 모델을 올리는 데 걸리는 시간
+            first_token_seconds: 모델이 올라온 뒤 첫 토큰까지 걸리는 시간 (프롬프트 평가)
+            token_seconds: 토큰 하나 생성에 걸리는 시간
+            max_loaded: 동시에 올려 둘 수 있는 모델 수 (넘치면 가장 오래 쓰지 않은 모델을 내림)
+            parallel: 느려지지 않고 동시에 생성할 수 있는 요청 수
+            slowdown: parallel을 넘는 동시 요청 하나당 추가로 느려지는 비율
+            stall_probability: 첫 토큰 전에 멈출 확률
+            stall_seconds: 멈추는 시간
+            error_probability: 500 오류를 돌려줄 확률
+            fault_models: 멈춤/오류를 넣을 모델 목록 (None이면 모든 모델)
+            seed: 멈춤/오류 난수 시드
+        """
+        self.load_seconds = load_seconds
+        self.first_token_seconds = first_token_seconds
+        self.token_seconds = token_seconds
+        self.max_loaded = max_loaded
+        self.parallel = max(1, parallel)
+        self.slowdown = slowdown
+        self.stall_probability = stall_probability
+        self.stall_seconds = stall_seconds
+        self.error_probability = error_probability
+        self.fault_models = set(fault_models) if fault_models else None
+        self.stalls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self.generating = 0
+        self.max_generating = 0
+        # {모델: (만료 시각(monotonic), 마지막 사용 시각)}
+        self.resident = {}
+        self.requests = 0
+        self.loads = 0
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _model_lock(self, model: str) -> threading.Lock:
+        """같은 모델의 동시 로드는 한 번만 (실제 Ollama처럼 뒤 요청은 로드를 기다림)"""
+        with self._lock:
+            return self._locks.setdefault(model, threading.Lock())
+
+    def _expire(self):
+        """만료된 모델 내리기 (lock을 잡은 상태에서 호출)"""
+        now = time.monotonic()
+        for model in [m for m, (expires, _) in self.resident.items() if expires <= now]:
+            del self.resident[model]
+
+    def ensure_loaded(self, model: str, keep_alive) -> float:
+        """
+        모델이 상주하지 않으면 load_seconds만큼 기다려 올리고 만료 시각 갱신
+
+        Returns:
+            로드에 걸린 시간 (초, 이미 상주 중이면 0)
+        """
+        with self._model_lock(model):
+            with self._lock:
+                self._expire()
+                loaded = model in self.resident
+            waited = 0.0
+            if not loaded:
+                time.sleep(self.load_seconds)
+                waited = self.load_seconds
+            with self._lock:
+                self.requests += 1
+                self.loads += 0 if loaded else 1
+                now = time.monotonic()
+                self.resident[model] = (now + parse_keep_alive(keep_alive), now)
+                while len(self.resident) > self.max_loaded:
+                    oldest = min((m for m in self.resident if m != model), key=lambda m: self.resident[m][1])
+                    del self.resident[oldest]
+            return waited
+
+    def delay(self, seconds: float):
+        """동시 생성 수에 따라 늘어난 시간만큼 대기 (처리량 분배 + 초과 요청당 slowdown)"""
+        with self._lock:
+            active = self.generating
+        excess = max(0, active - self.parallel)
+        time.sleep(seconds * max(1.0, active / self.parallel) * (1 + self.slowdown * excess))
+
+    def begin(self):
+        """생성 시작 (동시 생성 수 증가)"""
+        with self._lock:
+            self.generating += 1
+            self.max_generating = max(self.max_generating, self.generating)
+
+    def end(self):
+        """생성 종료"""
+        with self._lock:
+            self.generating -= 1
+
+    def fault(self, model: str) -> str:
+        """이번 요청에 넣을 장애 ("stall" / "error" / "")"""
+        if self.fault_models is not None and model not in self.fault_models:
+            return ""
+        with self._lock:
+            roll = self._random.random()
+            if roll < self.error_probability:
+                self.errors += 1
+                return "error"
+            if roll < self.error_probability + self.stall_probability:
+                self.stalls += 1
+                return "stall"
+            return ""
+
+    def reset_faults(self, seed: int = 0):
+        """장애 난수 시드 다시 설정 (벤치마크 시나리오마다 같은 장애 순서)"""
+        with self._lock:
+            self._random = random.Random(seed)
+
+    def unload(self, model: str):
+        """모델 내리기 (keep_alive=0)"""
+        with self._lock:
+            self.resident.pop(model, None)
+
+    def ps(self) -> list:
+        """상주 모델 목록 (/api/ps 형식)"""
+        with self._lock:
+            self._expire()
+            now = time.monotonic()
+            models = []
+            for model, (expires, _) in self.resident.items():
+                remaining = None if expires == float("inf") else timedelta(seconds=expires - now)
+                expires_at = (datetime.now(timezone.utc) + remaining).isoformat() if remaining else "0001-01-01T00:00:00Z"
+                models.append({"name": model, "model": model, "size": 3_300_000_000,
+                               "size_vram": 3_300_000_000, "expires_at": expires_at})
+            return models
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: MockOllamaState = None
+
+    def do_GET(self):
+        if self.path == "/api/ps":
+            self._send_json({"models": self.state.ps()})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": m["name"], "model": m["name"]} for m in self.state.ps()]})
+        else:
+            self._send_json({"status": "Ollama is running"})
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        model = body.get("model", "")
+        if self.path == "/api/generate" and not body.get("prompt"):
+            # 빈 프롬프트: 모델만 올리거나(keep_alive>0) 내림(keep_alive=0)
+            if parse_keep_alive(body.get("keep_alive")) == 0:
+                self.state.unload(model)
+                load_seconds = 0.0
+            else:
+                load_seconds = self.state.ensure_loaded(model, body.get("keep_alive"))
+            self._send_json({"model": model, "response": "", "done": True,
+                             "load_duration": int(load_seconds * 1e9)})
+        elif self.path in ("/api/chat", "/api/generate"):
+            self._generate(body, chat=self.path == "/api/chat")
+        else:
+            self._send_json({"error": f"unknown endpoint {self.path}"}, status=404)
+
+    def _generate(self, body: dict, chat: bool):
+        """모델 로드 → 첫 토큰 지연 → 토큰 스트리밍 (stream=false면 한 번에)"""
+        started = time.perf_counter()
+        load_seconds = self.state.ensure_loaded(body.get("model", ""), body.get("keep_alive"))
+        fault = self.state.fault(body.get("model", ""))
+        if fault == "error":
+            self._send_json({"error": "mock: model runner crashed"}, status=500)
+            return
+        if fault == "stall" and not self._stall():
+            return
+        self.state.begin()
+        try:
+            self._stream_tokens(body, chat, started, load_seconds)
+        finally:
+            self.state.end()
+
+    def _stall(self) -> bool:
+        """
+        첫 토큰 전에 stall_seconds만큼 멈춤 (실제 Ollama처럼 클라이언트가 연결을 끊으면 바로 중단)
+
+        Returns:
+            끝까지 기다렸으면 True, 클라이언트가 끊었으면 False
+        """
+        deadline = time.monotonic() + self.state.stall_seconds
+        while time.monotonic() < deadline:
+            readable, _, _ = select.select([self.connection], [], [], 0.05)
+            if readable and not self.connection.recv(1, socket.MSG_PEEK):
+                return False
+        return True
+
+    def _stream_tokens(self, body: dict, chat: bool, started: float, load_seconds: float):
+        """프롬프트 평가 후 토큰을 하나씩 생성해 보내기"""
+        self.state.delay(self.state.first_token_seconds)
+        tokens = re.findall(r"\S+\s*", ANSWER)
+        final = {
+            "model": body.get("model"), "done": True,
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": 40, "prompt_eval_duration": int(self.state.first_token_seconds * 1e9),
+            "eval_count": len(tokens), "eval_duration": int(len(tokens) * self.state.token_seconds * 1e9)
+        }
+
+        def part(text: str, done: bool = False) -> dict:
+            content = {"message": {"role": "assistant", "content": text}} if chat else {"response": text}
+            return {**(final if done else {"model": body.get("model"), "done": False}), **content}
+
+        if not body.get("stream", True):
+            for _ in tokens:
+                self.state.delay(self.state.token_seconds)
+            self._send_json({**part("".join(tokens), done=True),
+                             "total_duration": int((time.perf_counter() - started) * 1e9)})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                self._send_chunk(part(token))
+                self.state.delay(self.state.token_seconds)
+            self._send_chunk({**part("", done=True), "total_duration": int((time.perf_counter() - started) * 1e9)})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 클라이언트가 스트림을 중간에 닫음
+            pass
+
+    def _send_chunk(self, data: dict):
+        payload = (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, data: dict, status: int = 200):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port: int = 0, state: Optional[MockOllamaState] = None) -> ThreadingHTTPServer:
+    """
+    백그라운드 스레드에서 가짜 Ollama 서버 시작
+
+    Args:
+        port: 포트 (0이면 빈 포트 자동 선택, server.server_address로 확인)
+        state: 서버 상태 (None이면 기본값)
+
+    Returns:
+        실행 중인 서버 (server.shutdown()으로 종료)
+    """
+    handler = type("Handler", (MockOllamaHandler,), {"state": state or MockOllamaState()})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-ollama", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama API 흉내 서버")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--load-seconds", type=float, default=2.0, help="모델 로드 시간")
+    parser.add_argument("--first-token-seconds", type=float, default=0.2, help="첫 토큰까지 시간")
+    parser.add_argument("--token-seconds", type=float, default=0.03, help="토큰당 생성 시간")
+    parser.add_argument("--max-loaded", type=int, default=2, help="동시에 상주할 수 있는 모델 수")
+    parser.add_argument("--parallel", type=int, default=4, help="느려지지 않고 동시에 생성할 수 있는 요청 수")
+    parser.add_argument("--slowdown", type=float, default=0.1, help="초과 동시 요청 하나당 느려지는 비율")
+    parser.add_argument("--stall-probability", type=float, default=0.0, help="첫 토큰 전에 멈출 확률")
+    parser.add_argument("--stall-seconds", type=float, default=30.0, help="멈추는 시간")
+    parser.add_argument("--error-probability", type=float, default=0.0, help="500 오류 확률")
+    parser.add_argument("--fault-models", nargs="*", default=None, help="멈춤/오류를 넣을 모델 (없으면 모든 모델)")
+    args = parser.parse_args()
+
+    state = MockOllamaState(args.load_seconds, args.first_token_seconds, args.token_seconds, args.max_loaded,
+                            args.parallel, args.slowdown, args.stall_probability, args.stall_seconds,
+                            args.error_probability, args.fault_models)
+    server = start(args.port, state)
+    print(f"🧪 가짜 Ollama 서버 실행 중: http://127.0.0.1:{server.server_address[1]} (Ctrl+C로 종료)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+오프라인 적재/검색 벤치마크
+
+해시 기반 결정적 임베딩(EMBEDDING_BACKEND=hash)으로 API 호출 없이
+원본 데이터와 합성 스케일업 데이터에 대해 적재 처리량, 최대 RSS, 인덱스 크기,
+검색 지연 시간(p50/p95/p99)을 측정하고 JSON으로 저장합니다.
+
+    python benchmarks/run_benchmarks.py --scales 1 10 --output benchmarks/results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/results_prev.json
+    python benchmarks/run_benchmarks.py --scales 1 --backends chroma numpy
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_data import write_scaled_dataset  # noqa: E402
+
+# 비교 시 출력할 지표 (경로, 값이 클수록 좋은지)
+KEY_METRICS = [
+    (("ingest", "rows_per_sec"), True),
+    (("ingest", "peak_rss_mb"), False),
+    (("ingest", "index_bytes"), False),
+    (("query", "cold_start_ms"), False),
+    (("query", "rss_mb"), False),
+    (("query", "p50_ms"), False),
+    (("query", "multi_query_p50_ms"), False),
+    (("query", "mmr_p95_ms"), False),
+    (("query", "result_redundancy"), False),
+    (("query", "p95_ms"), False),
+    (("query", "p99_ms"), False),
+    (("query", "category_precision"), True),
+    (("query", "region_precision"), True)
+]
+
+
+def git_commit() -> str:
+    """현재 git 커밋 해시"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def run_phase(args: list, env: dict) -> dict:
+    """bench_ingest.py를 하위 프로세스로 실행하고 마지막 줄 JSON 반환"""
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "bench_ingest.py"), *args],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else "벤치마크 실패")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_scale(scale: int, dim: int, query_repeats: int, extra_env: dict, backends: list) -> dict:
+    """
+    한 배수에 대해 하위 프로세스로 벤치마크 실행
+
+    Args:
+        scale: 데이터 배수
+        dim: 임베딩 차원
+        query_repeats: 검색 질문 세트 반복 횟수
+        extra_env: 추가 환경 변수
+        backends: 비교할 검색 백엔드 (첫 번째 결과가 "query"에 들어감)
+
+    Returns:
+        벤치마크 결과 딕셔너리
+    """
+    workdir = tempfile.mkdtemp(prefix=f"jeju_bench_x{scale}_")
+    try:
+        data_dir = os.path.join(ROOT, "data") if scale == 1 else write_scaled_dataset(
+            scale, os.path.join(workdir, "data")
+        )
+        env = {
+            **os.environ,
+            "CHROMA_DB_PATH": os.path.join(workdir, "chroma_db"),
+            "DATA_DIR": data_dir,
+            "EMBEDDING_BACKEND": "hash",
+            "EMBEDDING_DIM": str(dim),
+            "EMBED_CACHE_ENABLED": "false",
+            **extra_env
+        }
+        # 적재와 검색을 각각 새 프로세스에서 실행 (검색 쪽 시작 시간/메모리를 따로 측정)
+        # numpy 백엔드를 비교하면 적재 때 벡터 색인도 만들어 같은 데이터로 두 백엔드를 검색
+        ingest_env = {**env, "VECTOR_BACKEND": "numpy"} if "numpy" in backends else env
+        result = {"ingest": run_phase(["ingest"], ingest_env), "backends": {}}
+        for backend in backends:
+            result["backends"][backend] = run_phase(
+                ["query", str(query_repeats)], {**env, "VECTOR_BACKEND": backend}
+            )
+        result["query"] = result["backends"][backends[0]]
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(current: dict, baseline: dict):
+    """기준 결과 대비 주요 지표 변화 출력"""
+    print("\n📈 기준 결과 대비 변화")
+    for scale, result in current["results"].items():
+        base = baseline.get("results", {}).get(scale)
+        if not base:
+            continue
+        for path, higher_is_better in KEY_METRICS:
+            now, before = result, base
+            for key in path:
+                now, before = now.get(key, {}), before.get(key, {})
+            if not isinstance(now, (int, float)) or not isinstance(before, (int, float)) or not before:
+                continue
+            change = (now - before) / before * 100
+            better = change > 0 if higher_is_better else change < 0
+            mark = "✅" if better or abs(change) < 5 else "⚠️"
+            print(f"  {mark} x{scale} {'.'.join(path)}: {before} → {now} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 적재/검색 벤치마크")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10], help="데이터 배수 (예: 1 10 100)")
+    parser.add_argument("--dim", type=int, default=4096, help="임베딩 차원 (기본값: Upstage와 동일)")
+    parser.add_argument("--query-repeats", type=int, default=20, help="검색 질문 세트 반복 횟수")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results.json"))
+    parser.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON")
+    parser.add_argument("--env", nargs="*", default=[], help="추가 환경 변수 (KEY=VALUE)")
+    parser.add_argument("--backends", nargs="+", default=["chroma"], choices=["chroma", "numpy"],
+                        help="비교할 검색 백엔드")
+    args = parser.parse_args()
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "dim": args.dim,
+        "env": extra_env,
+        "results": {}
+    }
+
+    for scale in args.scales:
+        print(f"⏳ x{scale} 벤치마크 실행 중...")
+        result = run_scale(scale, args.dim, args.query_repeats, extra_env, args.backends)
+        report["results"][str(scale)] = result
+        ingest = result["ingest"]
+        print(
+            f"✅ x{scale}: {ingest['rows']}행, {ingest['rows_per_sec']}행/초, "
+            f"RSS {ingest['peak_rss_mb']}MB, 인덱스 {ingest['index_bytes'] / 1024 / 1024:.1f}MB"
+        )
+        for backend, query in result["backends"].items():
+            print(
+                f"   🔍 {backend}: 시작 {query['cold_start_ms']}ms, RSS {query['rss_mb']}MB, "
+                f"p50/p95/p99 {query['p50_ms']}/{query['p95_ms']}/{query['p99_ms']}ms, "
+                f"카테고리 정확도 {query.get('category_precision', 0):.0%}, "
+                f"지역 정확도 {query.get('region_precision', 0):.0%}, "
+                f"MMR p95 {query.get('mmr_p95_ms', 0)}ms"
+            )
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 결과 저장: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from documents import iter_json_records  # noqa: E402
+
+SOURCE_FILES = [
+    "visitjeju_food.json",
+    "visitjeju_hotel.json",
+    "visitjeju_tour.json",
+    "visitjeju_event.json"
+]
+
+
+def write_scaled_dataset(scale: int, out_dir: str, source_dir: str = os.path.join(ROOT, "data")) -> str:
+    """
+    원본 데이터를 scale배로 늘린 합성 데이터 파일 생성
+
+    복제본마다 이름/소개에 번호를 붙여 모든 document가 서로 다르게 만듭니다.
+    레코드를 하나씩 스트리밍으로 쓰므로 100배 데이터도 메모리를 거의 쓰지 않습니다.
+
+    Args:
+        scale: 배수 (1이면 원본과 같은 내용)
+        out_dir: 출력 디렉토리 (DATA_DIR로 사용)
+        source_dir: 원본 데이터 디렉토리
+
+    Returns:
+        출력 디렉토리 경로
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for name in SOURCE_FILES:
+        source = os.path.join(source_dir, name)
+        if not os.path.exists(source):
+            continue
+        with open(os.path.join(out_dir, name), 'w', encoding='utf-8') as f:
+            f.write("[\n")
+            first = True
+            for copy in range(scale):
+                for record in iter_json_records(source):
+                    if copy > 0:
+                        record = dict(record)
+                        record["이름"] = f"{record.get('이름', '')} {copy + 1}호점"
+                        record["소개"] = f"{record.get('소개', '')} (지점 {copy + 1})"
+                    if not first:
+                        f.write(",\n")
+                    f.write(json.dumps(record, ensure_ascii=False))
+                    first = False
+            f.write("\n]\n")
+    return out_dir
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="합성 스케일업 데이터 생성")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+    out = write_scaled_dataset(args.scale, args.out or os.path.join(ROOT, f"data_x{args.scale}"))
+    print(f"✅ {args.scale}배 데이터 생성 완료: {out}")
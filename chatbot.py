@@ -1,17 +1,79 @@
+import asyncio
 import os
-import ollama
-from typing import List, Dict, Optional
+import queue
+import time
+import uuid
+from collections import defaultdict
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Optional
+
+from async_runtime import iterate_sync, run_sync
+from context_builder import ContextBuilder, prompt_budget
+from config import (
+    HYBRID_CANDIDATES, ITINERARY_RESULTS_PER_QUERY, MMR_ENABLED, MMR_LAMBDA, MMR_POOL_SIZE,
+    QUERY_DECOMPOSITION_ENABLED, REGION_FILTER_ENABLED, RETRIEVAL_MODE, ROUTER_ENABLED, RRF_K,
+    TAG_FILTER_ENABLED, VECTOR_BACKEND
+)
+from generation import GuardedGeneration, fallback_answer
+from intent_router import load_intent_router
+from lexical_index import load_lexical_index, reciprocal_rank_fusion
+from memory import ConversationMemory
+from metrics import LatencyStats, get_generation_stats
+from model_router import get_model_router
+from query_planner import decompose_query
+from regions import load_region_index
+from rerank import mmr
+from scheduler import get_scheduler
+from prompts import load_template
+from response_cache import get_response_cache, history_fingerprint
+from tag_index import load_tag_index
+from vector_index import ChromaBackend, load_vector_index
 
 class JejuTravelChatbot:
-    def __init__(self, model_name: str = "gemma3:4b"):
+    def __init__(self, model_name: str = "gemma3:4b", embedding_function=None, session_id: Optional[str] = None):
         """
         제주도 여행 챗봇 초기화
         
         Args:
             model_name: Ollama 모델 이름 (기본값: gemma3:4b)
+            embedding_function: 검색에 사용할 임베딩 함수 (None이면 공유 Upstage 임베딩 함수)
+            session_id: 추론 스케줄러의 공정 대기열을 나눌 세션 ID (None이면 무작위)
         """
         self.model_name = model_name
-        self.conversation_history = []
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        # Ollama 호출 동시 실행 수 제한 + 세션별 공정 대기열 (프로세스 전체 공유)
+        self.scheduler = get_scheduler()
+        # 최근 턴 링 버퍼 + 오래된 턴의 누적 요약 (대화가 길어져도 크기 일정)
+        self.memory = ConversationMemory()
+        self.embedding_function = embedding_function
+        self.query_embedder = None
+        self.record_store = None
+        self.vector_backend = None
+        self.lexical_index = None
+        self.retrieval_mode = RETRIEVAL_MODE
+        self.intent_router = None
+        self.last_route = None
+        self.region_index = None
+        self.last_regions = None
+        self.tag_index = None
+        self.last_tags = None
+        self.mmr_enabled = MMR_ENABLED
+        self.last_plan = None
+        self.rerank_latency = LatencyStats()
+        # 비슷한 질문에 대한 답변 재사용 (프로세스 전체 공유)
+        self.response_cache = get_response_cache()
+        self.last_response_cached = False
+        # 답변 생성 첫 토큰 시간 / 초당 토큰 수 (마지막 턴, 프로세스 전체 통계)
+        self.last_generation = None
+        self.generation_stats = get_generation_stats()
+        # 마지막 턴의 섹션별 프롬프트 토큰 수
+        self.last_context_usage = None
+        # 질문 유형별 모델/프롬프트 선택 (통계는 프로세스 전체 공유, 수동 지정은 세션별)
+        self.model_router = get_model_router()
+        self.tier_override = None
+        self.last_tier = None
+        # 진행 중인 답변 생성 (cancel()로 중단)과 마지막 턴의 실패 정보 (시간 초과/오류면 히스토리에 넣지 않음)
+        self._generation = None
+        self.last_failure = None
         
         # ChromaDB 연결 (이미 로딩된 데이터베이스 사용)
         try:
@@ -22,65 +84,81 @@ class JejuTravelChatbot:
             print("💡 data_loader.py를 먼저 실행해서 데이터를 로딩하세요.")
             self.client = None
             self.collection = None
+            self.vector_backend = None
     
     def connect_to_existing_db(self):
         """
-        이미 로딩된 ChromaDB에 연결
+        이미 로딩된 ChromaDB에 연결 (VECTOR_BACKEND=numpy면 ChromaDB 대신 벡터 색인 사용)
         
         Returns:
-            client, collection: ChromaDB 클라이언트와 컬렉션
-        """
-        import chromadb
-        from chromadb.utils.embedding_functions import EmbeddingFunction
-        from langchain_upstage import UpstageEmbeddings
-        from dotenv import load_dotenv
-        
-        # 환경 변수 로딩
-        load_dotenv()
-        api_key = os.getenv("UPSTAGE_API_KEY")
-        if not api_key:
-            raise ValueError("UPSTAGE_API_KEY가 설정되어 있지 않습니다.")
-        
-        # Upstage 임베딩 모델 설정
-        passage_embedder = UpstageEmbeddings(model="solar-embedding-1-large-passage")
-        
-        # EmbeddingFunction 래퍼 정의
-        class UpstageEmbeddingFunction(EmbeddingFunction):
-            def __init__(self, embedder):
-                self.embedder = embedder
-
-            def __call__(self, input):
-                try:
-                    # input이 리스트가 아닌 경우 리스트로 변환
-                    if isinstance(input, str):
-                        input = [input]
-                    return [self.embedder.embed_query(text) for text in input]
-                except Exception as e:
-                    raise RuntimeError(f"임베딩 생성 중 오류 발생: {e}")
-        
-        # ChromaDB 클라이언트 연결
-        if not os.path.exists("./chroma_db"):
+            client, collection: ChromaDB 클라이언트와 컬렉션 (numpy 백엔드면 None, None)
+        """
+        from config import CHROMA_DB_PATH, COLLECTION_NAME
+        from embeddings import get_embedding_function, get_query_embedder, QueryEmbedder
+        from record_store import RecordStore
+        
+        # 공유 임베딩 함수 (API 키 확인 포함)와 프로세스 전체에서 재사용하는 질문 임베딩 클라이언트
+        if self.embedding_function is None:
+            self.embedding_function = get_embedding_function()
+            self.query_embedder = get_query_embedder()
+        else:
+            self.query_embedder = QueryEmbedder(self.embedding_function)
+        
+        if not os.path.exists(CHROMA_DB_PATH):
             raise FileNotFoundError("ChromaDB 데이터베이스가 없습니다. data_loader.py를 먼저 실행하세요.")
         
-        client = chromadb.PersistentClient(
-            path="./chroma_db",
-            settings=chromadb.Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
+        # numpy 백엔드: 메모리 맵 행렬만 열고 ChromaDB는 띄우지 않음
+        client, collection = None, None
+        if VECTOR_BACKEND == "numpy":
+            self.vector_backend = load_vector_index(CHROMA_DB_PATH)
+            if self.vector_backend is None:
+                print("⚠️ 벡터 색인이 없어 ChromaDB로 검색합니다. data_loader.py를 다시 실행하세요.")
+        
+        if self.vector_backend is None:
+            import chromadb
+            
+            # ChromaDB 클라이언트 연결
+            client = chromadb.PersistentClient(
+                path=CHROMA_DB_PATH,
+                settings=chromadb.Settings(
+                    anonymized_telemetry=False,
+                    allow_reset=True
+                )
             )
-        )
+            
+            # 컬렉션 가져오기
+            collection = client.get_collection(
+                name=COLLECTION_NAME,
+                embedding_function=self.embedding_function
+            )
+            self.vector_backend = ChromaBackend(collection)
         
-        # 컬렉션 가져오기
-        collection = client.get_collection(
-            name="visitjeju",
-            embedding_function=UpstageEmbeddingFunction(passage_embedder)
-        )
+        # 원본 레코드 저장소 (compact 메타데이터 모드에서 상위 k개만 조회)
+        self.record_store = RecordStore(CHROMA_DB_PATH)
+        
+        # 문자 n-gram BM25 어휘 색인 (없으면 벡터 검색만 사용)
+        if self.retrieval_mode != "dense":
+            self.lexical_index = load_lexical_index(CHROMA_DB_PATH)
+            if self.lexical_index is None:
+                print("⚠️ 어휘 색인이 없어 벡터 검색만 사용합니다. data_loader.py를 다시 실행하세요.")
+        
+        # 질문 의도 → 카테고리 필터 라우터
+        if ROUTER_ENABLED:
+            self.intent_router = load_intent_router(CHROMA_DB_PATH)
+        
+        # 주소 기반 지역 → id 색인
+        if REGION_FILTER_ENABLED:
+            self.region_index = load_region_index(CHROMA_DB_PATH)
+        
+        # 태그 → 문서 비트맵 색인
+        if TAG_FILTER_ENABLED:
+            self.tag_index = load_tag_index(CHROMA_DB_PATH)
         
         return client, collection
     
     def load_prompt(self, prompt_file: str = "prompt.txt") -> str:
         """
-        프롬프트 파일 로드
+        프롬프트 파일 로드 (수정 시각이 바뀔 때만 다시 읽음)
         
         Args:
             prompt_file: 프롬프트 파일 경로
@@ -88,159 +166,573 @@ class JejuTravelChatbot:
         Returns:
             프롬프트 내용
         """
-        try:
-            with open(prompt_file, 'r', encoding='utf-8') as f:
-                return f.read()
-        except FileNotFoundError:
-            return "당신은 제주도 여행 전문가입니다. 사용자에게 유용한 여행 정보를 제공해주세요."
+        return load_template(prompt_file)[0]
     
-    def search_relevant_info(self, query: str, n_results: int = 3) -> List[Dict]:
+    def search_relevant_info(self, query: str, n_results: int = 3,
+                             query_embedding: Optional[List[float]] = None,
+                             categories: Optional[List[str]] = None,
+                             regions: Optional[List[str]] = None,
+                             must_tags: Optional[List[str]] = None,
+                             nice_tags: Optional[List[str]] = None) -> List[Dict]:
         """
-        사용자 쿼리에 관련된 정보 검색
+        사용자 쿼리에 관련된 정보 검색 (RETRIEVAL_MODE: dense / lexical / hybrid)
         
         Args:
             query: 사용자 질문
             n_results: 검색 결과 개수
+            query_embedding: 미리 계산한 질문 임베딩 (None이면 새로 생성)
+            categories: 검색할 카테고리 (None이면 의도 라우터로 예측, 빈 리스트면 전체 검색)
+            regions: 검색할 지역 경로 (None이면 질문에서 찾음, 빈 리스트면 전체 지역)
+            must_tags: 모두 있어야 하는 태그
+            nice_tags: 하나라도 있으면 좋은 태그 (None이면 질문 단어 중 태그를 사용, 빈 리스트면 사용 안 함)
             
         Returns:
             검색 결과 리스트
         """
-        if not self.collection:
+        if self.vector_backend is None:
             return []
         
         try:
-            # 쿼리 임베딩 생성
-            from langchain_upstage import UpstageEmbeddings
-            from dotenv import load_dotenv
+            mode = self._retrieval_mode()
             
-            load_dotenv()
-            query_embedder = UpstageEmbeddings(model="solar-embedding-1-large-query")
-            query_embedding = query_embedder.embed_query(query)
+            # 쿼리 임베딩 생성 (공유 클라이언트, 디스크 캐시 우선, 동시 동일 질문은 한 번만 요청)
+            if query_embedding is None and mode != "lexical":
+                query_embedding = self.query_embedder.embed_query(query)
             
-            # 검색 실행
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results
+            categories, regions, nice_tags, region_ids = self._resolve_filters(
+                query, query_embedding, n_results, categories, regions, must_tags, nice_tags
             )
+            self.last_route = categories or None
+            self.last_regions = regions or None
+            self.last_tags = (must_tags or []) + (nice_tags or []) or None
             
-            # 검색 결과 정리
-            relevant_info = []
-            if results and 'metadatas' in results:
-                for i, metadata in enumerate(results['metadatas'][0]):
-                    info = {
-                        'name': metadata.get('이름', metadata.get('title', '제목 없음')),
-                        'category': metadata.get('category', '카테고리 없음'),
-                        'address': metadata.get('주소', metadata.get('roadaddress', '주소 없음')),
-                        'phone': metadata.get('전화번호', '전화번호 없음'),
-                        'tags': metadata.get('태그', metadata.get('alltag', '태그 없음')),
-                        'description': metadata.get('소개', metadata.get('introduction', '설명 없음')),
-                        'distance': results.get('distances', [[]])[0][i] if results.get('distances') else 0
-                    }
-                    relevant_info.append(info)
+            # 어휘 검색만 사용 (이름/태그 등 글자가 그대로 일치하는 문서)
+            if mode == "lexical":
+                hits = self.lexical_index.search(query, n_results, categories=categories, ids=region_ids)
+                relevant_info = [self._build_info(row_id, {}, None) for row_id, _ in hits]
+                return relevant_info or self._search_unfiltered(
+                    query, n_results, query_embedding, categories, regions, must_tags, nice_tags
+                )
             
-            return relevant_info
+            relevant_info = self._dense_search(
+                query_embedding, self._candidate_count(n_results, mode), categories, region_ids
+            )
+            if not relevant_info:
+                return self._search_unfiltered(
+                    query, n_results, query_embedding, categories, regions, must_tags, nice_tags
+                )
+            return self._rank_candidates(query, query_embedding, relevant_info, n_results, mode, categories, region_ids)
         except Exception as e:
             print(f"❌ 검색 중 오류 발생: {e}")
             return []
     
-    def format_context(self, relevant_info: List[Dict]) -> str:
+    def search_many(self, queries: List[str], n_results: int = 3, filters=None) -> List[List[Dict]]:
         """
-        검색된 정보를 컨텍스트로 포맷팅
+        여러 질문을 한 번에 검색 (일정형 질문의 카테고리별 하위 질문 등)
+        
+        질문 임베딩은 배치 요청 한 번으로 만들고, 지역/태그 후보가 같은 질문끼리 묶어
+        벡터 검색도 한 번에 보냅니다(카테고리는 질문별로 다르게 적용).
+        앞 질문의 결과에 나온 장소는 뒤 질문의 결과에서 뺍니다.
         
         Args:
-            relevant_info: 검색 결과 리스트
+            queries: 질문 리스트
+            n_results: 질문별 결과 개수
+            filters: 모든 질문에 공통인 필터 딕셔너리 또는 질문별 필터 딕셔너리 리스트
+                     (키: categories / regions / must_tags / nice_tags, 의미는 search_relevant_info와 같음)
             
         Returns:
-            포맷팅된 컨텍스트 문자열
+            질문별 검색 결과 리스트
         """
-        if not relevant_info:
-            return "관련 정보를 찾을 수 없습니다."
-        
-        context = "=== 제주도 관련 정보 ===\n\n"
-        
-        for i, info in enumerate(relevant_info, 1):
-            context += f"{i}. {info['name']} ({info['category']})\n"
-            context += f"   📍 주소: {info['address']}\n"
-            if info['phone'] != '전화번호 없음':
-                context += f"   📞 전화번호: {info['phone']}\n"
-            context += f"   🏷 태그: {info['tags']}\n"
-            context += f"   💬 설명: {info['description']}\n"
-            context += f"   📊 관련도: {info['distance']:.3f}\n\n"
+        if not queries:
+            return []
+        if filters is None or isinstance(filters, dict):
+            filters = [filters or {}] * len(queries)
+        if self.vector_backend is None:
+            return [[] for _ in queries]
         
-        return context
+        try:
+            mode = self._retrieval_mode()
+            embeddings = self.query_embedder.embed_queries(queries) if mode != "lexical" else [None] * len(queries)
+            resolved = [
+                self._resolve_filters(
+                    query, embedding, n_results, options.get('categories'), options.get('regions'),
+                    options.get('must_tags'), options.get('nice_tags')
+                )
+                for query, embedding, options in zip(queries, embeddings, filters)
+            ]
+            
+            # 후보 id 집합이 같은 질문끼리 벡터 검색 한 번 (카테고리는 질문별 리스트로 전달)
+            dense = [[] for _ in queries]
+            if mode != "lexical":
+                groups = defaultdict(list)
+                for i, (_, _, _, ids) in enumerate(resolved):
+                    groups[None if ids is None else frozenset(ids)].append(i)
+                n_candidates = self._candidate_count(n_results, mode)
+                for ids, members in groups.items():
+                    hits = self.vector_backend.query(
+                        [embeddings[i] for i in members], n_candidates, [resolved[i][0] for i in members], ids
+                    )
+                    for i, row in zip(members, hits):
+                        dense[i] = [self._build_info(row_id, metadata, distance) for row_id, metadata, distance in row]
+            
+            results, seen = [], set()
+            for i, query in enumerate(queries):
+                categories, regions, nice_tags, ids = resolved[i]
+                if dense[i]:
+                    relevant_info = self._rank_candidates(
+                        query, embeddings[i], dense[i], n_results, mode, categories, ids, exclude=seen
+                    )
+                else:
+                    # 어휘 검색 모드이거나 필터로 결과가 없으면 한 건씩 검색
+                    relevant_info = self.search_relevant_info(
+                        query, n_results + len(seen), embeddings[i], categories, regions,
+                        filters[i].get('must_tags'), nice_tags
+                    )
+                    relevant_info = [info for info in relevant_info if info['id'] not in seen][:n_results]
+                seen.update(info['id'] for info in relevant_info)
+                results.append(relevant_info)
+            return results
+        except Exception as e:
+            print(f"❌ 다중 검색 중 오류 발생: {e}")
+            return [[] for _ in queries]
     
-    def generate_response(self, user_input: str) -> str:
+    def retrieve(self, user_input: str, query_embedding: Optional[List[float]] = None) -> List[Dict]:
         """
-        사용자 입력에 대한 응답 생성
+        답변에 쓸 정보 검색 (일정형 질문은 카테고리별 하위 질문을 search_many로 한 번에 검색)
         
         Args:
             user_input: 사용자 입력
+            query_embedding: 미리 계산한 질문 임베딩 (단일 질문 검색에만 사용)
             
         Returns:
-            챗봇 응답
+            검색 결과 리스트
+        """
+        plan = decompose_query(user_input) if QUERY_DECOMPOSITION_ENABLED else None
+        self.last_plan = plan
+        if not plan:
+            return self.search_relevant_info(user_input, query_embedding=query_embedding)
+        results = self.search_many(
+            [step['query'] for step in plan], ITINERARY_RESULTS_PER_QUERY,
+            [{'categories': step['categories']} for step in plan]
+        )
+        return [info for rows in results for info in rows]
+    
+    def _retrieval_mode(self) -> str:
+        """사용할 검색 방식 (어휘 색인이 없으면 dense)"""
+        return self.retrieval_mode if self.lexical_index is not None else "dense"
+    
+    def _candidate_count(self, n_results: int, mode: str) -> int:
+        """벡터 검색으로 가져올 후보 수 (hybrid면 결합할 후보를, MMR이면 재순위할 후보를 넉넉히)"""
+        pool_size = max(n_results, MMR_POOL_SIZE) if self.mmr_enabled else n_results
+        return pool_size if mode == "dense" else max(pool_size, HYBRID_CANDIDATES)
+    
+    def _resolve_filters(self, query: str, query_embedding: Optional[List[float]], n_results: int,
+                         categories: Optional[List[str]], regions: Optional[List[str]],
+                         must_tags: Optional[List[str]], nice_tags: Optional[List[str]]):
         """
-        # 프롬프트 로드
-        system_prompt = self.load_prompt()
+        질문에서 카테고리/지역/태그 조건을 정하고 후보 id 집합 계산
         
-        # 관련 정보 검색
-        relevant_info = self.search_relevant_info(user_input)
-        context = self.format_context(relevant_info)
+        Returns:
+            (카테고리, 지역 경로, 선호 태그, 후보 id 집합 또는 None)
+        """
+        # 질문 의도로 카테고리 예측 (확신이 낮으면 None → 전체 검색)
+        if categories is None and self.intent_router is not None:
+            categories = self.intent_router.route(query, query_embedding)
         
-        # 대화 히스토리 포함
-        conversation_context = ""
-        if self.conversation_history:
-            conversation_context = "\n=== 이전 대화 ===\n"
-            for i, (user_msg, bot_msg) in enumerate(self.conversation_history[-3:], 1):  # 최근 3개 대화만
-                conversation_context += f"사용자 {i}: {user_msg}\n"
-                conversation_context += f"챗봇 {i}: {bot_msg}\n\n"
+        # 질문에 나온 지역(시/읍·면/동·리)의 문서로 후보 제한
+        if regions is None and self.region_index is not None:
+            regions = self.region_index.match(query)
+        ids = self.region_index.ids_for(regions) if regions and self.region_index else None
         
-        # 최종 프롬프트 구성
-        full_prompt = f"""
-{system_prompt}
-
-{context}
-
-{conversation_context}
-
-현재 사용자 질문: {user_input}
-
-위의 정보를 바탕으로 사용자에게 도움이 되는 답변을 해주세요.
-"""
+        # 태그 비트맵으로 후보 제한 (필수 태그는 교집합, 선호 태그는 합집합)
+        if nice_tags is None and self.tag_index is not None:
+            nice_tags = self.tag_index.match(query)
+        if self.tag_index is not None and (must_tags or nice_tags):
+            tag_ids = self.tag_index.filter(must_tags, nice_tags, min_results=n_results)
+            if tag_ids is not None:
+                ids = tag_ids if ids is None else ids & tag_ids
+        return categories, regions, nice_tags, ids
+    
+    def _rank_candidates(self, query: str, query_embedding: List[float], relevant_info: List[Dict],
+                         n_results: int, mode: str, categories: Optional[List[str]] = None,
+                         ids: Optional[set] = None, exclude: Optional[set] = None) -> List[Dict]:
+        """
+        벡터 검색 후보를 최종 결과로 정리 (hybrid면 BM25와 RRF 결합, MMR이면 다양성 재순위)
         
-        try:
-            # Ollama API 호출
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': system_prompt
-                    },
-                    {
-                        'role': 'user', 
-                        'content': f"{context}\n\n{conversation_context}\n\n사용자 질문: {user_input}"
-                    }
-                ]
+        Args:
+            query: 사용자 질문
+            query_embedding: 질문 임베딩
+            relevant_info: 벡터 검색 후보 (거리 순)
+            n_results: 결과 개수
+            mode: 검색 방식 (dense / hybrid)
+            categories: 어휘 검색에 적용할 카테고리
+            ids: 어휘 검색에 적용할 후보 id 집합
+            exclude: 결과에서 뺄 id (다중 검색에서 앞 질문에 나온 장소)
+            
+        Returns:
+            검색 결과 리스트
+        """
+        pool_size = max(n_results, MMR_POOL_SIZE) if self.mmr_enabled else n_results
+        relevance = None
+        
+        # 벡터 순위와 BM25 순위를 RRF로 결합 (어휘 검색에서만 나온 항목은 레코드 저장소로 채움)
+        if mode == "hybrid":
+            lexical_hits = self.lexical_index.search(
+                query, max(pool_size, HYBRID_CANDIDATES), categories=categories, ids=ids
+            )
+            by_id = {info['id']: info for info in relevant_info}
+            fused = reciprocal_rank_fusion(
+                [[info['id'] for info in relevant_info], [row_id for row_id, _ in lexical_hits]], k=RRF_K
             )
+            relevant_info = [by_id.get(row_id) or self._build_info(row_id, {}, None) for row_id, _ in fused]
+            # RRF 점수는 폭이 좁으므로 0~1로 펴서 MMR 관련도로 사용
+            relevance = [score for _, score in fused]
+        
+        if exclude:
+            keep = [i for i, info in enumerate(relevant_info) if info['id'] not in exclude]
+            relevant_info = [relevant_info[i] for i in keep]
+            relevance = [relevance[i] for i in keep] if relevance is not None else None
+        relevant_info = relevant_info[:pool_size]
+        if relevance is not None and relevance:
+            relevance = relevance[:pool_size]
+            spread = (relevance[0] - relevance[-1]) or 1.0
+            relevance = [(score - relevance[-1]) / spread for score in relevance]
+        
+        if self.mmr_enabled:
+            return self._rerank(query_embedding, relevant_info, n_results, relevance)
+        return relevant_info[:n_results]
+    
+    def _dense_search(self, query_embedding: List[float], n_results: int,
+                      categories: Optional[List[str]] = None, ids: Optional[set] = None) -> List[Dict]:
+        """
+        벡터 검색 (ChromaDB 또는 numpy 백엔드, document 본문은 가져오지 않음)
+        
+        Args:
+            query_embedding: 질문 임베딩
+            n_results: 결과 개수
+            categories: 검색할 카테고리 (None이나 빈 리스트면 전체)
+            ids: 검색할 id 집합 (None이면 전체)
             
-            bot_response = response['message']['content']
+        Returns:
+            검색 결과 리스트
+        """
+        hits = self.vector_backend.query([query_embedding], n_results, categories, ids)[0]
+        return [self._build_info(row_id, metadata, distance) for row_id, metadata, distance in hits]
+    
+    def _rerank(self, query_embedding: List[float], relevant_info: List[Dict], n_results: int,
+                relevance: Optional[List[float]] = None) -> List[Dict]:
+        """
+        MMR로 후보 중 서로 겹치지 않는 n_results개 고르기 (같은 체인 지점, 같은 거리 카페 등 중복 방지)
+        
+        Args:
+            query_embedding: 질문 임베딩
+            relevant_info: 관련도 순 후보 리스트
+            n_results: 결과 개수
+            relevance: 후보별 관련도 (None이면 질문과의 코사인 유사도)
             
-            # 대화 히스토리에 추가
-            self.conversation_history.append((user_input, bot_response))
+        Returns:
+            재순위된 검색 결과 리스트
+        """
+        if len(relevant_info) <= n_results:
+            return relevant_info
+        started = time.perf_counter()
+        vectors = self.vector_backend.embeddings([info['id'] for info in relevant_info])
+        selected = mmr(query_embedding, vectors, n_results, MMR_LAMBDA, relevance)
+        self.rerank_latency.record(time.perf_counter() - started)
+        return [relevant_info[i] for i in selected]
+    
+    def _search_unfiltered(self, query: str, n_results: int, query_embedding: Optional[List[float]],
+                           categories: Optional[List[str]], regions: Optional[List[str]],
+                           must_tags: Optional[List[str]], nice_tags: Optional[List[str]]) -> List[Dict]:
+        """카테고리/지역/태그 필터로 결과가 없으면 필터 없이 다시 검색"""
+        if not categories and not regions and not must_tags and not nice_tags:
+            return []
+        return self.search_relevant_info(
+            query, n_results, query_embedding, categories=[], regions=[], must_tags=[], nice_tags=[]
+        )
+    
+    def _build_info(self, row_id: str, metadata: Dict, distance: Optional[float]) -> Dict:
+        """
+        메타데이터(또는 원본 레코드)로 검색 결과 항목 구성 (어휘 검색 결과는 distance가 None)
+        
+        compact 메타데이터에는 이름/주소/소개가 없으므로 hydrated=False로 표시하고,
+        format_context에서 레코드 저장소로 채웁니다.
+        """
+        return {
+            'id': row_id,
+            'name': metadata.get('이름', metadata.get('title', '제목 없음')),
+            'category': metadata.get('category', '카테고리 없음'),
+            'address': metadata.get('주소', metadata.get('roadaddress', '주소 없음')),
+            'phone': metadata.get('전화번호', '전화번호 없음') or '전화번호 없음',
+            'tags': metadata.get('태그', metadata.get('alltag', metadata.get('tags', '태그 없음'))),
+            'description': metadata.get('소개', metadata.get('introduction', '설명 없음')),
+            'distance': distance,
+            'hydrated': '이름' in metadata or 'title' in metadata
+        }
+    
+    def hydrate_info(self, relevant_info: List[Dict]) -> List[Dict]:
+        """
+        레코드 저장소에서 상위 k개 결과의 원본 레코드를 가져와 항목 채우기
+        
+        Args:
+            relevant_info: 검색 결과 리스트
+            
+        Returns:
+            이름/주소/전화번호/태그/설명이 채워진 검색 결과 리스트
+        """
+        missing = [info['id'] for info in relevant_info if not info.get('hydrated', True)]
+        if not missing or self.record_store is None:
+            return relevant_info
+        
+        records = self.record_store.get_many(missing)
+        hydrated = []
+        for info in relevant_info:
+            record = records.get(info.get('id'))
+            if record is not None and not info.get('hydrated', True):
+                info = {**self._build_info(info['id'], record, info['distance']), 'hydrated': True}
+            hydrated.append(info)
+        return hydrated
+    
+    def format_context(self, relevant_info: List[Dict]) -> str:
+        """
+        검색된 정보를 컨텍스트로 포맷팅 (토큰 예산 없이, 설명 자르기/태그 중복 제거는 동일)
+        
+        Args:
+            relevant_info: 검색 결과 리스트
+            
+        Returns:
+            포맷팅된 컨텍스트 문자열
+        """
+        builder = ContextBuilder(prompt_budget(self.model_name))
+        return builder.format_context(self.hydrate_info(relevant_info))[0]
+    
+    def generate_response(self, user_input: str) -> str:
+        """
+        사용자 입력에 대한 응답 생성 (agenerate_response의 동기 래퍼)
+        
+        Args:
+            user_input: 사용자 입력
+            
+        Returns:
+            챗봇 응답
+        """
+        return run_sync(self.agenerate_response(user_input))
+    
+    async def agenerate_response(self, user_input: str) -> str:
+        """
+        사용자 입력에 대한 응답 생성 (비동기, astream_response의 토큰을 모아 반환)
+        
+        Args:
+            user_input: 사용자 입력
+            
+        Returns:
+            챗봇 응답
+        """
+        return "".join([chunk async for chunk in self.astream_response(user_input)])
+    
+    def stream_response(self, user_input: str, on_queue: Optional[Callable[[int], None]] = None) -> Iterator[str]:
+        """
+        사용자 입력에 대한 응답을 토큰 단위로 생성 (astream_response의 동기 래퍼, Streamlit용)
+        
+        Args:
+            user_input: 사용자 입력
+            on_queue: 스케줄러 대기 순번(1부터)이 바뀔 때 호출할 함수 (호출한 스레드에서 실행)
             
-            return bot_response
+        Yields:
+            응답 조각
+        """
+        positions = queue.SimpleQueue()
+        
+        def deliver_positions():
+            while not positions.empty():
+                on_queue(positions.get())
+        
+        return iterate_sync(
+            self.astream_response(user_input, positions.put if on_queue else None),
+            on_wait=deliver_positions if on_queue else None
+        )
+    
+    async def astream_response(self, user_input: str,
+                               on_queue: Optional[Callable[[int], None]] = None) -> AsyncIterator[str]:
+        """
+        사용자 입력에 대한 응답을 토큰 단위로 생성 (비동기)
+        
+        질문 임베딩을 스레드 풀에서 만드는 동안 프롬프트(수정 시각 캐시)와 이전 대화를 정리하고, 답변 캐시에
+        없을 때만 검색과 원본 레코드 조회를 진행합니다(캐시 적중 시 검색/생성 모두 생략).
+        Ollama는 비동기 클라이언트로 스트리밍 호출하므로 한 이벤트 루프에서 여러 세션이 동시에 호출할 수 있습니다.
+        (파일/임베딩 API/벡터 검색은 동기 라이브러리라 기본 스레드 풀에서 실행)
+        질문 유형(정보 조회/추천/일정)에 따라 모델과 프롬프트를 고르고, 장소 주소/전화번호 질문은
+        검색된 메타데이터로 바로 답합니다.
+        Ollama 호출은 프로세스 전체 스케줄러에서 차례를 받은 뒤 실행합니다(동시 실행 수 제한, 세션별 공정 대기).
+        첫 토큰/토큰 간격/전체 마감 시간을 넘기거나 오류가 나면 검색 결과로 만든 안내 답변으로 대신하고,
+        첫 토큰이 늦으면 작은 모델로 헤지합니다(generation.py).
+        대화 히스토리와 답변 캐시는 스트림이 끝까지 완료된 경우에만 반영합니다.
+        
+        Args:
+            user_input: 사용자 입력
+            on_queue: 대기 순번이 바뀔 때 호출할 함수 (이벤트 루프에서 실행)
             
+        Yields:
+            응답 조각 (캐시된 답변은 한 번에)
+        """
+        self.last_response_cached = False
+        self.last_generation = None
+        self.last_failure = None
+        turn_started = time.perf_counter()
+        
+        # 질문 유형에 따라 답변 모델과 프롬프트 선택 (규칙 기반이라 바로 결정)
+        route = self.model_router.route(user_input, self.model_name, self.tier_override)
+        self.last_tier = route
+        model = route['model']
+        
+        # 질문 임베딩을 먼저 시작하고, 기다리는 동안 프롬프트와 이전 대화 준비
+        embedding_task = asyncio.create_task(asyncio.to_thread(self._cache_query_embedding, user_input))
+        system_prompt, version = load_template(route['prompt'])
+        builder = ContextBuilder(prompt_budget(model))
+        # 이전 대화는 요약 + 최근 턴, 최근 턴은 예산을 넘을 때만 앞쪽 절반씩 버려 턴마다 같은 접두어 유지
+        summary = self.memory.summary
+        history = self.memory.window(
+            builder, builder.history_budget(builder.system_content(system_prompt, summary))
+        )
+        query_embedding = await embedding_task
+        relevant_info = None
+        
+        # 장소 이름 + 주소/전화번호 질문은 검색된 메타데이터로 바로 답변 (LLM 호출 없음, 검색은 먼저 필요)
+        if route['tier'] == 'lookup' and self.model_router.direct_answers:
+            relevant_info = await asyncio.to_thread(self._retrieve_context, user_input, query_embedding)
+            direct = self.model_router.direct_answer(user_input, relevant_info)
+            if direct is not None:
+                route['direct'] = True
+                self.memory.append(user_input, direct, self.model_name)
+                self.model_router.record('lookup', time.perf_counter() - turn_started, True, route['override'])
+                yield direct
+                return
+        
+        # 답변 캐시 조회 (같은 모델/프롬프트/이전 대화에서 비슷한 질문이면 생성 생략)
+        cache_scope = (model, version, history_fingerprint([(summary, "")] + history if summary else history))
+        if query_embedding is not None:
+            cached = self.response_cache.get(*cache_scope, query_embedding)
+            if cached is not None:
+                self.last_response_cached = True
+                self.memory.append(user_input, cached['answer'], self.model_name)
+                self.model_router.record(route['tier'], time.perf_counter() - turn_started, override=route['override'])
+                yield cached['answer']
+                return
+        
+        # 캐시에 없을 때만 관련 정보 검색 + 원본 레코드 조회 (스레드 풀에서 실행)
+        if relevant_info is None:
+            relevant_info = await asyncio.to_thread(self._retrieve_context, user_input, query_embedding)
+        
+        # 시스템(+ 요약) → 이전 대화 → 이번 턴(검색 결과 + 질문) 순서로 토큰 예산 안에서 메시지 구성
+        messages, usage = builder.build(system_prompt, relevant_info, history, user_input, summary)
+        self.last_context_usage = usage
+        print(f"🧭 질문 유형 {route['tier']} → {model} ({route['prompt']})")
+        print(f"🧮 프롬프트 토큰 {usage['total']}/{usage['budget']}: 시스템 {usage['system']}, "
+              f"검색 {usage['context']} ({usage['items']}건), 이전 대화 {usage['history']} ({usage['turns']}턴, 요약 {usage['summary']}), "
+              f"질문 {usage['question']}")
+        
+        # 마감 시간 + 헤지가 있는 스트리밍 생성 (스케줄러에서 차례를 받은 뒤 Ollama 호출)
+        generation = GuardedGeneration(self.scheduler, self.session_id, messages, model)
+        self._generation = generation
+        chunks = []
+        tokens = generation.stream(on_queue)
+        try:
+            async for token in tokens:
+                chunks.append(token)
+                yield token
+        finally:
+            # 화면 재실행 등으로 스트림이 중간에 닫혀도 Ollama 호출을 취소하고 자리를 반납
+            await tokens.aclose()
+            self._generation = None
+            fallback_won = generation.winner is not None and generation.winner.reason != "primary"
+            self.generation_stats.record_outcome(generation.outcome, generation.reasons(), fallback_won)
+        
+        if generation.outcome != "ok":
+            # 실패한 턴은 히스토리/캐시에 남기지 않고, 시간 초과/오류면 검색 결과로 안내 답변
+            self.last_failure = {"reason": generation.outcome, "error": str(generation.error or ""), "partial": bool(chunks)}
+            if generation.outcome != "cancelled":
+                yield fallback_answer(generation.outcome, self.format_context(relevant_info), partial=bool(chunks))
+            return
+        
+        bot_response = "".join(chunks)
+        self._record_generation(generation, len(chunks), usage['total'])
+        self.model_router.record(route['tier'], time.perf_counter() - turn_started, override=route['override'])
+        
+        # 대화 메모리에 추가 (요약할 턴이 쌓였으면 백그라운드에서 요약 갱신)
+        self.memory.append(user_input, bot_response, self.model_name)
+        
+        # 답변 캐시에 저장 (헤지/재시도 모델의 답변은 원래 모델 캐시에 넣지 않음)
+        if query_embedding is not None and not fallback_won:
+            self.response_cache.put(*cache_scope, query_embedding, user_input, bot_response)
+    
+    def _record_generation(self, generation: GuardedGeneration, n_chunks: int, prompt_tokens: int):
+        """
+        한 턴의 첫 토큰 시간(스케줄러 대기 포함), 초당 토큰 수, 프롬프트 평가 토큰 수, 답변한 모델 기록
+        
+        Ollama 마지막 응답의 eval_count / eval_duration(ns)을 우선 사용하고,
+        없으면 받은 조각 수를 첫 토큰 이후 경과 시간으로 나눕니다.
+        prompt_eval_count는 KV 캐시에 없어 새로 계산한 프롬프트 토큰 수이므로,
+        추정 프롬프트 토큰 수보다 작을수록 앞부분(시스템 + 이전 대화)이 재사용된 것입니다.
+        """
+        total = time.perf_counter() - generation.started
+        first_token = total if generation.first_token is None else generation.first_token
+        final = generation.final
+        tokens = final.get('eval_count') or n_chunks
+        if final.get('eval_duration'):
+            tokens_per_sec = tokens / (final['eval_duration'] / 1e9)
+        else:
+            tokens_per_sec = tokens / max(total - first_token, 1e-6)
+        self.last_generation = {
+            "ttft_ms": round(first_token * 1000, 1),
+            "queue_ms": round(generation.queue_wait * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+            "tokens": tokens,
+            "tokens_per_sec": round(tokens_per_sec, 1),
+            "prompt_tokens": prompt_tokens,
+            "prompt_eval_count": final.get('prompt_eval_count'),
+            "prompt_eval_ms": round(final['prompt_eval_duration'] / 1e6, 1) if final.get('prompt_eval_duration') else None,
+            "model": generation.model,
+            "fallback": generation.winner is not None and generation.winner.reason != "primary"
+        }
+        self.generation_stats.record(first_token, tokens_per_sec, final.get('prompt_eval_count'), prompt_tokens)
+    
+    def _retrieve_context(self, user_input: str, query_embedding: Optional[List[float]]) -> List[Dict]:
+        """
+        원본 레코드로 채운 검색 결과 준비 (스레드 풀에서 실행, 답변 캐시에 없을 때만 호출)
+        
+        Args:
+            user_input: 사용자 입력
+            query_embedding: 답변 캐시 조회에 쓴 질문 임베딩 (None이면 검색에서 새로 생성)
+        
+        Returns:
+            검색 결과 리스트
+        """
+        return self.hydrate_info(self.retrieve(user_input, query_embedding))
+    
+    def _cache_query_embedding(self, user_input: str) -> Optional[List[float]]:
+        """답변 캐시 조회용 질문 임베딩 (캐시가 꺼져 있거나 임베딩 실패 시 None, 검색에도 재사용)"""
+        if self.response_cache is None or self.query_embedder is None:
+            return None
+        try:
+            return self.query_embedder.embed_query(user_input)
         except Exception as e:
-            return f"죄송합니다. 응답 생성 중 오류가 발생했습니다: {e}"
+            print(f"⚠️ 답변 캐시 조회 건너뜀: {e}")
+            return None
+    
+    def cancel(self):
+        """진행 중인 답변 생성 중단 (다른 스레드에서도 호출 가능, 중단된 턴은 히스토리에 넣지 않음)"""
+        generation = self._generation
+        if generation is not None:
+            generation.cancel()
     
     def clear_history(self):
         """대화 히스토리 초기화"""
-        self.conversation_history = []
+        self.memory.clear()
         print("✅ 대화 히스토리가 초기화되었습니다.")
     
     def get_conversation_history(self) -> List[tuple]:
-        """대화 히스토리 반환"""
-        return self.conversation_history
+        """대화 히스토리 반환 (메모리에 원문으로 남아 있는 최근 턴)"""
+        return self.memory.recent()
     
     def set_model(self, model_name: str):
         """모델 변경"""
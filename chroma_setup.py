@@ -1,45 +1,33 @@
 import os
-import pandas as pd
 from tqdm import tqdm
-from dotenv import load_dotenv
 import chromadb
-from chromadb.utils.embedding_functions import EmbeddingFunction
-from langchain_upstage import UpstageEmbeddings
-
-# 1. 환경 변수 로딩
-load_dotenv()
-api_key = os.getenv("UPSTAGE_API_KEY")
-if not api_key:
-    raise ValueError("UPSTAGE_API_KEY가 설정되어 있지 않습니다. .env 파일을 확인해주세요.")
-
-# 2. Upstage 임베딩 모델 설정
-try:
-    query_embedder = UpstageEmbeddings(model="solar-embedding-1-large-query")
-    passage_embedder = UpstageEmbeddings(model="solar-embedding-1-large-passage")
-except Exception as e:
-    raise RuntimeError(f"Upstage 임베딩 로드 중 오류 발생: {e}")
-
-# 3. ChromaDB에 사용할 EmbeddingFunction 래퍼 정의
-class UpstageEmbeddingFunction(EmbeddingFunction):
-    def __init__(self, embedder):
-        self.embedder = embedder
-
-    def __call__(self, input):
-        try:
-            # input이 리스트가 아닌 경우 리스트로 변환
-            if isinstance(input, str):
-                input = [input]
-            return [self.embedder.embed_query(text) for text in input]
-        except Exception as e:
-            raise RuntimeError(f"임베딩 생성 중 오류 발생: {e}")
+from config import CHROMA_DB_PATH, COLLECTION_NAME, CATEGORY_MAP, INGEST_BATCH_SIZE, INGEST_PIPELINE, VECTOR_BACKEND
+from documents import iter_row_batches
+from embeddings import get_embedding_function
+from ingestion import IngestManifest, sync_collection, run_pipeline
+from intent_router import build_intent_router
+from lexical_index import build_lexical_index
+from regions import build_region_index
+from tag_index import build_tag_index
+from vector_index import build_vector_index
+from record_store import RecordStore
+
+def initialize_chroma_db(reset: bool = False, embedding_function=None):
+    """
+    ChromaDB 초기화 및 데이터 로딩
 
-def initialize_chroma_db():
-    """ChromaDB 초기화 및 데이터 로딩"""
+    Args:
+        reset: True면 기존 데이터베이스를 삭제하고 새로 시작, False(기본값)면 기존 데이터를 유지 (증분 로딩)
+        embedding_function: 컬렉션에 사용할 임베딩 함수 (None이면 공유 Upstage 임베딩 함수)
+    """
     import shutil
+
+    if embedding_function is None:
+        embedding_function = get_embedding_function()
     
     # 기존 ChromaDB 데이터베이스 삭제 (스키마 충돌 방지)
-    chroma_db_path = "./chroma_db"
-    if os.path.exists(chroma_db_path):
+    chroma_db_path = CHROMA_DB_PATH
+    if reset and os.path.exists(chroma_db_path):
         print("🔄 기존 ChromaDB 데이터베이스 삭제 중...")
         shutil.rmtree(chroma_db_path)
     
@@ -75,8 +63,8 @@ def initialize_chroma_db():
     
     try:
         collection = client.get_or_create_collection(
-            name="visitjeju",
-            embedding_function=UpstageEmbeddingFunction(passage_embedder)
+            name=COLLECTION_NAME,
+            embedding_function=embedding_function
         )
         print("✅ ChromaDB 컬렉션 생성 완료")
     except Exception as e:
@@ -85,99 +73,120 @@ def initialize_chroma_db():
     
     return client, collection
 
-def load_data_to_chroma(collection):
-    """JSON 데이터를 ChromaDB에 로딩"""
-    # 5. 파일-카테고리 매핑
-    category_map = {
-        "data/visitjeju_food.json": "음식",
-        "data/visitjeju_hotel.json": "숙소", 
-        "data/visitjeju_tour.json": "관광지",
-        "data/visitjeju_event.json": "행사"
-    }
+def load_data_to_chroma(collection, incremental: bool = True, embedding_function=None,
+                        pipelined: bool = INGEST_PIPELINE):
+    """
+    JSON 데이터를 ChromaDB에 로딩
+
+    매니페스트에 기록된 해시와 비교하여 변경된 행만 upsert하고, 사라진 행은 삭제합니다.
+    배치마다 매니페스트가 기록되므로 중간에 중단되면 다시 실행해 이어서 진행할 수 있습니다.
+
+    Args:
+        collection: ChromaDB 컬렉션
+        incremental: False면 매니페스트를 비우고 전체 행을 다시 저장 (기본값은 변경된 행만 저장)
+        embedding_function: 문서 임베딩 함수 (None이면 공유 Upstage 임베딩 함수)
+        pipelined: True면 읽기/임베딩/저장을 겹쳐 실행하는 파이프라인 사용
+
+    Returns:
+        파이프라인 적재 통계 (순차 적재면 None)
+    """
+    if embedding_function is None:
+        embedding_function = get_embedding_function()
+
+    store = RecordStore()
+    manifest = IngestManifest(store)
+    if not incremental or (manifest.count() and (collection.count() == 0 or store.count() == 0)):
+        # 전체 로딩이거나 매니페스트가 컬렉션/레코드 저장소와 맞지 않으면 처음부터
+        manifest.reset()
+
+    if pipelined:
+        stats = run_pipeline(
+            collection,
+            embedding_function,
+            manifest,
+            category_map=CATEGORY_MAP,
+            batch_size=INGEST_BATCH_SIZE,
+            store=store
+        )
+        print(
+            f"✅ 저장 {stats['upserted']}개, 변경 없음 {stats['skipped']}개, "
+            f"삭제 {stats['deleted']}개, 실패 {stats['failed']}개 ({stats['seconds']:.1f}초)"
+        )
+        for name, stage in stats["stages"].items():
+            print(
+                f"   ⏱ {name}: {stage['rows']}행, {stage['rows_per_busy_sec']}행/초 "
+                f"(busy {stage['busy_seconds']}초)"
+            )
+        build_search_indexes(collection, store)
+        print("📊 ChromaDB 데이터 로딩 완료!")
+        return stats
 
     # 6. 파일 순회하며 임베딩 및 저장
-    for filename, category in category_map.items():
+    for filename, category in CATEGORY_MAP.items():
         if not os.path.exists(filename):
             print(f"⚠️  {filename} 파일이 존재하지 않습니다.")
             continue
             
         try:
-            df = pd.read_json(filename)
+            # 레코드를 스트리밍으로 읽어 배치 단위로 document/metadata 구성
+            with tqdm(desc=f"📂 {filename} 처리 중", unit="행") as progress:
+                stats = sync_collection(
+                    collection,
+                    iter_row_batches(filename, category, INGEST_BATCH_SIZE),
+                    manifest,
+                    embedding_function,
+                    batch_size=INGEST_BATCH_SIZE,
+                    scope=f"{category}_",
+                    progress=progress,
+                    store=store
+                )
         except Exception as e:
             print(f"❌ {filename} 로딩 실패: {e}")
             continue
 
-        ids, documents, metadatas = [], [], []
-
-        for i, row in tqdm(df.iterrows(), total=df.shape[0], desc=f"📂 {filename} 처리 중"):
-            try:
-                metadata = row.to_dict()
-
-                # 카테고리별 document 구성
-                if category == "음식":
-                    content = (
-                        f"카테고리: 음식 "
-                        f"이름: {row.get('이름', '')} "
-                        f"주소: {row.get('주소', '')} "
-                        f"소개: {row.get('소개', '')} "
-                        f"태그: {row.get('태그', '')} "
-                    )
-                elif category == "숙소":
-                    content = (
-                        f"카테고리: 숙소 "
-                        f"이름: {row.get('이름', '')} "
-                        f"주소: {row.get('주소', '')} "
-                        f"전화번호: {row.get('전화번호', '')} "
-                        f"소개: {row.get('소개', '')}"
-                        f"태그: {row.get('태그', '')} "
-                    )
-                elif category == "관광지":
-                    content = (
-                        f"카테고리: 관광지 "
-                        f"이름: {row.get('이름', '')} "
-                        f"주소: {row.get('주소', '')} "
-                        f"전화번호: {row.get('전화번호', '')} "
-                        f"소개: {row.get('소개', '')}"
-                        f"태그: {row.get('태그', '')} "
-                    )
-                elif category == "행사":
-                    content = (
-                        f"카테고리: 행사 "
-                        f"이름: {row.get('title', '')} "
-                        f"주소: {row.get('roadaddress', '')} "
-                        f"태그: {row.get('alltag', '')} "
-                        f"소개: {row.get('introduction', '')}"
-                    )
-                else:
-                    content = "카테고리 정보 없음"
-
-                ids.append(f"{category}_{i}")
-                documents.append(content)
-                metadatas.append({**metadata, "category": category, **{key: value if value is not None else '' for key, value in metadata.items()}})
-            except Exception as e:
-                print(f"{i}번째 행 처리 중 오류: {e}")
-                continue
-
-        # 배치 단위로 저장
-        batch_size = 100
-        for batch_start in range(0, len(ids), batch_size):
-            batch_end = batch_start + batch_size
-            try:
-                collection.add(
-                    ids=ids[batch_start:batch_end],
-                    documents=documents[batch_start:batch_end],
-                    metadatas=metadatas[batch_start:batch_end]
-                )
-                print(f"✅ {filename} → {batch_start}~{batch_end}번 저장 완료")
-            except Exception as e:
-                print(f"❌ {filename} → {batch_start}~{batch_end} 저장 실패: {e}")
+        print(
+            f"✅ {filename} → 저장 {stats['upserted']}개, 변경 없음 {stats['skipped']}개, "
+            f"삭제 {stats['deleted']}개, 실패 {stats['failed']}개"
+        )
     
+    build_search_indexes(collection, store)
     print("📊 ChromaDB 데이터 로딩 완료!")
+    return None
+
+def build_search_indexes(collection, store):
+    """레코드 저장소 전체로 BM25 어휘 색인, 질문 의도 라우터, 지역/태그 색인 재생성 (임베딩 없이 몇 초면 끝남)
+    numpy 검색 백엔드를 쓰면 컬렉션 임베딩을 메모리 맵 행렬로 내보냄"""
+    import time
+
+    started = time.perf_counter()
+    index = build_lexical_index(store)
+    print(f"🔤 어휘 색인 생성 완료: 문서 {len(index)}개, 토큰 {len(index.terms)}종 "
+          f"({time.perf_counter() - started:.1f}초)")
+
+    started = time.perf_counter()
+    router = build_intent_router(collection, store, list(dict.fromkeys(CATEGORY_MAP.values())))
+    print(f"🧭 의도 라우터 생성 완료: 키워드 {len(router.lexicon)}개, "
+          f"프로토타입 {len(router.prototype_categories)}개 ({time.perf_counter() - started:.1f}초)")
+
+    started = time.perf_counter()
+    regions = build_region_index(store)
+    print(f"🗺️ 지역 색인 생성 완료: 지역 {len(regions.paths)}곳, 별칭 {len(regions.aliases)}개 "
+          f"({time.perf_counter() - started:.1f}초)")
+
+    started = time.perf_counter()
+    tags = build_tag_index(store)
+    print(f"🏷️ 태그 색인 생성 완료: 태그 {len(tags.bitmaps)}개 ({time.perf_counter() - started:.1f}초)")
+
+    if VECTOR_BACKEND == "numpy":
+        started = time.perf_counter()
+        vectors = build_vector_index(collection)
+        print(f"🧮 벡터 색인 생성 완료: {vectors.vectors.shape[0]}행 × {vectors.vectors.shape[1]}차원 "
+              f"{vectors.vectors.dtype} ({time.perf_counter() - started:.1f}초)")
 
 def search_chroma_db(collection, query_text, n_results=5):
     """ChromaDB에서 검색 수행"""
     try:
-        query_embedding = query_embedder.embed_query(query_text)
+        query_embedding = get_embedding_function().embed_query(query_text)
         results = collection.query(
             query_embeddings=[query_embedding],
             n_results=n_results
@@ -187,16 +196,30 @@ def search_chroma_db(collection, query_text, n_results=5):
         raise RuntimeError(f"ChromaDB 검색 중 오류 발생: {e}")
 
 if __name__ == "__main__":
-    # 데이터 초기화 실행
-    client, collection = initialize_chroma_db()
-    load_data_to_chroma(collection)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ChromaDB에 데이터를 로딩하고 예시 검색을 실행합니다.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="기존 데이터베이스를 삭제하고 전체를 다시 임베딩 (기본값: 변경된 행만 증분 로딩)"
+    )
+    args = parser.parse_args()
+
+    # 데이터 초기화 실행 (기본값은 행 해시 매니페스트로 변경된 행만 임베딩)
+    client, collection = initialize_chroma_db(reset=args.full)
+    load_data_to_chroma(collection, incremental=not args.full)
     
     # 테스트 쿼리
     test_query = "제주 감성 카페 추천해줘"
     results = search_chroma_db(collection, test_query)
     
+    # compact 모드에서는 원본 레코드를 레코드 저장소에서 조회
+    records = RecordStore().get_many(results['ids'][0])
+    
     print(f"\n🔍 '{test_query}' 검색 결과:")
-    for i, metadata in enumerate(results.get('metadatas', [[]])[0]):
+    for i, (row_id, metadata) in enumerate(zip(results['ids'][0], results.get('metadatas', [[]])[0])):
+        metadata = records.get(row_id, metadata)
         print(f"[{i+1}] {metadata.get('이름', metadata.get('title', '제목 없음'))} ({metadata.get('category', '카테고리 없음')})")
         print(f"📍 주소: {metadata.get('주소', metadata.get('roadaddress', '없음'))}")
         print(f"📞 전화번호: {metadata.get('전화번호', '없음')}")
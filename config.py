@@ -0,0 +1,145 @@
+import os
+from dotenv import load_dotenv
+
+# .env 값도 설정에 반영되도록 먼저 로딩
+load_dotenv()
+
+# ChromaDB 저장 위치 및 컬렉션 이름
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+COLLECTION_NAME = os.getenv("CHROMA_COLLECTION", "visitjeju")
+
+# 예전 JSON 증분 로딩 매니페스트 (있으면 레코드 저장소의 row_hashes 테이블로 옮긴 뒤 삭제)
+MANIFEST_FILENAME = "ingest_manifest.json"
+
+# 파일-카테고리 매핑
+DATA_DIR = os.getenv("DATA_DIR", "data")
+CATEGORY_MAP = {
+    f"{DATA_DIR}/visitjeju_food.json": "음식",
+    f"{DATA_DIR}/visitjeju_hotel.json": "숙소",
+    f"{DATA_DIR}/visitjeju_tour.json": "관광지",
+    f"{DATA_DIR}/visitjeju_event.json": "행사"
+}
+
+# 배치 크기 (ChromaDB 저장 단위)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+# 파이프라인 적재: 단계 사이 큐 크기(배치 수), false면 순차 적재
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+INGEST_PIPELINE = os.getenv("INGEST_PIPELINE", "true").lower() == "true"
+
+# Upstage 임베딩 설정 (-passage / -query 접미사는 용도에 따라 붙음)
+# EMBEDDING_BACKEND=hash 이면 API 호출 없이 해시 기반 결정적 벡터 사용 (벤치마크/오프라인용)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "upstage")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "4096"))  # solar-embedding-1-large 차원
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "solar-embedding-1-large")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))  # 요청당 텍스트 수 (Upstage 최대 100)
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))  # 동시 요청 수
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+EMBED_BACKOFF_SECONDS = float(os.getenv("EMBED_BACKOFF_SECONDS", "1.0"))
+
+# 임베딩 디스크 캐시 (적재/질문 임베딩 공용)
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./embedding_cache/embeddings.sqlite3")
+EMBED_CACHE_MAX_MB = float(os.getenv("EMBED_CACHE_MAX_MB", "512"))
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float32")  # float16이면 캐시 크기 절반 (새로 만든 임베딩도 같은 정밀도로 맞춤)
+EMBED_CACHE_ACCESS_FLUSH_SECONDS = float(os.getenv("EMBED_CACHE_ACCESS_FLUSH_SECONDS", "60"))  # 조회 시각을 모아 기록하는 주기
+
+# 메타데이터 모드: compact면 필터용 필드(category, region, tags)만 ChromaDB에 저장하고
+# 원본 레코드는 같은 디렉토리의 레코드 저장소(SQLite)에 보관, full이면 모든 필드를 메타데이터로 저장
+METADATA_MODE = os.getenv("METADATA_MODE", "compact")
+RECORD_STORE_FILENAME = "records.sqlite3"
+
+# 답변 캐시: (모델, 프롬프트 버전, 대화 지문)이 같고 질문 임베딩 코사인 유사도가 임계값 이상이면
+# 검색과 생성을 건너뛰고 이전 답변을 재사용
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+
+# 검색 방식: dense(벡터), lexical(문자 n-gram BM25), hybrid(두 결과를 RRF로 결합)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+LEXICAL_INDEX_FILENAME = "lexical_index.npz"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # 방식별로 가져올 후보 수
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# 질문 의도 라우터: 예측한 카테고리 누적 확률이 ROUTER_CONFIDENCE 이상이면 category 필터로 검색
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+ROUTER_CONFIDENCE = float(os.getenv("ROUTER_CONFIDENCE", "0.6"))
+ROUTER_LEXICON_MIN_COUNT = int(os.getenv("ROUTER_LEXICON_MIN_COUNT", "3"))  # 사전에 넣을 태그 최소 출현 수
+ROUTER_LEXICON_MIN_SHARE = float(os.getenv("ROUTER_LEXICON_MIN_SHARE", "0.8"))  # 한 카테고리 최소 비율
+ROUTER_PROTOTYPE_SAMPLE = int(os.getenv("ROUTER_PROTOTYPE_SAMPLE", "500"))  # 카테고리당 평균낼 문서 수
+INTENT_ROUTER_FILENAME = "intent_router.json"
+ROUTER_OVERSAMPLE = int(os.getenv("ROUTER_OVERSAMPLE", "4"))  # 필터 없이 가져와 거를 후보 배수
+
+# 검색 백엔드: chroma(ChromaDB 컬렉션) 또는 numpy(정규화 임베딩 메모리 맵 행렬, 적재 후 자동 생성)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+VECTOR_INDEX_FILENAME = "vectors.npy"
+VECTOR_INDEX_DTYPE = os.getenv("VECTOR_INDEX_DTYPE", "float32")  # float16이면 디스크/페이지 캐시 절반
+
+# 지역 색인: 질문에 지역(시/읍·면/동·리)이 나오면 해당 지역 문서만 검색
+REGION_FILTER_ENABLED = os.getenv("REGION_FILTER_ENABLED", "true").lower() == "true"
+REGION_MIN_IDS = int(os.getenv("REGION_MIN_IDS", "10"))  # 문서가 이보다 적은 동·리는 읍·면으로 넓힘
+REGION_INDEX_FILENAME = "region_index.json"
+
+# 태그 비트맵 색인: 질문 단어 중 태그와 일치하는 단어로 후보를 미리 거름 (너무 흔한 태그는 제외)
+TAG_FILTER_ENABLED = os.getenv("TAG_FILTER_ENABLED", "true").lower() == "true"
+TAG_MAX_SHARE = float(os.getenv("TAG_MAX_SHARE", "0.2"))  # 전체 문서 대비 이 비율보다 많이 붙은 태그는 무시
+TAG_INDEX_FILENAME = "tag_index.npz"
+
+# MMR 재순위: 후보를 넉넉히 가져와 관련도와 다양성(서로 비슷한 결과 배제)을 함께 고려해 고름
+MMR_ENABLED = os.getenv("MMR_ENABLED", "true").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1이면 관련도만, 0이면 다양성만
+MMR_POOL_SIZE = int(os.getenv("MMR_POOL_SIZE", "20"))  # 재순위 전에 가져올 후보 수
+
+# 일정형 질문("2박3일 가족여행, 맛집·숙소·관광지")은 카테고리별 하위 질문으로 나눠 한 번에 검색
+QUERY_DECOMPOSITION_ENABLED = os.getenv("QUERY_DECOMPOSITION_ENABLED", "true").lower() == "true"
+ITINERARY_RESULTS_PER_QUERY = int(os.getenv("ITINERARY_RESULTS_PER_QUERY", "2"))  # 하위 질문별 결과 수
+
+# Ollama 서버 주소 (없으면 ollama 라이브러리 기본값 http://localhost:11434)
+OLLAMA_HOST = os.getenv("OLLAMA_HOST") or None
+
+# 프롬프트 토큰 예산: 모델별 컨텍스트 창(Ollama num_ctx로도 전달)에서 답변용 토큰을 뺀 만큼만 프롬프트에 사용
+MODEL_CONTEXT_WINDOWS = {
+    "gemma3:4b": 8192, "gemma3:1b": 8192, "gemma:2b": 8192, "gemma:7b": 8192,
+    "llama2": 4096, "llama2:7b": 4096, "mistral": 8192, "codellama": 16384
+}
+DEFAULT_CONTEXT_WINDOW = int(os.getenv("DEFAULT_CONTEXT_WINDOW", "4096"))  # 목록에 없는 모델
+CONTEXT_RESPONSE_RESERVE = int(os.getenv("CONTEXT_RESPONSE_RESERVE", "1024"))  # 답변 생성용으로 남겨 둘 토큰
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "approx")  # approx 또는 tiktoken:<인코딩 이름>
+CONTEXT_DESCRIPTION_TOKENS = int(os.getenv("CONTEXT_DESCRIPTION_TOKENS", "120"))  # 장소 설명 최대 토큰
+CONTEXT_HISTORY_TURN_TOKENS = int(os.getenv("CONTEXT_HISTORY_TURN_TOKENS", "300"))  # 이전 답변 1개 최대 토큰
+CONTEXT_RETRIEVAL_SHARE = float(os.getenv("CONTEXT_RETRIEVAL_SHARE", "0.6"))  # 시스템 프롬프트를 뺀 예산 중 검색 결과 몫
+
+# 대화 메모리: 최근 턴만 링 버퍼로 보관하고, 오래된 턴은 작은 모델이 백그라운드에서 누적 요약으로 압축
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "12"))  # 원문으로 보관할 최대 턴 수
+MEMORY_SUMMARY_ENABLED = os.getenv("MEMORY_SUMMARY_ENABLED", "true").lower() == "true"
+MEMORY_SUMMARY_EVERY = int(os.getenv("MEMORY_SUMMARY_EVERY", "4"))  # 요약되지 않은 턴이 이만큼 쌓이면 요약 갱신
+MEMORY_SUMMARY_MODEL = os.getenv("MEMORY_SUMMARY_MODEL", "gemma3:1b")  # 요약용 작은 모델 (빈 값이면 답변 모델)
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "200"))  # 요약 최대 토큰
+
+# Ollama 모델 상주 관리: 선택한 모델을 미리 올리고 keep_alive를 주기적으로 갱신
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # 마지막 요청 후 모델을 메모리에 유지할 시간
+OLLAMA_PING_SECONDS = int(os.getenv("OLLAMA_PING_SECONDS", "240"))  # 유휴 중 keep-alive 갱신 주기 (0이면 끔)
+OLLAMA_PING_IDLE_SECONDS = int(os.getenv("OLLAMA_PING_IDLE_SECONDS", "3600"))  # 이 시간 동안 질문이 없으면 갱신 중단
+OLLAMA_PS_CACHE_SECONDS = float(os.getenv("OLLAMA_PS_CACHE_SECONDS", "10"))  # 상주 모델 목록(/api/ps) 재사용 시간
+OLLAMA_PREWARM_ENABLED = os.getenv("OLLAMA_PREWARM_ENABLED", "false").lower() == "true"  # 다음에 고를 모델 미리 올리기
+
+# 추론 스케줄러: 프로세스 전체에서 Ollama 동시 요청 수를 제한하고 세션별로 번갈아 처리
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))  # Ollama OLLAMA_NUM_PARALLEL과 맞추기
+
+# 질문 유형별 모델/프롬프트: 장소 정보 조회(lookup)는 작은 모델, 짧은 추천(recommend)과 일정(itinerary)은 선택한 모델
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+MODEL_TIERS = {  # 빈 값이면 사이드바에서 선택한 모델
+    "lookup": os.getenv("MODEL_TIER_LOOKUP", "gemma3:1b"),
+    "recommend": os.getenv("MODEL_TIER_RECOMMEND", ""),
+    "itinerary": os.getenv("MODEL_TIER_ITINERARY", "")
+}
+PROMPT_VARIANTS = {"lookup": "prompt_lookup.txt", "recommend": "prompt_recommend.txt", "itinerary": "prompt.txt"}
+DIRECT_ANSWER_ENABLED = os.getenv("DIRECT_ANSWER_ENABLED", "true").lower() == "true"  # 주소/전화번호는 LLM 없이 답변
+
+# 답변 생성 마감 시간: 첫 토큰/토큰 사이/전체 시간을 넘기면 생성을 취소하고 검색 결과로 만든 안내 답변으로 대체
+GENERATION_FIRST_TOKEN_SECONDS = float(os.getenv("GENERATION_FIRST_TOKEN_SECONDS", "45"))  # 스케줄러 대기 포함
+GENERATION_STALL_SECONDS = float(os.getenv("GENERATION_STALL_SECONDS", "20"))  # 토큰 사이 최대 간격
+GENERATION_DEADLINE_SECONDS = float(os.getenv("GENERATION_DEADLINE_SECONDS", "180"))  # 한 턴 전체
+# 헤지: 차례를 받은 뒤 첫 토큰이 이만큼 늦으면 작은 모델로 같은 요청을 하나 더 보내 먼저 답하는 쪽 사용 (0이면 끔)
+GENERATION_HEDGE_AFTER_SECONDS = float(os.getenv("GENERATION_HEDGE_AFTER_SECONDS", "10"))
+GENERATION_FALLBACK_MODEL = os.getenv("GENERATION_FALLBACK_MODEL", "gemma3:1b")  # 헤지/오류 재시도 모델 (빈 값이면 끔)
@@ -0,0 +1,265 @@
+import math
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import (
+    CONTEXT_DESCRIPTION_TOKENS, CONTEXT_HISTORY_TURN_TOKENS, CONTEXT_RESPONSE_RESERVE,
+    CONTEXT_RETRIEVAL_SHARE, CONTEXT_TOKENIZER, DEFAULT_CONTEXT_WINDOW, MODEL_CONTEXT_WINDOWS
+)
+from documents import normalize_tags
+
+# 토큰 수 계산 함수: 문자열 → 토큰 수
+Tokenizer = Callable[[str], int]
+
+_CJK = re.compile(r"[ㄱ-ㆎ가-힣一-鿿]")
+_SPACE = re.compile(r"\s+")
+
+# 자른 텍스트 끝에 붙이는 표시
+ELLIPSIS = "…"
+
+
+def approx_token_count(text: str) -> int:
+    """
+    토크나이저 없이 토큰 수 추정 (SentencePiece 계열 모델 근사)
+
+    한글/한자는 글자당 약 0.8토큰, 그 밖의 공백이 아닌 문자는 약 3.5자당 1토큰으로 계산합니다.
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    other = len(_SPACE.sub("", text)) - cjk
+    return math.ceil(cjk * 0.8 + other / 3.5)
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(name: str = CONTEXT_TOKENIZER) -> Tokenizer:
+    """
+    설정된 토큰 수 계산 함수 반환
+
+    Args:
+        name: "approx" 또는 "tiktoken:<인코딩 이름>" (tiktoken이 없으면 approx 사용)
+
+    Returns:
+        문자열 → 토큰 수 함수
+    """
+    if name.startswith("tiktoken:"):
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding(name.split(":", 1)[1])
+            return lambda text: len(encoding.encode(text or ""))
+        except Exception as e:
+            print(f"⚠️ {name} 토크나이저를 불러오지 못해 근사 계산을 사용합니다: {e}")
+    elif name != "approx":
+        print(f"⚠️ 지원하지 않는 토크나이저입니다: {name} (근사 계산 사용)")
+    return approx_token_count
+
+
+def context_window(model_name: str) -> int:
+    """모델의 컨텍스트 창 크기 (목록에 없으면 DEFAULT_CONTEXT_WINDOW)"""
+    return MODEL_CONTEXT_WINDOWS.get(model_name, DEFAULT_CONTEXT_WINDOW)
+
+
+def prompt_budget(model_name: str) -> int:
+    """프롬프트에 쓸 수 있는 토큰 수 (컨텍스트 창 - 답변용 예약)"""
+    window = context_window(model_name)
+    return max(window // 2, window - CONTEXT_RESPONSE_RESERVE)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, count: Tokenizer) -> str:
+    """
+    max_tokens 이하가 되도록 텍스트 뒤쪽을 자르고 "…" 붙이기 (길이는 이분 탐색)
+
+    Args:
+        text: 원본 텍스트
+        max_tokens: 최대 토큰 수
+        count: 토큰 수 계산 함수
+
+    Returns:
+        잘린 텍스트 (이미 짧으면 그대로, max_tokens가 0 이하면 빈 문자열)
+    """
+    text = str(text or "")
+    if max_tokens <= 0:
+        return ""
+    if count(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count(text[:middle] + ELLIPSIS) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + ELLIPSIS if low else ""
+
+
+class ContextBuilder:
+    def __init__(self, budget: int, tokenizer: Optional[Tokenizer] = None,
+                 description_tokens: int = CONTEXT_DESCRIPTION_TOKENS,
+                 history_turn_tokens: int = CONTEXT_HISTORY_TURN_TOKENS,
+                 retrieval_share: float = CONTEXT_RETRIEVAL_SHARE):
+        """
+        토큰 예산 안에서 검색 결과와 이전 대화로 프롬프트 구성
+
+        이전 대화는 시스템 프롬프트를 뺀 예산 중 (1 - retrieval_share)까지 쓰고,
+        검색 결과는 시스템 프롬프트/이전 대화/현재 질문을 뺀 나머지를 모두 씁니다.
+        장소 설명과 이전 대화는 길이 제한만큼 자르고, 태그 중복과 관련도 점수는 넣지 않습니다.
+
+        Args:
+            budget: 프롬프트 전체 토큰 예산
+            tokenizer: 토큰 수 계산 함수 (None이면 CONTEXT_TOKENIZER)
+            description_tokens: 장소 설명 최대 토큰
+            history_turn_tokens: 이전 대화 한 턴의 질문/답변 각각 최대 토큰
+            retrieval_share: 시스템 프롬프트를 뺀 예산 중 검색 결과 몫 (나머지가 이전 대화 상한)
+        """
+        self.budget = budget
+        self.count = tokenizer or get_tokenizer()
+        self.description_tokens = description_tokens
+        self.history_turn_tokens = history_turn_tokens
+        self.retrieval_share = retrieval_share
+
+    def format_item(self, index: int, info: Dict, description_tokens: Optional[int] = None) -> str:
+        """
+        검색 결과 한 건을 컨텍스트 항목으로 (설명은 description_tokens로 자르고, 0이면 생략)
+
+        Args:
+            index: 항목 번호
+            info: 원본 레코드로 채워진 검색 결과
+            description_tokens: 설명 최대 토큰 (None이면 기본값)
+
+        Returns:
+            항목 문자열
+        """
+        description_tokens = self.description_tokens if description_tokens is None else description_tokens
+        lines = [f"{index}. {info['name']} ({info['category']})", f"   📍 주소: {info['address']}"]
+        if info.get('phone') and info['phone'] != '전화번호 없음':
+            lines.append(f"   📞 전화번호: {info['phone']}")
+        tags = normalize_tags(info.get('tags')) if info.get('tags') != '태그 없음' else []
+        if tags:
+            lines.append(f"   🏷 태그: {', '.join(tags)}")
+        description = truncate_to_tokens(info.get('description'), description_tokens, self.count)
+        if description and description != '설명 없음':
+            lines.append(f"   💬 설명: {description}")
+        return "\n".join(lines) + "\n\n"
+
+    def format_context(self, relevant_info: Sequence[Dict], budget: Optional[int] = None) -> Tuple[str, int]:
+        """
+        검색 결과를 예산 안에서 컨텍스트로 (순위가 높은 항목부터, 들어가지 않으면 설명을 빼고 다시 시도)
+
+        Args:
+            relevant_info: 원본 레코드로 채워진 검색 결과 리스트
+            budget: 최대 토큰 (None이면 제한 없음)
+
+        Returns:
+            (컨텍스트 문자열, 포함된 항목 수)
+        """
+        if not relevant_info:
+            return "관련 정보를 찾을 수 없습니다.", 0
+        context = "=== 제주도 관련 정보 ===\n\n"
+        remaining = math.inf if budget is None else budget - self.count(context)
+        included = 0
+        for info in relevant_info:
+            for description_tokens in (self.description_tokens, 0):
+                item = self.format_item(included + 1, info, description_tokens)
+                tokens = self.count(item)
+                if tokens <= remaining:
+                    context += item
+                    remaining -= tokens
+                    included += 1
+                    break
+            else:
+                break
+        return context, included
+
+    def history_messages(self, history: Sequence[tuple]) -> List[Dict]:
+        """
+        이전 대화를 user/assistant 메시지로 (질문/답변은 각각 history_turn_tokens로 자름)
+
+        같은 턴은 항상 같은 문자열이 되므로 이전 대화가 매 턴 동일한 접두어로 유지됩니다.
+
+        Args:
+            history: (사용자 메시지, 챗봇 메시지) 리스트 (오래된 순)
+
+        Returns:
+            Ollama 메시지 리스트
+        """
+        messages = []
+        for user_msg, bot_msg in history:
+            messages.append({'role': 'user', 'content': truncate_to_tokens(user_msg, self.history_turn_tokens, self.count)})
+            messages.append({'role': 'assistant', 'content': truncate_to_tokens(bot_msg, self.history_turn_tokens, self.count)})
+        return messages
+
+    @staticmethod
+    def system_content(system_prompt: str, summary: str = "") -> str:
+        """시스템 프롬프트 뒤에 이전 대화 요약 붙이기 (요약이 갱신될 때만 바뀌므로 접두어 유지)"""
+        if not summary:
+            return system_prompt
+        return f"{system_prompt}\n\n=== 이전 대화 요약 ===\n{summary}"
+
+    def history_budget(self, system_prompt: str) -> int:
+        """이전 대화에 쓸 토큰 (시스템 프롬프트를 뺀 예산 중 검색 결과 몫을 제외한 나머지)"""
+        return int(max(0, self.budget - self.count(system_prompt)) * (1 - self.retrieval_share))
+
+    def history_start(self, history: Sequence[tuple], start: int, budget: int) -> int:
+        """
+        예산 안에 들어가도록 이전 대화의 시작 위치를 앞으로 옮기기
+
+        한 턴씩 밀면 매 턴 접두어가 바뀌므로, 넘칠 때마다 남은 턴의 절반을 한꺼번에 버립니다.
+
+        Args:
+            history: 전체 대화 (오래된 순)
+            start: 현재 시작 위치
+            budget: 이전 대화 토큰 예산
+
+        Returns:
+            새 시작 위치
+        """
+        start = min(start, len(history))
+        while start < len(history):
+            messages = self.history_messages(history[start:])
+            if sum(self.count(message['content']) for message in messages) <= budget:
+                break
+            start += max(1, (len(history) - start) // 2)
+        return start
+
+    def build(self, system_prompt: str, relevant_info: Sequence[Dict], history: Sequence[tuple],
+              user_input: str, summary: str = "") -> Tuple[List[Dict], Dict]:
+        """
+        예산에 맞춰 Ollama 메시지 구성
+
+        시스템 프롬프트(+ 이전 대화 요약) → 이전 대화(user/assistant) → 이번 턴(검색 결과 + 질문) 순서로 두어
+        앞부분이 턴마다 그대로 유지되게 하고(Ollama KV 캐시 재사용), 매번 달라지는 검색 결과는 맨 뒤에 둡니다.
+
+        Args:
+            system_prompt: 시스템 프롬프트
+            relevant_info: 원본 레코드로 채워진 검색 결과 리스트
+            history: 프롬프트에 넣을 이전 대화 (오래된 순, history_start로 자른 것)
+            user_input: 현재 질문
+            summary: 버퍼에서 빠진 이전 대화의 누적 요약
+
+        Returns:
+            (메시지 리스트, 섹션별 토큰 사용량)
+        """
+        system_prompt = self.system_content(system_prompt, summary)
+        question = f"사용자 질문: {user_input}"
+        history_messages = self.history_messages(history)
+        history_tokens = sum(self.count(message['content']) for message in history_messages)
+        fixed = self.count(system_prompt) + self.count(question) + history_tokens
+        context, items = self.format_context(relevant_info, max(0, self.budget - fixed))
+
+        messages = [{'role': 'system', 'content': system_prompt}]
+        messages.extend(history_messages)
+        messages.append({'role': 'user', 'content': f"{context}\n\n{question}"})
+
+        usage = {
+            "budget": self.budget,
+            "system": self.count(system_prompt),
+            "context": self.count(context),
+            "history": history_tokens,
+            "question": self.count(question),
+            "items": f"{items}/{len(relevant_info)}",
+            "turns": len(history),
+            "summary": self.count(summary)
+        }
+        usage["total"] = usage["system"] + usage["context"] + usage["history"] + usage["question"]
+        return messages, usage
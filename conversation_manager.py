@@ -1,7 +1,7 @@
 import json
 import os
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import streamlit as st
 
 class ConversationManager:
@@ -197,6 +197,22 @@ class ConversationManager:
             return "Unknown"
 
 # Streamlit과 통합하는 헬퍼 함수들
+def session_history(messages: List[Dict]) -> List[Tuple[str, str]]:
+    """
+    Streamlit 메시지를 (사용자, 챗봇) 튜플 리스트로 변환 (답변을 끝내지 못한 턴은 제외)
+    
+    Args:
+        messages: st.session_state.messages
+        
+    Returns:
+        저장/내보내기용 대화 기록
+    """
+    conversation_history = []
+    for i in range(0, len(messages), 2):
+        if i + 1 < len(messages) and not messages[i + 1].get('failed'):
+            conversation_history.append((messages[i]['content'], messages[i + 1]['content']))
+    return conversation_history
+
 def create_conversation_sidebar(conversation_manager: ConversationManager):
     """
     Streamlit 사이드바에 대화 기록 관리 UI 생성
@@ -209,13 +225,7 @@ def create_conversation_sidebar(conversation_manager: ConversationManager):
     # 현재 대화 저장
     if st.sidebar.button("💾 현재 대화 저장"):
         if 'messages' in st.session_state and st.session_state.messages:
-            # Streamlit 메시지를 튜플 형태로 변환
-            conversation_history = []
-            for i in range(0, len(st.session_state.messages), 2):
-                if i + 1 < len(st.session_state.messages):
-                    user_msg = st.session_state.messages[i]['content']
-                    bot_msg = st.session_state.messages[i + 1]['content']
-                    conversation_history.append((user_msg, bot_msg))
+            conversation_history = session_history(st.session_state.messages)
             
             try:
                 filepath = conversation_manager.save_conversation(conversation_history)
@@ -263,13 +273,7 @@ def create_conversation_sidebar(conversation_manager: ConversationManager):
     # 대화 기록 내보내기
     if st.sidebar.button("📤 대화 기록 내보내기"):
         if 'messages' in st.session_state and st.session_state.messages:
-            # Streamlit 메시지를 튜플 형태로 변환
-            conversation_history = []
-            for i in range(0, len(st.session_state.messages), 2):
-                if i + 1 < len(st.session_state.messages):
-                    user_msg = st.session_state.messages[i]['content']
-                    bot_msg = st.session_state.messages[i + 1]['content']
-                    conversation_history.append((user_msg, bot_msg))
+            conversation_history = session_history(st.session_state.messages)
             
             text_content = conversation_manager.export_conversation_text(conversation_history)
             
@@ -290,12 +294,6 @@ def auto_save_session(conversation_manager: ConversationManager):
         conversation_manager: ConversationManager 인스턴스
     """
     if 'messages' in st.session_state and st.session_state.messages:
-        # Streamlit 메시지를 튜플 형태로 변환
-        conversation_history = []
-        for i in range(0, len(st.session_state.messages), 2):
-            if i + 1 < len(st.session_state.messages):
-                user_msg = st.session_state.messages[i]['content']
-                bot_msg = st.session_state.messages[i + 1]['content']
-                conversation_history.append((user_msg, bot_msg))
+        conversation_history = session_history(st.session_state.messages)
         
         conversation_manager.auto_save_conversation(conversation_history) 
\ No newline at end of file
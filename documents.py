@@ -0,0 +1,251 @@
+import hashlib
+import json
+import re
+from typing import Dict, Iterator, List, Tuple
+
+from config import INGEST_BATCH_SIZE, METADATA_MODE
+
+# 카테고리별 document 템플릿: (라벨, 후보 필드들) 순서대로 렌더링
+# 후보 필드는 앞에서부터 값이 있는 첫 번째 필드를 사용 (행사 데이터는 예전 필드명도 지원)
+CATEGORY_TEMPLATES = {
+    "음식": [
+        ("이름", ("이름",)),
+        ("주소", ("주소",)),
+        ("소개", ("소개",)),
+        ("태그", ("태그",)),
+    ],
+    "숙소": [
+        ("이름", ("이름",)),
+        ("주소", ("주소",)),
+        ("전화번호", ("전화번호",)),
+        ("소개", ("소개",)),
+        ("태그", ("태그",)),
+    ],
+    "관광지": [
+        ("이름", ("이름",)),
+        ("주소", ("주소",)),
+        ("전화번호", ("전화번호",)),
+        ("소개", ("소개",)),
+        ("태그", ("태그",)),
+    ],
+    "행사": [
+        ("이름", ("이름", "title")),
+        ("주소", ("주소", "roadaddress")),
+        ("태그", ("태그", "alltag")),
+        ("소개", ("소개", "introduction")),
+    ],
+}
+
+# 태그/주소/이름 필드 후보 (행사 데이터는 예전 필드명도 지원)
+TAG_FIELDS = ("태그", "alltag")
+ADDRESS_FIELDS = ("주소", "roadaddress")
+NAME_FIELDS = ("이름", "title")
+
+# (ids, documents, metadatas, records)
+Batch = Tuple[List[str], List[str], List[Dict], List[Dict]]
+
+
+def iter_json_records(filename: str, chunk_size: int = 64 * 1024) -> Iterator[Dict]:
+    """
+    JSON 배열 파일에서 레코드를 하나씩 읽기 (파일 전체를 메모리에 올리지 않음)
+
+    Args:
+        filename: JSON 배열 파일 경로
+        chunk_size: 한 번에 읽을 문자 수
+
+    Yields:
+        레코드 딕셔너리
+    """
+    decoder = json.JSONDecoder()
+    with open(filename, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size)
+        pos = 0
+        started = False
+        while True:
+            # 공백과 구분자 건너뛰기
+            while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ',')):
+                pos += 1
+
+            if pos >= len(buffer) or pos > chunk_size:
+                more = f.read(chunk_size)
+                if not more and pos >= len(buffer):
+                    if started:
+                        raise ValueError(f"{filename}: JSON 배열이 닫히지 않았습니다.")
+                    return
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError(f"{filename}: JSON 배열 형식이 아닙니다.")
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == ']':
+                return
+
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 레코드가 잘렸으면 더 읽어서 다시 시도
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+
+            yield record
+            pos = end
+
+
+def field_value(record: Dict, fields: Tuple[str, ...]) -> str:
+    """후보 필드 중 값이 있는 첫 번째 필드 값 반환"""
+    for field in fields:
+        value = record.get(field)
+        if value is not None and value != '':
+            return str(value)
+    return ''
+
+
+def render_document(record: Dict, category: str) -> str:
+    """
+    카테고리 템플릿으로 document 문자열 생성
+
+    Args:
+        record: 원본 레코드
+        category: 카테고리 이름
+
+    Returns:
+        임베딩할 document 문자열
+    """
+    template = CATEGORY_TEMPLATES.get(category)
+    if template is None:
+        return "카테고리 정보 없음"
+    parts = [f"카테고리: {category}"]
+    parts.extend(f"{label}: {field_value(record, fields)}" for label, fields in template)
+    return " ".join(parts)
+
+
+def normalize_tags(value) -> List[str]:
+    """
+    태그 문자열을 정규화된 태그 리스트로 변환 (쉼표/#/공백으로 분리, 중복 제거, 소문자화)
+
+    Args:
+        value: "브런치,핫도그" 또는 "#제주공연#바로크음악" 형태의 태그 문자열
+
+    Returns:
+        태그 리스트 (원래 순서 유지)
+    """
+    if not value:
+        return []
+    tags = (tag.casefold() for tag in re.split(r"[,#\s]+", str(value)))
+    return list(dict.fromkeys(tag for tag in tags if tag))
+
+
+def extract_region(address: str) -> str:
+    """주소에서 시 단위 지역 추출 (예: "제주특별자치도 제주시 구좌읍 ..." → "제주시")"""
+    for token in str(address or "").split():
+        if token.endswith("시") and token != "제주특별자치시":
+            return token
+    return ""
+
+
+def build_record(record: Dict, category: str) -> Dict:
+    """
+    원본 레코드 정리 (None은 빈 문자열, 리스트/딕셔너리는 JSON 문자열로 변환)
+
+    Args:
+        record: 원본 레코드
+        category: 카테고리 이름
+
+    Returns:
+        카테고리가 포함된 레코드 딕셔너리
+    """
+    cleaned = {}
+    for key, value in record.items():
+        if value is None:
+            value = ''
+        elif not isinstance(value, (str, int, float, bool)):
+            value = json.dumps(value, ensure_ascii=False)
+        cleaned[key] = value
+    cleaned["category"] = category
+    return cleaned
+
+
+def build_metadata(record: Dict, category: str, mode: str = METADATA_MODE) -> Dict:
+    """
+    ChromaDB 메타데이터 구성
+
+    Args:
+        record: 원본 레코드
+        category: 카테고리 이름
+        mode: "compact"면 필터용 필드만, "full"이면 원본 필드 전체
+
+    Returns:
+        메타데이터 딕셔너리
+    """
+    if mode == "full":
+        return build_record(record, category)
+    return {
+        "category": category,
+        "region": extract_region(field_value(record, ADDRESS_FIELDS)),
+        "tags": ",".join(normalize_tags(field_value(record, TAG_FIELDS)))
+    }
+
+
+def row_id(record: Dict, category: str, seen: Dict[str, int]) -> str:
+    """
+    이름 + 주소로 만든 안정적인 행 id (파일에서 행 순서가 바뀌거나 행이 추가/삭제되어도 다른 행의 id는 그대로)
+
+    같은 이름/주소가 여러 번 나오면 두 번째부터 파일 순서대로 "_2", "_3"을 붙입니다.
+
+    Args:
+        record: 원본 레코드
+        category: 카테고리 이름
+        seen: 이번 파일에서 나온 기본 id별 횟수 (호출할 때마다 갱신)
+
+    Returns:
+        "{카테고리}_{sha1 앞 16자리}" 형식의 id
+    """
+    key = f"{field_value(record, NAME_FIELDS)}\n{field_value(record, ADDRESS_FIELDS)}"
+    base = f"{category}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+    seen[base] = seen.get(base, 0) + 1
+    return base if seen[base] == 1 else f"{base}_{seen[base]}"
+
+
+def iter_row_batches(filename: str, category: str, batch_size: int = INGEST_BATCH_SIZE) -> Iterator[Batch]:
+    """
+    데이터 파일을 스트리밍으로 읽어 (ids, documents, metadatas, records) 배치 생성
+
+    Args:
+        filename: 데이터 파일 경로
+        category: 카테고리 이름
+        batch_size: 배치 크기
+
+    Yields:
+        ids, documents, metadatas, records 리스트 튜플
+    """
+    ids, documents, metadatas, records = [], [], [], []
+    seen_ids = {}
+    for i, record in enumerate(iter_json_records(filename)):
+        try:
+            document = render_document(record, category)
+            metadata = build_metadata(record, category)
+            full_record = build_record(record, category)
+        except Exception as e:
+            print(f"{i}번째 행 처리 중 오류: {e}")
+            continue
+        ids.append(row_id(record, category, seen_ids))
+        documents.append(document)
+        metadatas.append(metadata)
+        records.append(full_record)
+
+        if len(ids) >= batch_size:
+            yield ids, documents, metadatas, records
+            ids, documents, metadatas, records = [], [], [], []
+
+    if ids:
+        yield ids, documents, metadatas, records
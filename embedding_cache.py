@@ -0,0 +1,217 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import EMBED_CACHE_ACCESS_FLUSH_SECONDS, EMBED_CACHE_DTYPE, EMBED_CACHE_MAX_MB, EMBED_CACHE_PATH
+
+
+def text_hash(text: str) -> str:
+    """텍스트 내용 해시 (캐시 키)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str = EMBED_CACHE_PATH, max_mb: float = EMBED_CACHE_MAX_MB,
+                 dtype: str = EMBED_CACHE_DTYPE, flush_seconds: float = EMBED_CACHE_ACCESS_FLUSH_SECONDS,
+                 flush_rows: int = 1000):
+        """
+        (모델 이름, 텍스트 해시)로 임베딩을 저장하는 디스크 캐시
+
+        벡터는 float16/float32 바이트 배열로 SQLite 인덱스에 저장되며,
+        다른 dtype으로 저장된 항목은 없는 것으로 보고 다시 저장합니다.
+        전체 크기가 max_mb를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다(LRU).
+        조회 시각은 메모리에 모았다가 flush_seconds마다(또는 flush_rows개가 쌓이거나 저장/삭제 전에)
+        한 번에 기록하므로, 조회할 때마다 쓰기/commit이 일어나지 않습니다.
+
+        Args:
+            path: SQLite 파일 경로
+            max_mb: 캐시 최대 크기 (MB)
+            dtype: 저장 타입 ("float16" 또는 "float32")
+            flush_seconds: 모아 둔 조회 시각을 기록하는 주기 (초)
+            flush_rows: 모아 둔 조회 시각이 이만큼 쌓이면 주기와 상관없이 기록
+        """
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"지원하지 않는 캐시 dtype입니다: {dtype}")
+
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.dtype = dtype
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flush_seconds = flush_seconds
+        self.flush_rows = flush_rows
+        # 아직 기록하지 않은 조회 시각 {(모델, 텍스트 해시): 시각}
+        self._accessed: Dict[Tuple[str, str], float] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dtype TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        atexit.register(self.flush)
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        캐시에서 임베딩 조회
+
+        Args:
+            model: 임베딩 모델 이름
+            texts: 텍스트 리스트
+
+        Returns:
+            텍스트 순서대로 임베딩 (없으면 None)
+        """
+        if not texts:
+            return []
+
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            unique = list(set(hashes))
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, dtype, vector FROM embeddings "
+                    f"WHERE model = ? AND dtype = ? AND text_hash IN ({placeholders})",
+                    [model, self.dtype, *chunk]
+                ).fetchall()
+                for digest, dtype, blob in rows:
+                    found[digest] = np.frombuffer(blob, dtype=dtype).astype(np.float32).tolist()
+
+            if found:
+                now = time.time()
+                self._accessed.update(((model, digest), now) for digest in found)
+                if (len(self._accessed) >= self.flush_rows
+                        or time.monotonic() - self._last_flush >= self.flush_seconds):
+                    self._write_access()
+                    self._conn.commit()
+
+            results = [found.get(digest) for digest in hashes]
+            hit_count = sum(1 for result in results if result is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]) -> List[List[float]]:
+        """
+        임베딩을 캐시에 저장하고 크기 제한을 넘으면 LRU 삭제
+
+        Args:
+            model: 임베딩 모델 이름
+            texts: 텍스트 리스트
+            embeddings: 텍스트 순서대로 임베딩
+
+        Returns:
+            저장한 정밀도로 맞춘 임베딩 (나중에 get_many로 읽을 값과 같음)
+        """
+        if not texts:
+            return []
+
+        now = time.time()
+        vectors = [np.asarray(embedding, dtype=self.dtype) for embedding in embeddings]
+        rows = [
+            (model, text_hash(text), self.dtype, vector.tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._write_access()
+            for row in rows:
+                previous = self._conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE model = ? AND text_hash = ?",
+                    row[:2]
+                ).fetchone()
+                if previous:
+                    self._total_bytes -= previous[0]
+                self._total_bytes += len(row[3])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dtype, vector, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+        return [vector.astype(np.float32).tolist() for vector in vectors]
+
+    def flush(self):
+        """모아 둔 조회 시각을 디스크에 기록"""
+        with self._lock:
+            if self._accessed:
+                self._write_access()
+                self._conn.commit()
+
+    def _write_access(self):
+        """모아 둔 조회 시각 기록 (lock을 잡은 상태에서 호출, commit은 호출한 쪽에서)"""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = MAX(last_access, ?) WHERE model = ? AND text_hash = ?",
+                [(accessed, model, digest) for (model, digest), accessed in self._accessed.items()]
+            )
+            self._accessed.clear()
+        self._last_flush = time.monotonic()
+
+    def _evict(self):
+        """크기 제한을 넘으면 오래된 항목부터 삭제 (제한의 90%까지)"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute(
+            "SELECT model, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_access ASC"
+        )
+        victims = []
+        for model, digest, size in cursor:
+            if self._total_bytes <= target:
+                break
+            victims.append((model, digest))
+            self._total_bytes -= size
+        self._conn.executemany(
+            "DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims
+        )
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict:
+        """캐시 통계 반환"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def clear(self):
+        """캐시 전체 삭제"""
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._total_bytes = 0
@@ -0,0 +1,395 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from metrics import LatencyStats
+from config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_DIM,
+    EMBEDDING_MODEL,
+    EMBED_BATCH_SIZE,
+    EMBED_MAX_IN_FLIGHT,
+    EMBED_MAX_RETRIES,
+    EMBED_BACKOFF_SECONDS,
+    EMBED_CACHE_ENABLED
+)
+
+# Upstage 요청당 최대 텍스트 수
+MAX_EMBED_BATCH_SIZE = 100
+
+
+def create_upstage_embedder(batch_size: int = EMBED_BATCH_SIZE):
+    """
+    Upstage 임베딩 클라이언트 생성
+
+    embed_documents는 passage 모델, embed_query는 query 모델을 사용합니다.
+    재시도는 UpstageEmbeddingFunction에서 처리하므로 클라이언트 자체 재시도는 끕니다.
+
+    Args:
+        batch_size: 요청당 텍스트 수
+
+    Returns:
+        UpstageEmbeddings 인스턴스
+    """
+    import httpx
+    from langchain_upstage import UpstageEmbeddings
+
+    if not os.getenv("UPSTAGE_API_KEY"):
+        raise ValueError("UPSTAGE_API_KEY가 설정되어 있지 않습니다. .env 파일을 확인해주세요.")
+
+    try:
+        # 연결을 재사용하도록 keep-alive 커넥션 풀을 가진 HTTP 클라이언트를 명시적으로 사용
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=EMBED_MAX_IN_FLIGHT * 2,
+                max_keepalive_connections=EMBED_MAX_IN_FLIGHT * 2,
+                keepalive_expiry=300
+            ),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+        return UpstageEmbeddings(
+            model=EMBEDDING_MODEL,
+            embed_batch_size=min(batch_size, MAX_EMBED_BATCH_SIZE),
+            max_retries=0,
+            http_client=http_client
+        )
+    except Exception as e:
+        raise RuntimeError(f"Upstage 임베딩 로드 중 오류 발생: {e}")
+
+
+class HashEmbeddings:
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        """
+        텍스트 해시로 시드를 정한 결정적 임베딩 (API 호출 없음)
+
+        같은 텍스트는 항상 같은 단위 벡터가 되므로 벤치마크와 오프라인 개발에 사용합니다.
+        의미 유사도는 반영하지 않습니다.
+
+        Args:
+            dim: 벡터 차원 (기본값: Upstage 임베딩과 같은 차원)
+        """
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def create_embedder(backend: str = EMBEDDING_BACKEND, batch_size: int = EMBED_BATCH_SIZE):
+    """
+    설정된 백엔드의 임베딩 객체 생성
+
+    Args:
+        backend: "upstage" 또는 "hash"
+        batch_size: 요청당 텍스트 수
+
+    Returns:
+        embed_documents/embed_query를 제공하는 임베딩 객체
+    """
+    if backend == "hash":
+        return HashEmbeddings()
+    if backend == "upstage":
+        return create_upstage_embedder(batch_size)
+    raise ValueError(f"지원하지 않는 임베딩 백엔드입니다: {backend}")
+
+
+def embed_query_batch(embedder, texts: List[str]) -> List[List[float]]:
+    """
+    질문 여러 개를 query 모델로 한 번에 임베딩
+
+    UpstageEmbeddings는 embed_query가 한 건씩만 요청하므로 같은 클라이언트로
+    "-query" 모델에 리스트를 직접 보냅니다. 그 밖의 임베딩 객체는 embed_query를 반복합니다.
+
+    Args:
+        embedder: 임베딩 객체
+        texts: 질문 리스트
+
+    Returns:
+        입력 순서와 같은 임베딩 리스트
+    """
+    client = getattr(embedder, "client", None)
+    if client is None or not hasattr(embedder, "_invocation_params"):
+        return [embedder.embed_query(text) for text in texts]
+    params = embedder._invocation_params
+    params["model"] = params["model"] + "-query"
+    data = client.create(input=texts, **params).data
+    return [item.embedding for item in sorted(data, key=lambda item: item.index)]
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """속도 제한(429)이나 일시적인 네트워크/서버 오류인지 확인"""
+    status_code = getattr(error, "status_code", None)
+    if status_code == 429 or (status_code is not None and status_code >= 500):
+        return True
+    name = type(error).__name__
+    if name in ("RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError"):
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "429" in message or "too many requests" in message
+
+
+# ChromaDB는 EmbeddingFunction 프로토콜(__call__(self, input))의 시그니처만 확인하므로 상속하지 않음
+# (numpy 검색 백엔드에서는 chromadb를 import하지 않아 시작 시간이 짧아짐)
+class UpstageEmbeddingFunction:
+    def __init__(self, embedder=None, batch_size: int = EMBED_BATCH_SIZE,
+                 max_in_flight: int = EMBED_MAX_IN_FLIGHT, max_retries: int = EMBED_MAX_RETRIES,
+                 backoff_seconds: float = EMBED_BACKOFF_SECONDS, cache=None,
+                 model_name: str = EMBEDDING_MODEL):
+        """
+        ChromaDB에 사용할 배치 임베딩 함수
+
+        문서는 batch_size 단위로 묶어 passage 모델에 한 번에 요청하고,
+        최대 max_in_flight개의 요청을 동시에 보냅니다.
+        cache가 있으면 캐시에 없는 텍스트만 요청합니다.
+
+        Args:
+            embedder: embed_documents/embed_query를 제공하는 임베딩 객체 (None이면 Upstage 사용)
+            batch_size: 요청당 텍스트 수
+            max_in_flight: 동시에 보낼 최대 요청 수
+            max_retries: 속도 제한/일시 오류 시 재시도 횟수
+            backoff_seconds: 재시도 대기 시간 기준값 (지수 증가 + 지터)
+            cache: EmbeddingCache 인스턴스 (None이면 캐시 사용 안 함)
+            model_name: 캐시 키에 쓰는 모델 이름 (-passage / -query 접미사가 붙음)
+        """
+        self.embedder = embedder if embedder is not None else create_upstage_embedder(batch_size)
+        self.batch_size = max(1, min(batch_size, MAX_EMBED_BATCH_SIZE))
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.cache = cache
+        self.passage_model = f"{model_name}-passage"
+        self.query_model = f"{model_name}-query"
+
+    def __call__(self, input):
+        # input이 리스트가 아닌 경우 리스트로 변환
+        if isinstance(input, str):
+            input = [input]
+        return self.embed_documents(list(input))
+
+    def _with_retry(self, func, *args):
+        """속도 제한/일시 오류 시 지수 백오프로 재시도"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return func(*args)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise RuntimeError(f"임베딩 생성 중 오류 발생: {e}")
+                delay = self.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+                print(f"⏳ 임베딩 요청 재시도 {attempt + 1}/{self.max_retries} ({delay:.1f}초 후): {e}")
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        문서 리스트를 passage 모델로 배치 임베딩 (캐시 우선)
+
+        Args:
+            texts: 문서 리스트
+
+        Returns:
+            입력 순서와 같은 임베딩 리스트
+        """
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._embed_batches(texts)
+
+        embeddings = self.cache.get_many(self.passage_model, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # 같은 텍스트가 여러 번 있어도 한 번만 요청
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            # 캐시에 저장한 정밀도로 맞춰 써야 캐시 적중 여부와 상관없이 같은 벡터가 저장됨
+            fresh = dict(zip(unique_texts, self.cache.put_many(
+                self.passage_model, unique_texts, self._embed_batches(unique_texts)
+            )))
+            for i in missing:
+                embeddings[i] = fresh[texts[i]]
+        return embeddings
+
+    def _embed_batches(self, texts: List[str]) -> List[List[float]]:
+        """batch_size 단위로 나눠 최대 max_in_flight개 요청을 동시에 전송"""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._with_retry(self.embedder.embed_documents, batches[0])
+
+        embeddings = []
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batches))) as executor:
+            for batch_embeddings in executor.map(
+                lambda batch: self._with_retry(self.embedder.embed_documents, batch), batches
+            ):
+                embeddings.extend(batch_embeddings)
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        사용자 질문을 query 모델로 임베딩
+
+        Args:
+            text: 질문 문자열
+
+        Returns:
+            임베딩 벡터
+        """
+        if self.cache is not None:
+            cached = self.cache.get_many(self.query_model, [text])[0]
+            if cached is not None:
+                return cached
+
+        embedding = self._with_retry(self.embedder.embed_query, text)
+        if self.cache is not None:
+            embedding = self.cache.put_many(self.query_model, [text], [embedding])[0]
+        return embedding
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        질문 여러 개를 query 모델로 배치 임베딩 (캐시 우선, 캐시에 없는 질문만 batch_size 단위로 요청)
+
+        Args:
+            texts: 질문 리스트
+
+        Returns:
+            입력 순서와 같은 임베딩 리스트
+        """
+        if not texts:
+            return []
+        embeddings = self.cache.get_many(self.query_model, texts) if self.cache is not None else [None] * len(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            fresh_embeddings = []
+            for start in range(0, len(unique_texts), self.batch_size):
+                batch = unique_texts[start:start + self.batch_size]
+                fresh_embeddings.extend(self._with_retry(embed_query_batch, self.embedder, batch))
+            if self.cache is not None:
+                fresh_embeddings = self.cache.put_many(self.query_model, unique_texts, fresh_embeddings)
+            fresh = dict(zip(unique_texts, fresh_embeddings))
+            for i in missing:
+                embeddings[i] = fresh[texts[i]]
+        return embeddings
+
+
+_shared_embedding_function: Optional[UpstageEmbeddingFunction] = None
+_shared_lock = threading.Lock()
+
+
+def get_embedding_function() -> UpstageEmbeddingFunction:
+    """프로세스 전체에서 공유하는 임베딩 함수 반환 (처음 호출 시 생성)"""
+    global _shared_embedding_function
+    with _shared_lock:
+        if _shared_embedding_function is None:
+            cache = None
+            if EMBED_CACHE_ENABLED:
+                from embedding_cache import EmbeddingCache
+                cache = EmbeddingCache()
+            model_name = EMBEDDING_MODEL if EMBEDDING_BACKEND == "upstage" else f"{EMBEDDING_BACKEND}-{EMBEDDING_DIM}"
+            _shared_embedding_function = UpstageEmbeddingFunction(
+                embedder=create_embedder(),
+                cache=cache,
+                model_name=model_name
+            )
+        return _shared_embedding_function
+
+
+class QueryEmbedder:
+    def __init__(self, embedding_function: UpstageEmbeddingFunction):
+        """
+        프로세스 전체에서 공유하는 질문 임베딩 클라이언트
+
+        같은 질문이 여러 세션에서 동시에 들어오면 하나의 요청만 보내고 결과를 나눠 씁니다(singleflight).
+        호출마다 지연 시간을 기록합니다.
+
+        Args:
+            embedding_function: 오래 유지되는 임베딩 함수 (HTTP 연결 재사용)
+        """
+        self.embedding_function = embedding_function
+        self.latency = LatencyStats()
+        self.coalesced = 0
+        self.errors = 0
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        질문 임베딩 (진행 중인 동일 요청이 있으면 그 결과를 기다림)
+
+        Args:
+            text: 질문 문자열
+
+        Returns:
+            임베딩 벡터
+        """
+        started = time.perf_counter()
+        with self._lock:
+            future = self._inflight.get(text)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[text] = future
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                future.set_result(self.embedding_function.embed_query(text))
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight.pop(text, None)
+
+        try:
+            return future.result()
+        finally:
+            self.latency.record(time.perf_counter() - started)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        질문 여러 개를 한 번의 배치 요청으로 임베딩 (다중 질문 검색용)
+
+        Args:
+            texts: 질문 리스트
+
+        Returns:
+            입력 순서와 같은 임베딩 리스트
+        """
+        started = time.perf_counter()
+        try:
+            return self.embedding_function.embed_queries(texts)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self.latency.record(time.perf_counter() - started)
+
+    def stats(self) -> Dict:
+        """호출 지연 시간 통계와 합쳐진 요청 수"""
+        return {**self.latency.summary(), "coalesced": self.coalesced, "errors": self.errors}
+
+
+_shared_query_embedder: Optional[QueryEmbedder] = None
+
+
+def get_query_embedder() -> QueryEmbedder:
+    """프로세스 전체에서 공유하는 질문 임베딩 클라이언트 반환 (처음 호출 시 생성)"""
+    global _shared_query_embedder
+    embedding_function = get_embedding_function()
+    with _shared_lock:
+        if _shared_query_embedder is None:
+            _shared_query_embedder = QueryEmbedder(embedding_function)
+        return _shared_query_embedder
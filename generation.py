@@ -0,0 +1,255 @@
+import asyncio
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from async_runtime import get_async_ollama_client
+from config import (
+    GENERATION_DEADLINE_SECONDS, GENERATION_FALLBACK_MODEL, GENERATION_FIRST_TOKEN_SECONDS,
+    GENERATION_HEDGE_AFTER_SECONDS, GENERATION_STALL_SECONDS, OLLAMA_KEEP_ALIVE
+)
+from context_builder import context_window
+from scheduler import InferenceScheduler
+
+# 생성이 끝나지 못했을 때 검색 결과 앞에 붙이는 안내 문구
+FALLBACK_NOTICES = {
+    "timeout": "⏱️ 답변 생성이 늦어지고 있어 찾아 둔 장소 정보를 먼저 안내해 드립니다.",
+    "error": "⚠️ 답변 생성 중 문제가 생겨 찾아 둔 장소 정보를 먼저 안내해 드립니다."
+}
+
+
+def fallback_answer(outcome: str, context: str, partial: bool = False) -> str:
+    """
+    생성 시간 초과/오류 시 검색 결과(format_context)로 만든 안내 답변
+
+    Args:
+        outcome: "timeout" 또는 "error"
+        context: 포맷팅된 검색 결과
+        partial: 이미 일부 답변을 보냈는지 (그 뒤에 이어 붙임)
+
+    Returns:
+        안내 답변
+    """
+    notice = FALLBACK_NOTICES.get(outcome, FALLBACK_NOTICES["error"])
+    prefix = "\n\n---\n\n" if partial else ""
+    return f"{prefix}{notice}\n\n{context.strip()}\n\n잠시 후 다시 물어보시면 자세히 답변해 드릴게요."
+
+
+class Attempt:
+    def __init__(self, model: str, reason: str):
+        """
+        Ollama 호출 한 번 (원래 요청, 헤지, 오류 재시도)
+
+        Args:
+            model: 모델 이름
+            reason: "primary" / "hedge" / "retry"
+        """
+        self.model = model
+        self.reason = reason
+        self.task: Optional[asyncio.Task] = None
+        self.granted: Optional[float] = None
+        self.final: Dict = {}
+        self.failed = False
+
+
+class GuardedGeneration:
+    def __init__(self, scheduler: InferenceScheduler, session_id: str, messages: List[Dict], model: str,
+                 fallback_model: str = GENERATION_FALLBACK_MODEL,
+                 first_token_seconds: float = GENERATION_FIRST_TOKEN_SECONDS,
+                 stall_seconds: float = GENERATION_STALL_SECONDS,
+                 deadline_seconds: float = GENERATION_DEADLINE_SECONDS,
+                 hedge_after_seconds: float = GENERATION_HEDGE_AFTER_SECONDS):
+        """
+        마감 시간과 헤지가 있는 스트리밍 답변 생성 (한 턴에 하나)
+
+        Ollama 호출은 스케줄러에서 차례를 받아 별도 태스크로 실행하고, 토큰은 이벤트 큐로 받습니다.
+        차례를 받은 뒤 hedge_after_seconds 안에 첫 토큰이 없으면 fallback_model로 같은 요청을 하나 더 보내
+        먼저 첫 토큰을 낸 쪽을 쓰고 나머지는 취소합니다. 첫 토큰 전에 오류가 나면 fallback_model로 한 번 재시도합니다.
+        첫 토큰(스케줄러 대기 포함), 토큰 사이 간격, 전체 시간 중 하나라도 넘기면 모든 호출을 취소하고
+        outcome을 "timeout"으로 둡니다.
+
+        Args:
+            scheduler: 추론 스케줄러
+            session_id: 스케줄러 세션 ID
+            messages: Ollama chat 메시지
+            model: 답변 모델
+            fallback_model: 헤지/재시도 모델 (빈 값이면 끔)
+            first_token_seconds: 첫 토큰까지 최대 시간
+            stall_seconds: 토큰 사이 최대 간격
+            deadline_seconds: 전체 최대 시간
+            hedge_after_seconds: 헤지를 보내기까지 기다릴 시간 (0이면 헤지 끔, 오류 재시도는 유지)
+        """
+        self.scheduler = scheduler
+        self.session_id = session_id
+        self.messages = messages
+        self.primary_model = model
+        self.fallback_model = fallback_model
+        self.first_token_seconds = first_token_seconds
+        self.stall_seconds = stall_seconds
+        self.deadline_seconds = deadline_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.attempts: List[Attempt] = []
+        self.winner: Optional[Attempt] = None
+        # "ok" / "timeout" / "error" / "cancelled" (끝나기 전에는 None)
+        self.outcome: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.started: Optional[float] = None
+        self.first_token: Optional[float] = None
+        self.queue_wait = 0.0
+        self._events: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def model(self) -> str:
+        """답변한 모델 (아직 없으면 원래 모델)"""
+        return self.winner.model if self.winner else self.primary_model
+
+    @property
+    def final(self) -> Dict:
+        """답변한 호출의 마지막 Ollama 응답 (eval_count 등)"""
+        return self.winner.final if self.winner else {}
+
+    def reasons(self) -> List[str]:
+        """보낸 호출 종류 목록 ("primary", "hedge", "retry")"""
+        return [attempt.reason for attempt in self.attempts]
+
+    def cancel(self):
+        """생성 중단 요청 (다른 스레드에서도 호출 가능)"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._events.put_nowait, (None, "cancel", None))
+
+    async def stream(self, on_queue: Optional[Callable[[int], None]] = None) -> AsyncIterator[str]:
+        """
+        답변 토큰 스트리밍 (끝나면 outcome 확인, 중간에 닫으면 "cancelled")
+
+        Args:
+            on_queue: 원래 요청의 스케줄러 대기 순번 알림 함수
+
+        Yields:
+            답변 조각
+        """
+        self._loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        self.started = time.perf_counter()
+        self._start(self.primary_model, "primary", on_queue)
+        last_token = 0.0
+        try:
+            while self.outcome is None:
+                hedge_at = self._hedge_at()
+                limits = [self.deadline_seconds]
+                if self.winner is None:
+                    limits.append(self.first_token_seconds)
+                    if hedge_at is not None:
+                        limits.append(hedge_at)
+                else:
+                    limits.append(last_token + self.stall_seconds)
+                try:
+                    attempt, kind, payload = await asyncio.wait_for(
+                        self._events.get(), max(0.0, min(limits) - self._elapsed())
+                    )
+                except asyncio.TimeoutError:
+                    if hedge_at is not None and self._elapsed() >= hedge_at:
+                        self._start(self.fallback_model, "hedge")
+                    elif self._elapsed() >= min(limits):
+                        self.outcome = "timeout"
+                    continue
+
+                if kind == "cancel":
+                    self.outcome = "cancelled"
+                elif kind == "granted":
+                    attempt.granted = self._elapsed()
+                    if attempt.reason == "primary":
+                        self.queue_wait = attempt.granted
+                elif kind == "token":
+                    if self.winner is None:
+                        self._choose(attempt)
+                    if attempt is self.winner:
+                        last_token = self._elapsed()
+                        yield payload
+                elif kind == "done":
+                    attempt.final = payload
+                    if self.winner is None:
+                        self._choose(attempt)
+                    if attempt is self.winner:
+                        self.outcome = "ok"
+                elif kind == "error":
+                    self._fail(attempt, payload)
+        finally:
+            if self.outcome is None:
+                self.outcome = "cancelled"
+            await self._cancel_all()
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def _start(self, model: str, reason: str, on_queue: Optional[Callable[[int], None]] = None):
+        """호출 태스크 시작"""
+        attempt = Attempt(model, reason)
+        attempt.task = asyncio.create_task(self._run(attempt, on_queue))
+        self.attempts.append(attempt)
+        if reason != "primary":
+            print(f"🔁 {'헤지' if reason == 'hedge' else '재시도'}: {model}")
+
+    def _hedge_at(self) -> Optional[float]:
+        """헤지를 보낼 시각 (시작 기준 초, 보낼 수 없으면 None)"""
+        primary = self.attempts[0]
+        if (self.winner is not None or len(self.attempts) > 1 or primary.granted is None
+                or self.hedge_after_seconds <= 0 or not self.fallback_model
+                or self.fallback_model == self.primary_model):
+            return None
+        return primary.granted + self.hedge_after_seconds
+
+    def _choose(self, attempt: Attempt):
+        """먼저 첫 토큰(또는 완료)을 낸 호출을 답변으로 쓰고 나머지 취소"""
+        self.winner = attempt
+        self.first_token = self._elapsed()
+        for other in self.attempts:
+            if other is not attempt:
+                other.task.cancel()
+
+    def _fail(self, attempt: Attempt, error: BaseException):
+        """호출 오류 처리: 답변 중이던 호출이면 실패, 첫 토큰 전이면 남은 호출을 기다리거나 한 번 재시도"""
+        attempt.failed = True
+        print(f"⚠️ 답변 생성 오류 ({attempt.model}): {error}")
+        if attempt is self.winner:
+            self.outcome, self.error = "error", error
+        elif any(not other.failed for other in self.attempts):
+            return
+        elif len(self.attempts) == 1 and self.fallback_model:
+            self._start(self.fallback_model, "retry")
+        else:
+            self.outcome, self.error = "error", error
+
+    async def _run(self, attempt: Attempt, on_queue: Optional[Callable[[int], None]]):
+        """스케줄러에서 차례를 받아 Ollama 스트리밍 호출, 결과는 이벤트 큐로 전달"""
+        events = self._events
+        try:
+            async with self.scheduler.slot(self.session_id, on_queue):
+                events.put_nowait((attempt, "granted", None))
+                stream = await get_async_ollama_client().chat(
+                    model=attempt.model,
+                    messages=self.messages,
+                    options={'num_ctx': context_window(attempt.model)},
+                    stream=True,
+                    keep_alive=OLLAMA_KEEP_ALIVE
+                )
+                final = {}
+                try:
+                    async for part in stream:
+                        token = part.get('message', {}).get('content', '')
+                        if token:
+                            events.put_nowait((attempt, "token", token))
+                        if part.get('done'):
+                            final = part
+                finally:
+                    await stream.aclose()
+            events.put_nowait((attempt, "done", final))
+        except Exception as e:
+            events.put_nowait((attempt, "error", e))
+
+    async def _cancel_all(self):
+        """남은 호출 태스크 취소 (스트림을 닫고 스케줄러 자리 반납)"""
+        pending = [attempt.task for attempt in self.attempts if not attempt.task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
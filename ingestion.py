@@ -0,0 +1,393 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from tqdm import tqdm
+
+from config import (
+    MANIFEST_FILENAME,
+    CATEGORY_MAP,
+    INGEST_BATCH_SIZE,
+    INGEST_QUEUE_SIZE,
+    EMBED_MAX_IN_FLIGHT,
+    METADATA_MODE
+)
+from documents import Batch, iter_row_batches
+from record_store import RecordStore
+
+
+def row_hash(document: str, metadata: Dict, record: Optional[Dict] = None) -> str:
+    """
+    document, metadata, 원본 레코드로 행 해시 계산
+
+    Args:
+        document: 임베딩할 문서 문자열
+        metadata: ChromaDB에 저장할 메타데이터
+        record: 레코드 저장소에 저장할 원본 레코드
+
+    Returns:
+        sha256 해시 문자열
+    """
+    payload = json.dumps(
+        {"document": document, "metadata": metadata, "record": record},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    def __init__(self, store: Optional[RecordStore] = None, legacy_filename: str = MANIFEST_FILENAME):
+        """
+        증분 로딩 매니페스트 초기화
+
+        컬렉션에 반영이 끝난 행의 id → 해시를 레코드 저장소(SQLite)의 row_hashes 테이블에 기록합니다.
+        배치마다 레코드와 해시를 한 트랜잭션으로 기록하므로 중간에 중단되어도 이어서 진행할 수 있고,
+        배치 하나를 기록하는 비용이 전체 행 수와 상관없이 일정합니다.
+
+        Args:
+            store: 해시를 기록할 레코드 저장소 (None이면 기본 위치)
+            legacy_filename: 예전 JSON 매니페스트 파일명 (있으면 한 번 옮긴 뒤 삭제)
+        """
+        self.store = store if store is not None else RecordStore()
+        self._migrate(os.path.join(os.path.dirname(self.store.path), legacy_filename))
+
+    def _migrate(self, path: str):
+        """예전 JSON 매니페스트를 row_hashes 테이블로 옮기기"""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = dict(json.load(f).get("rows", {}))
+            self.store.put_hashes(list(rows), list(rows.values()))
+            print(f"📦 JSON 매니페스트 {len(rows)}행을 레코드 저장소로 옮겼습니다.")
+        except Exception as e:
+            print(f"⚠️ 예전 매니페스트 읽기 실패, 무시합니다: {e}")
+        os.remove(path)
+
+    def lookup(self, ids: List[str]) -> Dict[str, str]:
+        """배치의 기록된 해시 조회 ({id: 해시}, 기록이 없는 id는 제외)"""
+        return self.store.get_hashes(ids)
+
+    def ids(self, scope: str = "") -> List[str]:
+        """기록된 id 목록 (scope 접두사로 한정)"""
+        return self.store.hashed_ids(scope)
+
+    def count(self) -> int:
+        """기록된 행 수"""
+        return self.store.hash_count()
+
+    def reset(self):
+        """매니페스트 초기화"""
+        self.store.delete_hashes()
+
+    def commit(self, ids: List[str], hashes: List[str], documents: Optional[List[str]] = None,
+               records: Optional[List[Dict]] = None):
+        """
+        저장이 끝난 배치를 기록 (documents/records를 주면 레코드와 해시를 한 트랜잭션으로 저장)
+        """
+        if documents is not None and records is not None:
+            self.store.put_many(ids, documents, records, hashes)
+        else:
+            self.store.put_hashes(ids, hashes)
+
+    def forget(self, ids: List[str], records: bool = False):
+        """삭제된 행을 매니페스트에서 제거 (records=True면 레코드도 함께 삭제)"""
+        if records:
+            self.store.delete_many(ids)
+        else:
+            self.store.delete_hashes(ids)
+
+
+def write_batch(collection, store, manifest: IngestManifest, ids: List[str], documents: List[str],
+                metadatas: List[Dict], records: List[Dict], digests: List[str], embeddings: List[List[float]]):
+    """
+    미리 계산한 임베딩으로 컬렉션에 저장한 뒤 레코드와 매니페스트 해시를 한 트랜잭션으로 기록
+
+    compact 모드에서는 document를 ChromaDB에 넣지 않고 레코드 저장소에만 보관합니다.
+    store를 주면(매니페스트와 같은 저장소) 레코드도 함께 저장합니다.
+    """
+    collection.upsert(
+        ids=ids,
+        embeddings=embeddings,
+        documents=documents if METADATA_MODE == "full" else None,
+        metadatas=metadatas
+    )
+    if store is not None:
+        manifest.commit(ids, digests, documents, records)
+    else:
+        manifest.commit(ids, digests)
+
+
+def delete_removed(collection, manifest: IngestManifest, scope: str, seen: Set[str],
+                   batch_size: int = INGEST_BATCH_SIZE, store=None) -> Tuple[int, int]:
+    """
+    매니페스트에는 있지만 이번 데이터에 없는 행을 컬렉션에서 삭제
+
+    Args:
+        collection: ChromaDB 컬렉션
+        manifest: 증분 로딩 매니페스트
+        scope: 삭제 대상을 한정할 id 접두사 (예: "음식_")
+        seen: 이번 실행에서 읽은 id 집합
+        batch_size: 삭제 배치 크기
+        store: 레코드도 함께 삭제할지 (매니페스트와 같은 저장소, 선택)
+
+    Returns:
+        (삭제한 행 수, 삭제 실패한 행 수)
+    """
+    removed = [row_id for row_id in manifest.ids(scope) if row_id not in seen]
+    deleted, failed = 0, 0
+    for batch_start in range(0, len(removed), batch_size):
+        batch_ids = removed[batch_start:batch_start + batch_size]
+        try:
+            collection.delete(ids=batch_ids)
+            manifest.forget(batch_ids, records=store is not None)
+            deleted += len(batch_ids)
+        except Exception as e:
+            print(f"❌ {len(batch_ids)}개 행 삭제 실패: {e}")
+            failed += len(batch_ids)
+    return deleted, failed
+
+
+def sync_collection(collection, batches: Iterable[Batch], manifest: IngestManifest, embedding_function,
+                    batch_size: int = INGEST_BATCH_SIZE, scope: Optional[str] = None,
+                    progress=None, store=None) -> Dict[str, int]:
+    """
+    매니페스트와 비교하여 변경된 행만 upsert하고 사라진 행은 삭제 (순차 적재)
+
+    Args:
+        collection: ChromaDB 컬렉션
+        batches: (ids, documents, metadatas, records) 배치 이터러블
+        manifest: 증분 로딩 매니페스트
+        embedding_function: embed_documents를 제공하는 임베딩 함수
+        batch_size: upsert 배치 크기
+        scope: 삭제 대상을 한정할 id 접두사 (예: "음식_"). None이면 삭제하지 않음
+        progress: 처리한 행 수를 전달받을 tqdm 진행 표시줄 (선택)
+        store: 원본 레코드를 저장할 RecordStore (선택, manifest.store와 같은 저장소)
+
+    Returns:
+        {"upserted": int, "skipped": int, "deleted": int, "failed": int}
+    """
+    stats = {"upserted": 0, "skipped": 0, "deleted": 0, "failed": 0}
+    seen = set()
+    pending = []
+
+    def flush():
+        ids, documents, metadatas, records, digests = (list(column) for column in zip(*pending))
+        try:
+            embeddings = embedding_function.embed_documents(documents)
+            write_batch(collection, store, manifest, ids, documents, metadatas, records, digests, embeddings)
+            stats["upserted"] += len(pending)
+        except Exception as e:
+            print(f"❌ {ids[0]}~{ids[-1]} 저장 실패: {e}")
+            stats["failed"] += len(pending)
+        pending.clear()
+
+    # 변경된 행만 모아서 배치 단위로 upsert 후 매니페스트 기록
+    for ids, documents, metadatas, records in batches:
+        known = manifest.lookup(ids)
+        for row_id, document, metadata, record in zip(ids, documents, metadatas, records):
+            seen.add(row_id)
+            digest = row_hash(document, metadata, record)
+            if known.get(row_id) == digest:
+                stats["skipped"] += 1
+                continue
+            pending.append((row_id, document, metadata, record, digest))
+            if len(pending) >= batch_size:
+                flush()
+        if progress is not None:
+            progress.update(len(ids))
+    if pending:
+        flush()
+
+    # 데이터에서 사라진 행 삭제
+    if scope is not None:
+        deleted, failed_deletes = delete_removed(collection, manifest, scope, seen, batch_size, store)
+        stats["deleted"] += deleted
+        stats["failed"] += failed_deletes
+
+    return stats
+
+
+class StageStats:
+    def __init__(self, name: str):
+        """
+        파이프라인 단계별 처리량 집계
+
+        Args:
+            name: 단계 이름
+        """
+        self.name = name
+        self.rows = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, rows: int, seconds: float):
+        """처리한 행 수와 소요 시간 기록"""
+        with self._lock:
+            self.rows += rows
+            self.busy_seconds += seconds
+
+    def summary(self, wall_seconds: float) -> Dict:
+        """단계 요약 (busy 기준 처리량과 전체 시간 기준 처리량)"""
+        return {
+            "rows": self.rows,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "rows_per_busy_sec": round(self.rows / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            "rows_per_wall_sec": round(self.rows / wall_seconds, 1) if wall_seconds else 0.0
+        }
+
+
+_SENTINEL = object()
+
+
+def run_pipeline(collection, embedding_function, manifest: IngestManifest,
+                 category_map: Dict[str, str] = CATEGORY_MAP, batch_size: int = INGEST_BATCH_SIZE,
+                 embed_workers: int = EMBED_MAX_IN_FLIGHT, queue_size: int = INGEST_QUEUE_SIZE,
+                 store=None) -> Dict:
+    """
+    읽기 → 임베딩 → 저장 단계를 겹쳐서 실행하는 파이프라인 적재
+
+    카테고리 파일마다 reader 스레드가 변경된 행만 배치로 묶어 큐에 넣고,
+    embed_workers개의 임베딩 스레드가 벡터를 채운 뒤,
+    단일 writer 스레드가 미리 계산한 임베딩으로 upsert하고 매니페스트를 기록합니다.
+
+    Args:
+        collection: ChromaDB 컬렉션
+        embedding_function: embed_documents를 제공하는 임베딩 함수
+        manifest: 증분 로딩 매니페스트
+        category_map: 파일-카테고리 매핑
+        batch_size: 배치 크기
+        embed_workers: 임베딩 스레드 수 (동시 임베딩 요청 수)
+        queue_size: 단계 사이 큐 크기 (배치 단위)
+        store: 원본 레코드를 저장할 RecordStore (선택, manifest.store와 같은 저장소)
+
+    Returns:
+        {"upserted", "skipped", "deleted", "failed", "seconds", "stages": {단계: 처리량}}
+    """
+    embed_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    stages = {name: StageStats(name) for name in ("read", "embed", "write")}
+    counts = {"upserted": 0, "skipped": 0, "deleted": 0, "failed": 0}
+    counts_lock = threading.Lock()
+    seen = {category: set() for category in category_map.values()}
+    completed = set()
+    progress = tqdm(desc="📦 전체 적재", unit="행")
+
+    def add_count(key, value):
+        with counts_lock:
+            counts[key] += value
+
+    def reader(filename, category):
+        started = time.perf_counter()
+        pending = ([], [], [], [], [])
+        rows_read = 0
+
+        def flush():
+            embed_queue.put(tuple(list(part) for part in pending))
+            for part in pending:
+                part.clear()
+
+        try:
+            for ids, documents, metadatas, records in iter_row_batches(filename, category, batch_size):
+                skipped = 0
+                known = manifest.lookup(ids)
+                for row_id, document, metadata, record in zip(ids, documents, metadatas, records):
+                    seen[category].add(row_id)
+                    digest = row_hash(document, metadata, record)
+                    if known.get(row_id) == digest:
+                        skipped += 1
+                        continue
+                    for part, value in zip(pending, (row_id, document, metadata, record, digest)):
+                        part.append(value)
+                    if len(pending[0]) >= batch_size:
+                        stages["read"].record(0, time.perf_counter() - started)
+                        flush()
+                        started = time.perf_counter()
+                rows_read += len(ids)
+                add_count("skipped", skipped)
+                progress.update(skipped)
+            if pending[0]:
+                flush()
+            completed.add(category)
+        except Exception as e:
+            print(f"❌ {filename} 로딩 실패: {e}")
+        stages["read"].record(rows_read, time.perf_counter() - started)
+
+    def embedder():
+        while True:
+            item = embed_queue.get()
+            if item is _SENTINEL:
+                break
+            ids, documents, metadatas, records, digests = item
+            started = time.perf_counter()
+            try:
+                embeddings = embedding_function.embed_documents(documents)
+            except Exception as e:
+                print(f"❌ {ids[0]}~{ids[-1]} 임베딩 실패: {e}")
+                add_count("failed", len(ids))
+                progress.update(len(ids))
+                continue
+            stages["embed"].record(len(ids), time.perf_counter() - started)
+            write_queue.put((ids, documents, metadatas, records, digests, embeddings))
+
+    def writer():
+        while True:
+            item = write_queue.get()
+            if item is _SENTINEL:
+                break
+            ids, documents, metadatas, records, digests, embeddings = item
+            started = time.perf_counter()
+            try:
+                write_batch(collection, store, manifest, ids, documents, metadatas, records, digests, embeddings)
+                add_count("upserted", len(ids))
+            except Exception as e:
+                print(f"❌ {ids[0]}~{ids[-1]} 저장 실패: {e}")
+                add_count("failed", len(ids))
+            stages["write"].record(len(ids), time.perf_counter() - started)
+            progress.update(len(ids))
+
+    wall_started = time.perf_counter()
+    readers = [
+        threading.Thread(target=reader, args=(filename, category), daemon=True)
+        for filename, category in category_map.items()
+        if os.path.exists(filename)
+    ]
+    for filename in category_map:
+        if not os.path.exists(filename):
+            print(f"⚠️  {filename} 파일이 존재하지 않습니다.")
+    embedders = [threading.Thread(target=embedder, daemon=True) for _ in range(max(1, embed_workers))]
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    for thread in readers + embedders + [writer_thread]:
+        thread.start()
+
+    # reader → embedder → writer 순서로 종료 신호 전달
+    for thread in readers:
+        thread.join()
+    for _ in embedders:
+        embed_queue.put(_SENTINEL)
+    for thread in embedders:
+        thread.join()
+    write_queue.put(_SENTINEL)
+    writer_thread.join()
+    progress.close()
+
+    # 끝까지 읽은 카테고리에 한해 사라진 행 삭제
+    for category in completed:
+        deleted, failed_deletes = delete_removed(
+            collection, manifest, f"{category}_", seen[category], batch_size, store
+        )
+        counts["deleted"] += deleted
+        counts["failed"] += failed_deletes
+
+    wall_seconds = time.perf_counter() - wall_started
+    return {
+        **counts,
+        "seconds": round(wall_seconds, 3),
+        "stages": {name: stage.summary(wall_seconds) for name, stage in stages.items()}
+    }
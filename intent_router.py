@@ -0,0 +1,238 @@
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import (
+    CHROMA_DB_PATH, INTENT_ROUTER_FILENAME, ROUTER_CONFIDENCE,
+    ROUTER_LEXICON_MIN_COUNT, ROUTER_LEXICON_MIN_SHARE, ROUTER_PROTOTYPE_SAMPLE
+)
+from documents import TAG_FIELDS, field_value, normalize_tags
+
+# 데이터 태그만으로는 부족한 질문 표현 (카테고리별 기본 키워드)
+SEED_KEYWORDS = {
+    "음식": ["맛집", "식당", "음식", "먹을", "먹고", "카페", "브런치", "디저트", "술집", "메뉴", "밥집"],
+    "숙소": ["숙소", "호텔", "펜션", "리조트", "게스트하우스", "민박", "독채", "숙박", "묵을", "잘 곳", "캠핑장"],
+    "관광지": ["관광지", "명소", "가볼", "구경", "볼거리", "오름", "해변", "해수욕장", "박물관", "산책", "체험"],
+    "행사": ["축제", "행사", "공연", "전시", "이벤트", "페스티벌", "콘서트"]
+}
+
+# 일정/코스를 묻는 질문 (예: "2박3일", "당일치기 코스", "여행 일정 짜줘")
+# "일정"은 행사 일정이 아니라 여행 일정인 경우가 많으므로 어떤 카테고리의 키워드로도 쓰지 않음
+ITINERARY_PATTERN = re.compile(r"\d+\s*박\s*\d*\s*일?|당일치기|일정|코스|여행\s*계획")
+
+# 프로토타입 유사도를 확률로 바꿀 때의 온도 (작을수록 뾰족함)
+PROTOTYPE_TEMPERATURE = 0.05
+
+
+class IntentRouter:
+    def __init__(self, lexicon: Dict[str, Dict[str, float]], prototypes: Dict[str, List[float]],
+                 confidence: float = ROUTER_CONFIDENCE):
+        """
+        질문이 어떤 카테고리를 찾는지 예측하는 경량 분류기
+
+        태그/키워드 사전 일치 점수와 카테고리별 프로토타입 임베딩(평균 벡터) 유사도를 합쳐
+        카테고리 확률을 계산합니다.
+
+        Args:
+            lexicon: {키워드: {카테고리: 가중치}}
+            prototypes: {카테고리: 정규화된 평균 임베딩}
+            confidence: 필터를 적용할 최소 누적 확률
+        """
+        # 예전에 저장된 라우터에 남아 있을 수 있는 일정 단어 제외
+        self.lexicon = {
+            keyword: weights for keyword, weights in lexicon.items() if not ITINERARY_PATTERN.fullmatch(keyword)
+        }
+        self.categories = sorted({c for weights in lexicon.values() for c in weights} | set(prototypes))
+        self.prototype_categories = list(prototypes)
+        self.prototypes = np.asarray([prototypes[c] for c in self.prototype_categories], dtype=np.float32)
+        self.confidence = confidence
+
+    def lexicon_scores(self, query: str) -> Dict[str, float]:
+        """질문에 포함된 사전 키워드의 카테고리별 가중치 합 (긴 키워드일수록 가중치 큼)"""
+        text = query.casefold()
+        scores = defaultdict(float)
+        for keyword, weights in self.lexicon.items():
+            if keyword in text:
+                for category, weight in weights.items():
+                    scores[category] += weight * len(keyword)
+        return dict(scores)
+
+    def prototype_scores(self, query_embedding: Optional[Sequence[float]]) -> Dict[str, float]:
+        """프로토타입 임베딩과의 코사인 유사도를 softmax로 바꾼 카테고리 확률"""
+        if query_embedding is None or not len(self.prototypes):
+            return {}
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return {}
+        logits = self.prototypes @ (query / norm) / PROTOTYPE_TEMPERATURE
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        return dict(zip(self.prototype_categories, probs.tolist()))
+
+    def classify(self, query: str, query_embedding: Optional[Sequence[float]] = None) -> Dict[str, float]:
+        """
+        카테고리별 확률 계산
+
+        사전 키워드가 하나라도 일치하면 사전 점수와 프로토타입 확률을 반씩 섞고,
+        일치하지 않으면 프로토타입 확률만 사용합니다.
+
+        Args:
+            query: 사용자 질문
+            query_embedding: 질문 임베딩 (None이면 사전 점수만 사용)
+
+        Returns:
+            {카테고리: 확률} (확률 내림차순)
+        """
+        lexical = self.lexicon_scores(query)
+        prototype = self.prototype_scores(query_embedding)
+        total = sum(lexical.values())
+        if total:
+            lexical = {c: score / total for c, score in lexical.items()}
+            weight = 0.5 if prototype else 1.0
+            scores = {
+                c: weight * lexical.get(c, 0.0) + (1 - weight) * prototype.get(c, 0.0)
+                for c in self.categories
+            }
+        else:
+            scores = prototype
+        return dict(sorted(scores.items(), key=lambda item: item[1], reverse=True))
+
+    def route(self, query: str, query_embedding: Optional[Sequence[float]] = None,
+              max_categories: int = 2) -> Optional[List[str]]:
+        """
+        검색을 제한할 카테고리 예측
+
+        확률이 높은 카테고리부터 누적 확률이 confidence 이상이 될 때까지 고르고,
+        max_categories개로 부족하면 확신이 낮은 것으로 보고 None(필터 없음)을 반환합니다.
+
+        Args:
+            query: 사용자 질문
+            query_embedding: 질문 임베딩
+            max_categories: 최대 카테고리 수
+
+        Returns:
+            카테고리 리스트 또는 None
+        """
+        selected, cumulative = [], 0.0
+        for category, score in self.classify(query, query_embedding).items():
+            if len(selected) >= max_categories:
+                break
+            selected.append(category)
+            cumulative += score
+            if cumulative >= self.confidence:
+                return selected
+        return None
+
+    def save(self, path: str):
+        """라우터를 JSON으로 저장 (임시 파일에 쓴 뒤 교체)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "lexicon": self.lexicon,
+                "prototypes": {c: self.prototypes[i].tolist() for i, c in enumerate(self.prototype_categories)}
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentRouter":
+        """저장된 라우터 불러오기"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["lexicon"], data["prototypes"])
+
+
+def build_lexicon(store, min_count: int = ROUTER_LEXICON_MIN_COUNT,
+                  min_share: float = ROUTER_LEXICON_MIN_SHARE) -> Dict[str, Dict[str, float]]:
+    """
+    데이터 태그로 키워드 사전 생성
+
+    min_count번 이상 나오고 한 카테고리 비율이 min_share 이상인 태그만 남겨
+    "카드결제"처럼 모든 카테고리에 흔한 태그와 "일정"/"코스"처럼 일정 질문을 나타내는 단어는 제외합니다.
+
+    Args:
+        store: RecordStore
+        min_count: 최소 출현 횟수
+        min_share: 최소 카테고리 비율
+
+    Returns:
+        {키워드: {카테고리: 비율}}
+    """
+    counts: Dict[str, Counter] = defaultdict(Counter)
+    for _, _, record in store.iter_all():
+        category = record.get("category", "")
+        for tag in normalize_tags(field_value(record, TAG_FIELDS)):
+            if len(tag) >= 2 and not ITINERARY_PATTERN.fullmatch(tag):
+                counts[tag][category] += 1
+
+    lexicon = {}
+    for tag, by_category in counts.items():
+        total = sum(by_category.values())
+        category, top = by_category.most_common(1)[0]
+        if total >= min_count and top / total >= min_share:
+            lexicon[tag] = {category: round(top / total, 3)}
+    for category, keywords in SEED_KEYWORDS.items():
+        for keyword in keywords:
+            lexicon[keyword] = {category: 1.0}
+    return lexicon
+
+
+def build_prototypes(collection, categories: Sequence[str],
+                     sample: int = ROUTER_PROTOTYPE_SAMPLE) -> Dict[str, List[float]]:
+    """
+    카테고리별 저장된 임베딩 평균(정규화)으로 프로토타입 생성
+
+    Args:
+        collection: ChromaDB 컬렉션
+        categories: 카테고리 이름들
+        sample: 카테고리당 사용할 최대 문서 수
+
+    Returns:
+        {카테고리: 프로토타입 벡터}
+    """
+    prototypes = {}
+    for category in categories:
+        rows = collection.get(where={"category": category}, limit=sample, include=["embeddings"])
+        if not rows.get("embeddings"):
+            continue
+        vectors = np.asarray(rows["embeddings"], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        mean = vectors.mean(axis=0)
+        prototypes[category] = (mean / max(np.linalg.norm(mean), 1e-12)).tolist()
+    return prototypes
+
+
+def intent_router_path(db_path: str = CHROMA_DB_PATH) -> str:
+    """ChromaDB 디렉토리 안의 라우터 파일 경로"""
+    return os.path.join(db_path, INTENT_ROUTER_FILENAME)
+
+
+def build_intent_router(collection, store, categories: Sequence[str],
+                        db_path: str = CHROMA_DB_PATH) -> IntentRouter:
+    """
+    키워드 사전과 프로토타입으로 라우터를 만들어 저장
+
+    Args:
+        collection: ChromaDB 컬렉션
+        store: RecordStore
+        categories: 카테고리 이름들
+        db_path: 저장할 ChromaDB 디렉토리
+
+    Returns:
+        IntentRouter
+    """
+    router = IntentRouter(build_lexicon(store), build_prototypes(collection, categories))
+    router.save(intent_router_path(db_path))
+    return router
+
+
+def load_intent_router(db_path: str = CHROMA_DB_PATH) -> Optional[IntentRouter]:
+    """저장된 라우터 불러오기 (없으면 None)"""
+    path = intent_router_path(db_path)
+    if not os.path.exists(path):
+        return None
+    return IntentRouter.load(path)
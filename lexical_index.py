@@ -0,0 +1,223 @@
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import CHROMA_DB_PATH, LEXICAL_INDEX_FILENAME
+from documents import NAME_FIELDS, TAG_FIELDS, field_value
+
+# 형태소 분석기 없이 한국어에 쓸 수 있는 문자 n-gram 크기
+NGRAM_SIZES = (2, 3)
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def char_ngrams(text: str, sizes: Sequence[int] = NGRAM_SIZES) -> List[str]:
+    """
+    문자 n-gram 토큰 생성 (단어 단위로 자른 뒤 단어 안에서만 n-gram 생성)
+
+    Args:
+        text: 입력 문자열
+        sizes: n-gram 크기들
+
+    Returns:
+        토큰 리스트 (가장 짧은 n보다 짧은 단어는 그대로 사용)
+    """
+    tokens = []
+    for word in re.findall(r"\w+", str(text or "").casefold()):
+        if len(word) < min(sizes):
+            tokens.append(word)
+            continue
+        for n in sizes:
+            tokens.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return tokens
+
+
+def lexical_text(document: str, record: Dict) -> str:
+    """색인할 텍스트 (이름과 태그는 document에 더해 한 번 더 넣어 가중치를 높임)"""
+    return " ".join([
+        field_value(record, NAME_FIELDS),
+        field_value(record, TAG_FIELDS),
+        document
+    ])
+
+
+class LexicalIndex:
+    def __init__(self, doc_ids: Sequence[str], categories: Sequence[str], doc_lengths: np.ndarray,
+                 terms: Sequence[str], offsets: np.ndarray, postings: np.ndarray, frequencies: np.ndarray):
+        """
+        문자 n-gram BM25 역색인
+
+        term별 posting(문서 번호, 출현 횟수)을 하나의 배열에 이어 붙이고 offsets로 구간을 나눕니다.
+        build()로 만들고 save()/load()로 .npz 파일에 저장합니다.
+        """
+        self.doc_ids = list(doc_ids)
+        self.categories = np.asarray(categories)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+        self.terms = list(terms)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.postings = np.asarray(postings, dtype=np.int32)
+        self.frequencies = np.asarray(frequencies, dtype=np.float32)
+        self._term_index = {term: i for i, term in enumerate(self.terms)}
+        self._rows = {row_id: i for i, row_id in enumerate(self.doc_ids)}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, str, str]]) -> "LexicalIndex":
+        """
+        (id, 카테고리, 텍스트) 목록으로 색인 생성
+
+        Args:
+            rows: (id, 카테고리, 색인할 텍스트) 튜플들
+
+        Returns:
+            LexicalIndex
+        """
+        doc_ids, categories, lengths = [], [], []
+        term_postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for row_id, category, text in rows:
+            counts = Counter(char_ngrams(text))
+            doc = len(doc_ids)
+            doc_ids.append(row_id)
+            categories.append(category)
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                term_postings[term].append((doc, count))
+
+        terms = sorted(term_postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(term_postings[term])
+        postings = np.empty(offsets[-1], dtype=np.int32)
+        frequencies = np.empty(offsets[-1], dtype=np.float32)
+        for i, term in enumerate(terms):
+            pairs = np.asarray(term_postings[term], dtype=np.int64)
+            postings[offsets[i]:offsets[i + 1]] = pairs[:, 0]
+            frequencies[offsets[i]:offsets[i + 1]] = pairs[:, 1]
+        return cls(doc_ids, categories, np.asarray(lengths, dtype=np.float32), terms, offsets, postings, frequencies)
+
+    def scores(self, query: str) -> np.ndarray:
+        """질문에 대한 전체 문서 BM25 점수"""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        if not self.doc_ids:
+            return scores
+        n_docs = len(self.doc_ids)
+        for term, query_count in Counter(char_ngrams(query)).items():
+            i = self._term_index.get(term)
+            if i is None:
+                continue
+            docs = self.postings[self.offsets[i]:self.offsets[i + 1]]
+            tf = self.frequencies[self.offsets[i]:self.offsets[i + 1]]
+            idf = np.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[docs] / self.avg_length)
+            scores[docs] += query_count * idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, n_results: int = 10,
+               categories: Optional[Sequence[str]] = None,
+               ids: Optional[Collection[str]] = None) -> List[Tuple[str, float]]:
+        """
+        BM25 상위 문서 검색
+
+        Args:
+            query: 사용자 질문
+            n_results: 결과 개수
+            categories: 검색할 카테고리 (None이면 전체)
+            ids: 검색할 id 집합 (None이면 전체)
+
+        Returns:
+            (id, 점수) 리스트 (점수 내림차순, 점수 0인 문서 제외)
+        """
+        scores = self.scores(query)
+        if categories:
+            scores[~np.isin(self.categories, list(categories))] = 0
+        if ids is not None:
+            allowed = np.zeros(len(self.doc_ids), dtype=bool)
+            allowed[[self._rows[row_id] for row_id in ids if row_id in self._rows]] = True
+            scores[~allowed] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > n_results:
+            candidates = candidates[np.argpartition(-scores[candidates], n_results - 1)[:n_results]]
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.doc_ids[i], float(scores[i])) for i in ordered]
+
+    def save(self, path: str):
+        """색인을 .npz 파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            doc_ids=np.asarray(self.doc_ids, dtype=str),
+            categories=np.asarray(self.categories, dtype=str),
+            doc_lengths=self.doc_lengths,
+            terms=np.asarray(self.terms, dtype=str),
+            offsets=self.offsets,
+            postings=self.postings,
+            frequencies=self.frequencies
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LexicalIndex":
+        """저장된 색인 불러오기"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["doc_ids"].tolist(), data["categories"], data["doc_lengths"],
+                data["terms"].tolist(), data["offsets"], data["postings"], data["frequencies"]
+            )
+
+
+def lexical_index_path(db_path: str = CHROMA_DB_PATH) -> str:
+    """ChromaDB 디렉토리 안의 어휘 색인 파일 경로"""
+    return os.path.join(db_path, LEXICAL_INDEX_FILENAME)
+
+
+def build_lexical_index(store, db_path: str = CHROMA_DB_PATH) -> LexicalIndex:
+    """
+    레코드 저장소 전체로 어휘 색인을 만들어 저장
+
+    Args:
+        store: RecordStore
+        db_path: 저장할 ChromaDB 디렉토리
+
+    Returns:
+        LexicalIndex
+    """
+    index = LexicalIndex.build(
+        (row_id, record.get("category", ""), lexical_text(document, record))
+        for row_id, document, record in store.iter_all()
+    )
+    index.save(lexical_index_path(db_path))
+    return index
+
+
+def load_lexical_index(db_path: str = CHROMA_DB_PATH) -> Optional[LexicalIndex]:
+    """저장된 어휘 색인 불러오기 (없으면 None)"""
+    path = lexical_index_path(db_path)
+    if not os.path.exists(path):
+        return None
+    return LexicalIndex.load(path)
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    여러 순위 목록을 RRF로 합치기 (점수 = Σ 1 / (k + 순위))
+
+    Args:
+        rankings: id 순위 리스트들 (앞쪽이 상위)
+        k: 순위 완화 상수
+
+    Returns:
+        (id, RRF 점수) 리스트 (점수 내림차순)
+    """
+    fused: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, row_id in enumerate(ranking, 1):
+            fused[row_id] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
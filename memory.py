@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from async_runtime import get_async_ollama_client
+from config import (
+    MEMORY_MAX_TURNS, MEMORY_SUMMARY_ENABLED, MEMORY_SUMMARY_EVERY, MEMORY_SUMMARY_MODEL, MEMORY_SUMMARY_TOKENS,
+    OLLAMA_KEEP_ALIVE
+)
+from context_builder import get_tokenizer, truncate_to_tokens
+from metrics import LatencyStats
+from scheduler import get_scheduler
+
+# 요약 요청은 모든 세션이 하나의 대기열을 함께 써서 답변 생성 차례를 한 세션 몫 이상 차지하지 않음
+SUMMARY_SESSION = "memory-summary"
+
+SUMMARY_INSTRUCTION = (
+    "당신은 여행 상담 대화를 요약하는 도우미입니다. 기존 요약과 새 대화를 합쳐 하나의 요약으로 갱신하세요.\n"
+    "여행 날짜/기간, 인원과 동행(아이, 부모님 등), 예산, 지역, 선호/비선호, 이미 추천한 장소를 빠짐없이 남기고, "
+    "인사말이나 장소 설명은 빼세요. 한국어 개조식 5줄 이내로 요약만 출력하세요."
+)
+
+
+class ConversationMemory:
+    def __init__(self, max_turns: int = MEMORY_MAX_TURNS, summary_every: int = MEMORY_SUMMARY_EVERY,
+                 summary_model: str = MEMORY_SUMMARY_MODEL, summary_tokens: int = MEMORY_SUMMARY_TOKENS,
+                 summary_enabled: bool = MEMORY_SUMMARY_ENABLED):
+        """
+        크기가 정해진 대화 메모리 (최근 턴 링 버퍼 + 누적 요약)
+
+        원문은 최근 max_turns턴까지만 보관하고, 요약되지 않은 턴이 summary_every턴 이상 쌓이면
+        작은 모델이 기존 요약과 오래된 턴을 합쳐 요약을 갱신합니다. 요약은 답변이 끝난 뒤
+        이벤트 루프의 백그라운드 작업으로 실행되므로 답변 지연에 영향을 주지 않고,
+        요약에 반영된 턴은 버퍼에서 빠지므로 대화가 길어져도 메모리와 프롬프트 크기가 일정합니다.
+
+        Args:
+            max_turns: 원문으로 보관할 최대 턴 수 (넘치면 요약되지 않았더라도 가장 오래된 턴을 버림)
+            summary_every: 요약 갱신 주기 (턴)
+            summary_model: 요약용 Ollama 모델 (빈 값이면 답변 모델)
+            summary_tokens: 요약 최대 토큰
+            summary_enabled: False면 요약 없이 링 버퍼만 사용
+        """
+        self.max_turns = max(1, max_turns)
+        self.summary_every = max(1, summary_every)
+        self.summary_model = summary_model
+        self.summary_tokens = summary_tokens
+        self.summary_enabled = summary_enabled
+        self.turns = deque()
+        self.summary = ""
+        # 프롬프트에 넣는 최근 턴의 시작 위치 (turns 기준, 예산을 넘을 때만 앞으로 이동)
+        self.start = 0
+        # 버퍼에서 빠진 턴 수 (turns[0]의 전체 턴 번호)
+        self.offset = 0
+        self.total_turns = 0
+        # 요약에 반영되지 못하고 버려진 턴 수
+        self.dropped = 0
+        self.refresh_latency = LatencyStats()
+        self._task: Optional[asyncio.Task] = None
+        # 요약 중인 턴의 끝 번호 (요약 중 버퍼에서 밀려난 턴은 버린 것으로 세지 않음)
+        self._pending_upto = 0
+        # clear() 이전에 시작한 요약 결과는 버림
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def recent(self) -> List[tuple]:
+        """보관 중인 최근 턴 전체 (오래된 순)"""
+        with self._lock:
+            return list(self.turns)
+
+    def window(self, builder, budget: int) -> List[tuple]:
+        """
+        프롬프트에 넣을 최근 턴 (예산을 넘으면 ContextBuilder.history_start로 시작 위치를 옮김)
+
+        Args:
+            builder: ContextBuilder
+            budget: 이전 대화 토큰 예산
+
+        Returns:
+            (사용자 메시지, 챗봇 메시지) 리스트 (오래된 순)
+        """
+        with self._lock:
+            turns = list(self.turns)
+            self.start = builder.history_start(turns, self.start, budget)
+            return turns[self.start:]
+
+    def append(self, user_msg: str, bot_msg: str, fallback_model: Optional[str] = None):
+        """
+        완료된 턴 추가 (버퍼가 가득 차면 가장 오래된 턴을 버리고, 필요하면 요약 갱신 시작)
+
+        Args:
+            user_msg: 사용자 메시지
+            bot_msg: 챗봇 답변
+            fallback_model: summary_model이 비어 있을 때 요약에 사용할 모델
+        """
+        with self._lock:
+            if len(self.turns) >= self.max_turns:
+                self._pop_oldest()
+                if self.offset > self._pending_upto:
+                    self.dropped += 1
+            self.turns.append((user_msg, bot_msg))
+            self.total_turns += 1
+        self.maybe_refresh(fallback_model)
+
+    def maybe_refresh(self, fallback_model: Optional[str] = None):
+        """
+        요약할 턴이 충분히 쌓였으면 현재 이벤트 루프에서 요약 갱신 작업 시작 (이미 진행 중이면 건너뜀)
+
+        프롬프트 창에서 빠진 턴과, 최근 summary_every턴을 제외한 나머지를 요약합니다.
+        실행 중인 이벤트 루프가 없으면 아무것도 하지 않습니다.
+
+        Args:
+            fallback_model: summary_model이 비어 있을 때 사용할 모델
+        """
+        model = self.summary_model or fallback_model
+        if not self.summary_enabled or not model:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        with self._lock:
+            if self._task is not None and not self._task.done():
+                return
+            count = max(self.start, len(self.turns) - self.summary_every)
+            if count < self.summary_every:
+                return
+            turns = list(self.turns)[:count]
+            upto = self.offset + count
+            self._pending_upto = upto
+            self._task = loop.create_task(self._refresh(model, self.summary, turns, upto, self._epoch))
+
+    async def _refresh(self, model: str, summary: str, turns: List[tuple], upto: int, epoch: int):
+        """기존 요약 + 오래된 턴으로 새 요약을 만들고, 반영된 턴을 버퍼에서 제거"""
+        started = time.perf_counter()
+        dialogue = "\n".join(f"사용자: {user_msg}\n챗봇: {bot_msg}" for user_msg, bot_msg in turns)
+        try:
+            async with get_scheduler().slot(SUMMARY_SESSION):
+                response = await get_async_ollama_client().chat(
+                    model=model,
+                    messages=[
+                        {'role': 'system', 'content': SUMMARY_INSTRUCTION},
+                        {'role': 'user', 'content': f"기존 요약:\n{summary or '(없음)'}\n\n새 대화:\n{dialogue}"}
+                    ],
+                    options={'temperature': 0, 'num_predict': self.summary_tokens * 2},
+                    keep_alive=OLLAMA_KEEP_ALIVE
+                )
+            text = truncate_to_tokens(response['message']['content'].strip(), self.summary_tokens, get_tokenizer())
+        except Exception as e:
+            # 턴은 버퍼에 그대로 두고 다음 턴에 다시 시도
+            print(f"⚠️ 대화 요약 갱신 실패 ({model}): {e}")
+            with self._lock:
+                if epoch == self._epoch:
+                    self._pending_upto = self.offset
+            return
+        self.refresh_latency.record(time.perf_counter() - started)
+
+        with self._lock:
+            if epoch != self._epoch:
+                return
+            if text:
+                self.summary = text
+            while self.turns and self.offset < upto:
+                self._pop_oldest()
+        print(f"🧠 대화 요약 갱신: {len(turns)}턴 반영, {time.perf_counter() - started:.1f}초 ({model})")
+
+    def _pop_oldest(self):
+        """가장 오래된 턴 제거 (lock을 잡은 상태에서 호출)"""
+        self.turns.popleft()
+        self.offset += 1
+        self.start = max(0, self.start - 1)
+
+    def clear(self):
+        """메모리 초기화 (진행 중인 요약 결과는 버림)"""
+        with self._lock:
+            self.turns.clear()
+            self.summary = ""
+            self.start = 0
+            self.offset = 0
+            self.total_turns = 0
+            self.dropped = 0
+            self._pending_upto = 0
+            self._epoch += 1
+
+    def stats(self) -> Dict:
+        """보관 턴 수, 전체 턴 수, 요약에 반영된/버려진 턴 수, 요약 토큰 수, 요약 갱신 시간"""
+        with self._lock:
+            turns, offset, dropped, summary = len(self.turns), self.offset, self.dropped, self.summary
+        return {
+            "turns": turns,
+            "total_turns": self.total_turns,
+            "summarized_turns": offset - dropped,
+            "dropped_turns": dropped,
+            "summary_tokens": get_tokenizer()(summary),
+            "refresh": self.refresh_latency.summary()
+        }
@@ -0,0 +1,129 @@
+import threading
+from collections import Counter, deque
+from typing import Dict, Optional, Sequence
+
+
+class LatencyStats:
+    def __init__(self, window: int = 1000):
+        """
+        최근 호출의 지연 시간 통계 (스레드 안전)
+
+        Args:
+            window: 백분위수 계산에 사용할 최근 측정값 개수
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+
+    def record(self, seconds: float):
+        """지연 시간 기록 (초 단위 입력)"""
+        ms = seconds * 1000
+        with self._lock:
+            self._samples.append(ms)
+            self.count += 1
+            self.total_ms += ms
+
+    def percentile(self, pct: float) -> float:
+        """최근 측정값의 nearest-rank 백분위수 (ms)"""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return 0.0
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+    def summary(self) -> Dict:
+        """호출 수, 평균, p50/p95/p99 (ms)"""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2)
+        }
+
+
+class GenerationStats:
+    def __init__(self, window: int = 1000):
+        """
+        답변 생성 턴별 첫 토큰 시간(TTFT), 토큰 생성 속도, 프롬프트 평가 토큰, 시간 초과/오류/헤지 통계 (스레드 안전)
+
+        Args:
+            window: 통계 계산에 사용할 최근 턴 수
+        """
+        self.ttft = LatencyStats(window)
+        self._rates = deque(maxlen=window)
+        self._prompt_evals = deque(maxlen=window)
+        # 턴 결과(ok/timeout/error/cancelled)와 추가 호출(hedge/retry) 횟수, 추가 호출이 답변한 횟수
+        self.outcomes = Counter()
+        self.extra_calls = Counter()
+        self.fallback_wins = 0
+        self._lock = threading.Lock()
+
+    def record(self, ttft_seconds: float, tokens_per_sec: float,
+               prompt_eval_count: Optional[int] = None, prompt_tokens: Optional[int] = None):
+        """
+        한 턴의 생성 통계 기록
+
+        Args:
+            ttft_seconds: 첫 토큰까지 걸린 시간 (초)
+            tokens_per_sec: 초당 생성 토큰 수
+            prompt_eval_count: Ollama가 새로 평가한 프롬프트 토큰 수 (KV 캐시 재사용분 제외)
+            prompt_tokens: 프롬프트 전체 토큰 수 (추정치)
+        """
+        self.ttft.record(ttft_seconds)
+        with self._lock:
+            self._rates.append(tokens_per_sec)
+            if prompt_eval_count is not None and prompt_tokens:
+                self._prompt_evals.append((prompt_eval_count, prompt_tokens))
+
+    def record_outcome(self, outcome: str, reasons: Sequence[str] = (), fallback_won: bool = False):
+        """
+        한 턴의 생성 결과 기록
+
+        Args:
+            outcome: "ok" / "timeout" / "error" / "cancelled"
+            reasons: 보낸 호출 종류 ("primary", "hedge", "retry")
+            fallback_won: 헤지/재시도 호출이 답변했는지
+        """
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.extra_calls.update(reason for reason in reasons if reason != "primary")
+            self.fallback_wins += int(fallback_won)
+
+    def summary(self) -> Dict:
+        """
+        턴 수, TTFT p50/p95 (ms), 평균/p50 초당 토큰 수, 평균 프롬프트 평가 토큰 수와 재사용 비율,
+        시간 초과/오류/중단 턴 수, 헤지/재시도 횟수와 그중 답변한 횟수
+        """
+        with self._lock:
+            rates = sorted(self._rates)
+            prompt_evals = list(self._prompt_evals)
+            outcomes, extra_calls, fallback_wins = dict(self.outcomes), dict(self.extra_calls), self.fallback_wins
+        ttft = self.ttft.summary()
+        evaluated = sum(count for count, _ in prompt_evals)
+        total = sum(tokens for _, tokens in prompt_evals)
+        return {
+            "turns": ttft["count"],
+            "ttft_p50_ms": ttft["p50_ms"],
+            "ttft_p95_ms": ttft["p95_ms"],
+            "tokens_per_sec_mean": round(sum(rates) / len(rates), 1) if rates else 0.0,
+            "tokens_per_sec_p50": round(rates[max(0, (len(rates) + 1) // 2 - 1)], 1) if rates else 0.0,
+            "prompt_eval_mean": round(evaluated / len(prompt_evals), 1) if prompt_evals else 0.0,
+            "prompt_reuse": round(max(0.0, 1 - evaluated / total), 3) if total else 0.0,
+            "timeouts": outcomes.get("timeout", 0),
+            "errors": outcomes.get("error", 0),
+            "cancelled": outcomes.get("cancelled", 0),
+            "hedges": extra_calls.get("hedge", 0),
+            "retries": extra_calls.get("retry", 0),
+            "fallback_wins": fallback_wins
+        }
+
+
+_generation_stats = GenerationStats()
+
+
+def get_generation_stats() -> GenerationStats:
+    """프로세스 전체에서 공유하는 답변 생성 통계"""
+    return _generation_stats
@@ -0,0 +1,245 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import ollama
+import requests
+
+from config import (
+    OLLAMA_HOST, OLLAMA_KEEP_ALIVE, OLLAMA_PING_IDLE_SECONDS, OLLAMA_PING_SECONDS, OLLAMA_PREWARM_ENABLED,
+    OLLAMA_PS_CACHE_SECONDS
+)
+from metrics import LatencyStats
+
+
+class ModelManager:
+    def __init__(self, host: Optional[str] = OLLAMA_HOST, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 ping_seconds: int = OLLAMA_PING_SECONDS, prewarm: bool = OLLAMA_PREWARM_ENABLED,
+                 idle_seconds: int = OLLAMA_PING_IDLE_SECONDS, ps_cache_seconds: float = OLLAMA_PS_CACHE_SECONDS):
+        """
+        Ollama 모델 상주 관리 (미리 올리기, keep-alive 갱신, 상주 모델 조회, 다음 모델 예열)
+
+        Ollama는 빈 프롬프트의 /api/generate 요청을 받으면 모델만 메모리에 올리고,
+        keep_alive=0이면 내립니다. 미리 올리기는 백그라운드 스레드에서 실행되므로 화면을 막지 않습니다.
+        keep-alive 갱신은 idle_seconds 동안 질문(touch)이 없으면 멈추고, 그 뒤로는 Ollama가 keep_alive에 따라 모델을 내립니다.
+
+        Args:
+            host: Ollama 서버 주소 (None이면 ollama 라이브러리 기본값)
+            keep_alive: 요청마다 전달할 모델 유지 시간 ("30m", 초 단위 숫자, -1이면 계속)
+            ping_seconds: 유휴 중 활성 모델의 keep-alive 갱신 주기 (0이면 갱신하지 않음)
+            prewarm: 모델 전환 기록으로 예측한 다음 모델도 미리 올릴지
+            idle_seconds: 마지막 질문 후 keep-alive 갱신을 계속할 시간 (0이면 제한 없음)
+            ps_cache_seconds: 상주 모델 목록을 다시 조회하지 않고 재사용할 시간
+        """
+        self.client = ollama.Client(host=host)
+        base_url = host or "http://127.0.0.1:11434"
+        self.base_url = (base_url if "://" in base_url else f"http://{base_url}").rstrip("/")
+        self.keep_alive = keep_alive
+        self.ping_seconds = ping_seconds
+        self.prewarm = prewarm
+        self.idle_seconds = idle_seconds
+        self.ps_cache_seconds = ps_cache_seconds
+        self.active: Optional[str] = None
+        self.pings = 0
+        self.last_request = time.monotonic()
+        # (조회 시각, 상주 모델 목록)
+        self._resident: Optional[tuple] = None
+        # 모델별 로드/언로드 시간 (로드는 Ollama가 보고한 load_duration, 이미 상주 중이면 거의 0)
+        self.load_stats: Dict[str, LatencyStats] = defaultdict(LatencyStats)
+        self.unload_stats: Dict[str, LatencyStats] = defaultdict(LatencyStats)
+        self.last_load_ms: Dict[str, float] = {}
+        # 이전 모델 → 다음에 고른 모델 횟수
+        self._transitions: Dict[str, Counter] = defaultdict(Counter)
+        self._pending: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ollama-warmup")
+        self._pinger: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def load(self, model: str) -> float:
+        """
+        모델을 메모리에 올리고 keep-alive 갱신 (이미 상주 중이면 바로 반환)
+
+        Args:
+            model: 모델 이름
+
+        Returns:
+            로드 시간 (ms, Ollama가 보고한 load_duration이 없으면 요청 전체 시간)
+        """
+        started = time.perf_counter()
+        response = self.client.generate(model=model, keep_alive=self.keep_alive)
+        elapsed = time.perf_counter() - started
+        seconds = response['load_duration'] / 1e9 if response.get('load_duration') is not None else elapsed
+        self.load_stats[model].record(seconds)
+        self.last_load_ms[model] = round(seconds * 1000, 1)
+        return self.last_load_ms[model]
+
+    def unload(self, model: str) -> float:
+        """
+        모델을 메모리에서 내리기 (keep_alive=0)
+
+        Args:
+            model: 모델 이름
+
+        Returns:
+            언로드 요청 시간 (ms)
+        """
+        started = time.perf_counter()
+        self.client.generate(model=model, keep_alive=0)
+        elapsed = time.perf_counter() - started
+        self.unload_stats[model].record(elapsed)
+        self._resident = None
+        return round(elapsed * 1000, 1)
+
+    def preload(self, model: str) -> Future:
+        """
+        백그라운드에서 모델 올리기 (같은 모델의 로드가 진행 중이면 그 작업을 반환)
+
+        Args:
+            model: 모델 이름
+
+        Returns:
+            로드 시간(ms)을 결과로 주는 Future
+        """
+        with self._lock:
+            pending = self._pending.get(model)
+            if pending is not None and not pending.done():
+                return pending
+            future = self._executor.submit(self._load_quietly, model)
+            self._pending[model] = future
+            return future
+
+    def _load_quietly(self, model: str) -> Optional[float]:
+        """preload용: 실패해도 예외 대신 경고만 출력"""
+        try:
+            load_ms = self.load(model)
+            self._resident = None
+            print(f"🔥 모델 준비 완료: {model} ({load_ms}ms)")
+            return load_ms
+        except Exception as e:
+            print(f"⚠️ 모델 미리 올리기 실패 ({model}): {e}")
+            return None
+
+    def activate(self, model: str) -> Future:
+        """
+        사용할 모델 지정: 미리 올리고, keep-alive 갱신을 시작하고, 필요하면 다음 모델도 예열
+
+        Args:
+            model: 선택한 모델 이름
+
+        Returns:
+            선택한 모델의 preload Future
+        """
+        with self._lock:
+            if self.active is not None and self.active != model:
+                self._transitions[self.active][model] += 1
+            self.active = model
+            self.last_request = time.monotonic()
+            self._resident = None
+        future = self.preload(model)
+        if self.prewarm:
+            next_model = self.predict_next(model)
+            if next_model:
+                self.preload(next_model)
+        self._start_pinger()
+        return future
+
+    def predict_next(self, model: str) -> Optional[str]:
+        """model 다음에 가장 자주 고른 모델 (전환 기록이 없으면 None)"""
+        with self._lock:
+            counts = self._transitions.get(model)
+            if not counts:
+                return None
+            return counts.most_common(1)[0][0]
+
+    def touch(self):
+        """질문이 들어왔음을 기록 (멈춘 keep-alive 갱신도 다시 시작)"""
+        self.last_request = time.monotonic()
+        if self.active is not None:
+            self._start_pinger()
+
+    def resident(self, refresh: bool = False) -> List[Dict]:
+        """
+        현재 메모리에 올라와 있는 모델 목록 (Ollama /api/ps)
+
+        Streamlit이 위젯을 조작할 때마다 다시 실행되므로 ps_cache_seconds 동안은 이전 결과를 재사용하고,
+        모델을 올리거나 내리면 다음 호출에서 다시 조회합니다.
+
+        Args:
+            refresh: 캐시를 무시하고 다시 조회할지
+
+        Returns:
+            [{"name", "size_vram", "expires_at"}] (조회 실패 시 빈 리스트)
+        """
+        cached = self._resident
+        if not refresh and cached is not None and time.monotonic() - cached[0] < self.ps_cache_seconds:
+            return cached[1]
+        try:
+            # ollama 0.1.7 클라이언트에는 ps()가 없어 HTTP로 직접 요청
+            response = requests.get(f"{self.base_url}/api/ps", timeout=2)
+            response.raise_for_status()
+            models = [
+                {"name": item.get('name'), "size_vram": item.get('size_vram', 0), "expires_at": item.get('expires_at')}
+                for item in response.json().get('models', [])
+            ]
+        except Exception as e:
+            print(f"⚠️ 상주 모델 조회 실패: {e}")
+            models = []
+        self._resident = (time.monotonic(), models)
+        return models
+
+    def _start_pinger(self):
+        """활성 모델의 keep-alive를 주기적으로 갱신하는 데몬 스레드 시작 (한 번만)"""
+        if self.ping_seconds <= 0:
+            return
+        with self._lock:
+            if self._pinger is not None and self._pinger.is_alive():
+                return
+            self._pinger = threading.Thread(target=self._ping_loop, name="ollama-keepalive", daemon=True)
+            self._pinger.start()
+
+    def _ping_loop(self):
+        """ping_seconds마다 활성 모델에 빈 요청을 보내 만료 시각 연장 (idle_seconds 동안 질문이 없으면 종료)"""
+        while True:
+            time.sleep(self.ping_seconds)
+            if self.idle_seconds > 0 and time.monotonic() - self.last_request >= self.idle_seconds:
+                print(f"💤 {self.idle_seconds}초 동안 질문이 없어 keep-alive 갱신을 멈춥니다")
+                return
+            model = self.active
+            if model is None:
+                continue
+            try:
+                self.client.generate(model=model, keep_alive=self.keep_alive)
+                self.pings += 1
+            except Exception as e:
+                print(f"⚠️ keep-alive 갱신 실패 ({model}): {e}")
+
+    def stats(self) -> Dict:
+        """활성 모델, 갱신 횟수, 모델별 로드/언로드 시간"""
+        models = {}
+        for model in sorted(set(self.load_stats) | set(self.unload_stats)):
+            load = self.load_stats[model].summary()
+            unload = self.unload_stats[model].summary()
+            models[model] = {
+                "loads": load["count"],
+                "last_load_ms": self.last_load_ms.get(model),
+                "load_p50_ms": load["p50_ms"],
+                "load_p95_ms": load["p95_ms"],
+                "unloads": unload["count"],
+                "unload_p50_ms": unload["p50_ms"]
+            }
+        return {"active": self.active, "pings": self.pings, "models": models}
+
+
+_manager: Optional[ModelManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_model_manager() -> ModelManager:
+    """프로세스 전체에서 공유하는 모델 관리자 (Streamlit 재실행/세션 간 공유)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ModelManager()
+        return _manager
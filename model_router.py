@@ -0,0 +1,189 @@
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Optional, Sequence
+
+from config import DIRECT_ANSWER_ENABLED, MODEL_ROUTING_ENABLED, MODEL_TIERS, PROMPT_VARIANTS
+from metrics import LatencyStats
+from query_planner import is_itinerary
+
+TIERS = ("lookup", "recommend", "itinerary")
+TIER_LABELS = {"lookup": "정보 조회", "recommend": "추천", "itinerary": "여행 일정"}
+
+# 장소의 특정 정보를 묻는 표현
+LOOKUP_PATTERN = re.compile(
+    r"주소|위치|어디에\s*있|어디야|가는\s*길|전화|번호|연락처|영업\s*시간|운영\s*시간|몇\s*시|휴무|쉬는\s*날|"
+    r"주차|입장료|요금|가격"
+)
+# 새 장소를 찾는 표현 (정보 조회 표현과 함께 나오면 추천으로 봄)
+RECOMMEND_PATTERN = re.compile(r"추천|가볼|갈\s*만한|갈만한|좋은\s*곳|괜찮은|어디\s*가|뭐\s*먹|근처")
+
+# LLM 없이 메타데이터로 답할 수 있는 정보: (항목 필드, 표시 이름, 질문 표현)
+FACT_FIELDS = [
+    ("address", "📍 주소", re.compile(r"주소|위치|어디에\s*있|어디야|가는\s*길")),
+    ("phone", "📞 전화번호", re.compile(r"전화|번호|연락처"))
+]
+MISSING_VALUES = {"주소 없음", "전화번호 없음", ""}
+
+_SPACE = re.compile(r"\s+")
+
+
+def _compact(text: str) -> str:
+    """공백 제거 + 소문자 (장소 이름 일치 확인용)"""
+    return _SPACE.sub("", str(text or "")).casefold()
+
+
+class ModelRouter:
+    def __init__(self, tiers: Dict[str, str] = MODEL_TIERS, prompts: Dict[str, str] = PROMPT_VARIANTS,
+                 enabled: bool = MODEL_ROUTING_ENABLED, direct_answers: bool = DIRECT_ANSWER_ENABLED):
+        """
+        질문 유형(정보 조회 / 추천 / 여행 일정)별로 답변 모델과 프롬프트를 고르는 라우터
+
+        규칙 기반이라 임베딩이나 LLM 호출 없이 바로 분류하고, 장소 이름과 주소/전화번호를 묻는
+        조회 질문은 검색된 메타데이터로 바로 답할 수 있습니다.
+
+        Args:
+            tiers: {유형: 모델 이름} (빈 값이면 선택한 모델)
+            prompts: {유형: 프롬프트 파일}
+            enabled: False면 모든 질문을 일정 유형(선택한 모델 + 기본 프롬프트)으로 처리
+            direct_answers: 조회 질문을 메타데이터로 바로 답할지
+        """
+        self.tiers = tiers
+        self.prompts = prompts
+        self.enabled = enabled
+        self.direct_answers = direct_answers
+        self.counts = Counter()
+        self.direct_counts = Counter()
+        self.overrides = 0
+        self.latency: Dict[str, LatencyStats] = defaultdict(LatencyStats)
+        self._lock = threading.Lock()
+
+    def classify(self, query: str) -> str:
+        """
+        질문 유형 분류
+
+        일정/코스 질문은 itinerary, 장소 정보를 묻고 새 장소를 찾지 않는 질문은 lookup,
+        나머지는 recommend입니다.
+
+        Args:
+            query: 사용자 질문
+
+        Returns:
+            "lookup" / "recommend" / "itinerary"
+        """
+        if is_itinerary(query):
+            return "itinerary"
+        if LOOKUP_PATTERN.search(query) and not RECOMMEND_PATTERN.search(query):
+            return "lookup"
+        return "recommend"
+
+    def route(self, query: str, default_model: str, override: Optional[str] = None) -> Dict:
+        """
+        질문에 사용할 유형, 모델, 프롬프트 파일 결정
+
+        Args:
+            query: 사용자 질문
+            default_model: 사이드바에서 선택한 모델
+            override: 수동으로 지정한 유형 (None이면 자동 분류)
+
+        Returns:
+            {"tier", "model", "prompt", "override"}
+        """
+        if override in TIERS:
+            tier = override
+        elif self.enabled:
+            tier = self.classify(query)
+        else:
+            tier = "itinerary"
+        return {
+            "tier": tier,
+            "model": self.tiers.get(tier) or default_model,
+            "prompt": self.prompts.get(tier, PROMPT_VARIANTS["itinerary"]),
+            "override": override in TIERS
+        }
+
+    def direct_answer(self, query: str, relevant_info: Sequence[Dict]) -> Optional[str]:
+        """
+        이름이 질문에 나온 장소의 주소/전화번호를 묻는 질문이면 메타데이터로 답변 만들기
+
+        메타데이터에 없는 항목(영업시간, 요금 등)도 물어보거나 질문에 나온 장소가 검색 결과에 없으면
+        None을 반환해 작은 모델이 답하게 합니다. 주소/전화번호가 비어 있으면 등록된 정보가 없다고 답합니다.
+
+        Args:
+            query: 사용자 질문
+            relevant_info: 원본 레코드로 채워진 검색 결과
+
+        Returns:
+            답변 문자열 또는 None
+        """
+        if not self.direct_answers:
+            return None
+        compact_query = _compact(query)
+        matches = [
+            info for info in relevant_info
+            if len(_compact(info.get('name'))) >= 2 and _compact(info.get('name')) in compact_query
+        ]
+        if not matches:
+            return None
+        place = max(matches, key=lambda info: len(_compact(info['name'])))
+        # 질문에서 장소 이름을 떼어 내고 남은 부분으로 물어본 정보를 판단 (이름에 "번호" 등이 들어갈 수 있음)
+        rest = query.replace(place['name'], " ")
+        asked = [(field, label) for field, label, pattern in FACT_FIELDS if pattern.search(rest)]
+        if not asked:
+            return None
+        for _, _, pattern in FACT_FIELDS:
+            rest = pattern.sub(" ", rest)
+        if LOOKUP_PATTERN.search(rest):
+            # 주소/전화번호 외의 정보(영업시간, 요금 등)도 물어봄
+            return None
+        lines = [f"**{place['name']}** ({place.get('category', '')})"]
+        for field, label in asked:
+            value = str(place.get(field) or "").strip()
+            lines.append(f"{label}: {'등록된 정보가 없습니다' if value in MISSING_VALUES else value}")
+        return "\n".join(lines)
+
+    def record(self, tier: str, seconds: float, direct: bool = False, override: bool = False):
+        """
+        한 턴의 유형과 답변 시간 기록
+
+        Args:
+            tier: 질문 유형
+            seconds: 답변 완료까지 걸린 시간
+            direct: 메타데이터로 바로 답했는지
+            override: 수동으로 지정한 유형인지
+        """
+        with self._lock:
+            self.counts[tier] += 1
+            if direct:
+                self.direct_counts[tier] += 1
+            if override:
+                self.overrides += 1
+        self.latency[tier].record(seconds)
+
+    def stats(self) -> Dict:
+        """유형별 턴 수, 메타데이터 직접 답변 수, 답변 시간 p50/p95, 수동 지정 횟수"""
+        with self._lock:
+            counts, direct, overrides = dict(self.counts), dict(self.direct_counts), self.overrides
+        tiers = {}
+        for tier in TIERS:
+            latency = self.latency[tier].summary()
+            tiers[tier] = {
+                "turns": counts.get(tier, 0),
+                "direct": direct.get(tier, 0),
+                "p50_ms": latency["p50_ms"],
+                "p95_ms": latency["p95_ms"]
+            }
+        return {"tiers": tiers, "overrides": overrides}
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """프로세스 전체에서 공유하는 모델 라우터 (통계는 모든 세션 합산)"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
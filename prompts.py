@@ -0,0 +1,44 @@
+import os
+import threading
+from typing import Dict, Tuple
+
+from response_cache import prompt_version
+
+DEFAULT_SYSTEM_PROMPT = "당신은 제주도 여행 전문가입니다. 사용자에게 유용한 여행 정보를 제공해주세요."
+
+# {경로: ((수정 시각 ns, 크기), 내용, 버전)}
+_templates: Dict[str, Tuple[Tuple[int, int], str, str]] = {}
+_lock = threading.Lock()
+
+
+def load_template(path: str = "prompt.txt", default: str = DEFAULT_SYSTEM_PROMPT) -> Tuple[str, str]:
+    """
+    프롬프트 파일을 한 번만 읽고 수정 시각이 바뀔 때만 다시 읽기
+
+    매 턴 파일 전체를 읽는 대신 stat만 확인하므로, 프롬프트 편집 탭에서 저장한 내용도
+    다음 턴부터 바로 반영됩니다.
+
+    Args:
+        path: 프롬프트 파일 경로
+        default: 파일이 없을 때 사용할 프롬프트
+
+    Returns:
+        (프롬프트 내용, 내용 해시 버전)
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return default, prompt_version(default)
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        cached = _templates.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    version = prompt_version(text)
+    with _lock:
+        _templates[path] = (key, text, version)
+    return text, version
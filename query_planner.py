@@ -0,0 +1,59 @@
+import re
+from typing import Dict, List, Optional
+
+from intent_router import ITINERARY_PATTERN, SEED_KEYWORDS
+
+# 하위 질문에 붙일 카테고리 대표 단어 (질문에 해당 카테고리 키워드가 없을 때)
+CATEGORY_LABELS = {"음식": "맛집", "숙소": "숙소", "관광지": "관광지", "행사": "축제"}
+
+# 일정 질문에서 카테고리를 언급하지 않았을 때 나눠 검색할 카테고리
+DEFAULT_ITINERARY_CATEGORIES = ("관광지", "음식", "숙소")
+
+
+def is_itinerary(query: str) -> bool:
+    """일정/코스를 묻는 질문인지 확인"""
+    return bool(ITINERARY_PATTERN.search(query))
+
+
+def decompose_query(query: str) -> Optional[List[Dict]]:
+    """
+    일정형 질문을 카테고리별 하위 질문으로 나누기
+
+    "2박3일 가족여행, 맛집·숙소·관광지" →
+    [{"query": "2박3일 가족여행 맛집", "categories": ["음식"]},
+     {"query": "2박3일 가족여행 숙소", "categories": ["숙소"]}, ...]
+
+    Args:
+        query: 사용자 질문
+
+    Returns:
+        하위 질문 리스트 ({"query", "categories"}), 일정형 질문이 아니면 None
+    """
+    if not is_itinerary(query):
+        return None
+
+    # "일정"처럼 일정 질문을 나타내는 단어는 카테고리 키워드로 보지 않음
+    text = query.casefold()
+    mentioned = {}
+    for category, keywords in SEED_KEYWORDS.items():
+        hits = [keyword for keyword in keywords if keyword in text and not ITINERARY_PATTERN.fullmatch(keyword)]
+        if hits:
+            mentioned[category] = hits
+
+    # 카테고리 키워드, 구분 기호, 한 글자 조사를 뺀 나머지(기간, 동행, 지역 등)는 모든 하위 질문에 공통으로 붙임
+    base = text
+    for keyword in sorted({k for keywords in SEED_KEYWORDS.values() for k in keywords}, key=len, reverse=True):
+        base = base.replace(keyword, " ")
+    base = " ".join(word for word in re.findall(r"\w+", base) if len(word) > 1)
+
+    categories = [c for c in SEED_KEYWORDS if c in mentioned]
+    if not categories:
+        # 당일치기는 숙소가 필요 없음
+        categories = [c for c in DEFAULT_ITINERARY_CATEGORIES if not (c == "숙소" and "당일" in text)]
+    return [
+        {
+            "query": f"{base} {' '.join(mentioned.get(category, [CATEGORY_LABELS[category]]))}".strip(),
+            "categories": [category]
+        }
+        for category in categories
+    ]
@@ -0,0 +1,162 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import CHROMA_DB_PATH, RECORD_STORE_FILENAME
+
+
+class RecordStore:
+    def __init__(self, db_path: str = CHROMA_DB_PATH, filename: str = RECORD_STORE_FILENAME):
+        """
+        id로 원본 레코드와 document를 조회하는 저장소
+
+        ChromaDB에는 필터용 메타데이터만 두고, 답변에 필요한 전체 레코드는
+        검색된 상위 k개에 대해서만 이 저장소에서 가져옵니다.
+        증분 로딩 매니페스트(행 id → 해시)도 같은 파일의 row_hashes 테이블에 두어
+        배치마다 레코드와 해시를 한 트랜잭션으로 기록합니다.
+
+        Args:
+            db_path: ChromaDB 디렉토리 (같은 위치에 저장)
+            filename: SQLite 파일명
+        """
+        self.path = os.path.join(db_path, filename)
+        self._lock = threading.Lock()
+        os.makedirs(db_path, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS records (
+                id TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                document TEXT NOT NULL,
+                record TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS row_hashes (id TEXT PRIMARY KEY, hash TEXT NOT NULL)")
+        self._conn.commit()
+
+    def put_many(self, ids: List[str], documents: List[str], records: List[Dict],
+                 hashes: Optional[List[str]] = None):
+        """
+        레코드 저장 (같은 id는 덮어씀)
+
+        Args:
+            ids: 레코드 id 리스트
+            documents: document 리스트
+            records: 원본 레코드 리스트
+            hashes: 함께 기록할 행 해시 (None이면 레코드만 저장)
+        """
+        rows = [
+            (row_id, record.get("category", ""), document, json.dumps(record, ensure_ascii=False))
+            for row_id, document, record in zip(ids, documents, records)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO records (id, category, document, record) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            if hashes is not None:
+                self._put_hashes(ids, hashes)
+            self._conn.commit()
+
+    def put_hashes(self, ids: List[str], hashes: List[str]):
+        """행 해시만 기록 (레코드를 저장하지 않는 적재용)"""
+        with self._lock:
+            self._put_hashes(ids, hashes)
+            self._conn.commit()
+
+    def _put_hashes(self, ids: List[str], hashes: List[str]):
+        """행 해시 기록 (lock을 잡은 상태에서 호출, commit은 호출한 쪽에서)"""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO row_hashes (id, hash) VALUES (?, ?)", list(zip(ids, hashes))
+        )
+
+    def get_hashes(self, ids: List[str]) -> Dict[str, str]:
+        """
+        id 리스트로 행 해시 조회
+
+        Args:
+            ids: 행 id 리스트
+
+        Returns:
+            {id: 해시} (기록이 없는 id는 제외)
+        """
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, hash FROM row_hashes WHERE id IN ({placeholders})", list(ids)
+            ).fetchall()
+        return dict(rows)
+
+    def hashed_ids(self, prefix: str = "") -> List[str]:
+        """해시가 기록된 id 목록 (prefix로 시작하는 id만)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM row_hashes WHERE substr(id, 1, ?) = ?", (len(prefix), prefix)
+            ).fetchall()
+        return [row_id for (row_id,) in rows]
+
+    def hash_count(self) -> int:
+        """해시가 기록된 행 수"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM row_hashes").fetchone()[0]
+
+    def delete_hashes(self, ids: Optional[List[str]] = None):
+        """행 해시 삭제 (ids가 None이면 전체)"""
+        with self._lock:
+            if ids is None:
+                self._conn.execute("DELETE FROM row_hashes")
+            else:
+                self._conn.executemany("DELETE FROM row_hashes WHERE id = ?", [(row_id,) for row_id in ids])
+            self._conn.commit()
+
+    def get_many(self, ids: List[str]) -> Dict[str, Dict]:
+        """
+        id 리스트로 레코드 조회
+
+        Args:
+            ids: 레코드 id 리스트
+
+        Returns:
+            {id: 레코드} (없는 id는 제외)
+        """
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, record FROM records WHERE id IN ({placeholders})", list(ids)
+            ).fetchall()
+        return {row_id: json.loads(record) for row_id, record in rows}
+
+    def delete_many(self, ids: List[str]):
+        """레코드와 행 해시 삭제 (한 트랜잭션)"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM records WHERE id = ?", [(row_id,) for row_id in ids])
+            self._conn.executemany("DELETE FROM row_hashes WHERE id = ?", [(row_id,) for row_id in ids])
+            self._conn.commit()
+
+    def count(self) -> int:
+        """저장된 레코드 수"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def iter_all(self) -> Iterator[Tuple[str, str, Dict]]:
+        """전체 (id, document, 레코드) 순회 (보조 인덱스 생성용, 1000개씩 나눠 읽음)"""
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, id, document, record FROM records WHERE rowid > ? ORDER BY rowid LIMIT 1000",
+                    (last_rowid,)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, row_id, document, record in rows:
+                yield row_id, document, json.loads(record)
+            last_rowid = rows[-1][0]
@@ -0,0 +1,192 @@
+import json
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+from config import CHROMA_DB_PATH, REGION_INDEX_FILENAME, REGION_MIN_IDS
+from documents import ADDRESS_FIELDS, field_value
+
+# 도로명 주소에는 동/리가 빠진 경우가 많아 자주 묻는 마을/명소는 소속 읍·면·시로 연결
+LANDMARK_ALIASES = {
+    "협재": "한림읍", "금능": "한림읍",
+    "함덕": "조천읍", "선흘": "조천읍", "교래": "조천읍",
+    "월정": "구좌읍", "세화": "구좌읍", "김녕": "구좌읍", "종달": "구좌읍", "송당": "구좌읍",
+    "곽지": "애월읍", "한담": "애월읍",
+    "섭지코지": "성산읍", "일출봉": "성산읍",
+    "모슬포": "대정읍", "송악산": "대정읍", "가파도": "대정읍", "마라도": "대정읍",
+    "산방산": "안덕면", "사계": "안덕면",
+    "위미": "남원읍", "쇠소깍": "서귀포시",
+    "중문": "서귀포시", "이호테우": "제주시", "제주공항": "제주시"
+}
+
+# 질문에 흔히 들어가지만 지역 제한으로 쓰면 안 되는 별칭 ("제주 맛집"은 제주 전체)
+STOP_ALIASES = {"제주"}
+
+_CITY = re.compile(r"^([가-힣]+시)$")
+_TOWN = re.compile(r"^([가-힣]{2,}(?:읍|면))$")
+_VILLAGE = re.compile(r"^\(?([가-힣]{2,}\d*(?:동|리))\)?,?$")
+
+
+def parse_address(address: str) -> Dict[str, str]:
+    """
+    주소를 시 / 읍·면 / 동·리 단위로 분해
+
+    "제주특별자치도 제주시 구좌읍 번영로 2132-6 (송당리)" → {"city": "제주시", "town": "구좌읍", "village": "송당리"}
+
+    Args:
+        address: 주소 문자열
+
+    Returns:
+        찾은 단위만 담은 딕셔너리 (city / town / village)
+    """
+    levels = {}
+    for token in str(address or "").split():
+        if "city" not in levels:
+            match = _CITY.match(token)
+            if match and token != "제주특별자치시":
+                levels["city"] = match.group(1)
+            continue
+        if "town" not in levels and "village" not in levels and _TOWN.match(token):
+            levels["town"] = token
+            continue
+        match = _VILLAGE.match(token)
+        if match and "village" not in levels:
+            levels["village"] = match.group(1)
+    return levels
+
+
+def region_paths(levels: Dict[str, str]) -> List[str]:
+    """분해된 주소의 상위부터 하위까지 경로 (예: ["제주시", "제주시 구좌읍", "제주시 구좌읍 송당리"])"""
+    parts = [levels[key] for key in ("city", "town", "village") if key in levels]
+    return [" ".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def region_aliases(name: str) -> List[str]:
+    """지역 이름과 접미사를 뗀 별칭 (예: "화북1동" → ["화북1동", "화북"])"""
+    aliases = [name]
+    base = re.sub(r"\d*(?:시|읍|면|동|리)$", "", name)
+    if len(base) >= 2 and base != name:
+        aliases.append(base)
+    return [alias for alias in aliases if alias not in STOP_ALIASES]
+
+
+class RegionIndex:
+    def __init__(self, paths: Dict[str, List[str]], aliases: Dict[str, List[str]],
+                 min_ids: int = REGION_MIN_IDS):
+        """
+        지역 경로 → id 역색인과 질문 속 지역 별칭 사전
+
+        Args:
+            paths: {"제주시 구좌읍": [id, ...]}
+            aliases: {"구좌": ["제주시 구좌읍"]}
+            min_ids: 이보다 문서가 적은 동·리는 읍·면으로 넓히고, 그래도 적은 지역은 제한에 쓰지 않음
+        """
+        self.paths = paths
+        self.aliases = aliases
+        self.min_ids = min_ids
+
+    def match(self, query: str) -> List[str]:
+        """
+        질문에 언급된 지역 경로 찾기
+
+        같은 위치에서는 가장 긴 별칭만 인정하고("서귀포"가 "서귀"동으로 잡히지 않게),
+        문서가 적은 동·리는 소속 읍·면으로 넓히며, 그래도 적은 지역은 제외합니다.
+        더 구체적인 지역이 함께 나오면 상위 지역은 뺍니다.
+
+        Args:
+            query: 사용자 질문
+
+        Returns:
+            지역 경로 리스트
+        """
+        text = query.casefold()
+        taken = []
+        matched = []
+        for alias in sorted(self.aliases, key=len, reverse=True):
+            start = text.find(alias)
+            while start != -1:
+                end = start + len(alias)
+                if not any(start < span_end and span_start < end for span_start, span_end in taken):
+                    taken.append((start, end))
+                    matched.extend(self.aliases[alias])
+                start = text.find(alias, end)
+
+        paths = []
+        for path in matched:
+            # 시 / 읍·면 / 동·리 세 단계인 경로만 읍·면까지 넓힘
+            if len(self.paths.get(path, ())) < self.min_ids and path.count(" ") == 2:
+                path = path.rsplit(" ", 1)[0]
+            if len(self.paths.get(path, ())) >= self.min_ids and path not in paths:
+                paths.append(path)
+        return [path for path in paths if not any(other.startswith(f"{path} ") for other in paths)]
+
+    def ids_for(self, paths: List[str]) -> Optional[Set[str]]:
+        """지역 경로들의 id 합집합 (경로가 없으면 None)"""
+        if not paths:
+            return None
+        ids = set()
+        for path in paths:
+            ids.update(self.paths.get(path, ()))
+        return ids
+
+    def save(self, path: str):
+        """색인을 JSON으로 저장 (임시 파일에 쓴 뒤 교체)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"paths": self.paths, "aliases": self.aliases}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RegionIndex":
+        """저장된 색인 불러오기"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["paths"], data["aliases"])
+
+
+def build_region_index(store, db_path: str = CHROMA_DB_PATH) -> RegionIndex:
+    """
+    레코드 저장소의 주소로 지역 색인을 만들어 저장
+
+    Args:
+        store: RecordStore
+        db_path: 저장할 ChromaDB 디렉토리
+
+    Returns:
+        RegionIndex
+    """
+    paths: Dict[str, List[str]] = defaultdict(list)
+    names: Dict[str, Set[str]] = defaultdict(set)
+    for row_id, _, record in store.iter_all():
+        levels = parse_address(field_value(record, ADDRESS_FIELDS))
+        for path in region_paths(levels):
+            paths[path].append(row_id)
+            names[path.rsplit(" ", 1)[-1]].add(path)
+
+    aliases: Dict[str, Set[str]] = defaultdict(set)
+    for name, name_paths in names.items():
+        for alias in region_aliases(name):
+            aliases[alias].update(name_paths)
+    for alias, name in LANDMARK_ALIASES.items():
+        aliases[alias].update(names.get(name, ()))
+
+    index = RegionIndex(
+        dict(paths),
+        {alias: sorted(alias_paths) for alias, alias_paths in aliases.items() if alias_paths}
+    )
+    index.save(region_index_path(db_path))
+    return index
+
+
+def region_index_path(db_path: str = CHROMA_DB_PATH) -> str:
+    """ChromaDB 디렉토리 안의 지역 색인 파일 경로"""
+    return os.path.join(db_path, REGION_INDEX_FILENAME)
+
+
+def load_region_index(db_path: str = CHROMA_DB_PATH) -> Optional[RegionIndex]:
+    """저장된 지역 색인 불러오기 (없으면 None)"""
+    path = region_index_path(db_path)
+    if not os.path.exists(path):
+        return None
+    return RegionIndex.load(path)
@@ -0,0 +1,52 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from config import MMR_LAMBDA
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """행 단위 L2 정규화 (float32)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        return vectors / max(float(np.linalg.norm(vectors)), 1e-12)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def mmr(query_vector: Sequence[float], vectors, k: int, lambda_: float = MMR_LAMBDA,
+        relevance: Optional[Sequence[float]] = None) -> List[int]:
+    """
+    Maximal Marginal Relevance로 관련도와 다양성을 함께 고려해 k개 선택
+
+    후보 간 코사인 유사도 행렬을 행렬 곱 한 번으로 구하고, 단계마다
+    "이미 고른 항목과의 최대 유사도" 배열만 갱신합니다.
+
+    Args:
+        query_vector: 질문 임베딩
+        vectors: (후보 수, 차원) 후보 임베딩
+        k: 선택할 개수
+        lambda_: 1이면 관련도만, 0이면 다양성만 고려
+        relevance: 후보별 관련도 (None이면 질문과의 코사인 유사도, 하이브리드 검색은 정규화한 RRF 점수)
+
+    Returns:
+        선택된 후보 번호 리스트 (선택 순서)
+    """
+    candidates = normalize_rows(vectors)
+    if len(candidates) == 0 or k <= 0:
+        return []
+    if relevance is None:
+        relevance = candidates @ normalize_rows(query_vector)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(len(candidates), dtype=bool)
+    available[selected[0]] = False
+    for _ in range(min(k, len(candidates)) - 1):
+        scores = np.where(available, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
@@ -0,0 +1,174 @@
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_THRESHOLD, RESPONSE_CACHE_TTL_SECONDS
+)
+
+
+def prompt_version(system_prompt: str) -> str:
+    """시스템 프롬프트 내용 해시 (프롬프트를 수정하면 이전 답변은 재사용되지 않음)"""
+    return hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()[:16]
+
+
+def history_fingerprint(history: Sequence[Tuple[str, str]]) -> str:
+    """
+    프롬프트에 들어가는 이전 대화의 지문 (첫 턴이면 빈 문자열)
+
+    Args:
+        history: (사용자 메시지, 챗봇 답변) 튜플 리스트
+
+    Returns:
+        대화 내용 해시
+    """
+    if not history:
+        return ""
+    digest = hashlib.sha256()
+    for user_msg, bot_msg in history:
+        digest.update(user_msg.encode('utf-8'))
+        digest.update(b"\x00")
+        digest.update(bot_msg.encode('utf-8'))
+        digest.update(b"\x01")
+    return digest.hexdigest()[:16]
+
+
+class ResponseCache:
+    def __init__(self, threshold: float = RESPONSE_CACHE_THRESHOLD,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        """
+        질문 임베딩 유사도 기반 답변 캐시 (메모리, LRU + TTL, 스레드 안전)
+
+        (모델, 프롬프트 버전, 대화 지문)이 같은 항목 중 질문 임베딩의 코사인 유사도가
+        threshold 이상인 가장 가까운 답변을 돌려줍니다.
+
+        Args:
+            threshold: 캐시 적중으로 볼 최소 코사인 유사도
+            ttl_seconds: 답변 유효 시간 (초)
+            max_entries: 최대 항목 수 (초과 시 가장 오래 사용하지 않은 항목 삭제)
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now: float):
+        """TTL이 지난 항목 삭제 (락을 잡은 상태에서 호출)"""
+        expired = [key for key, entry in self._entries.items() if now - entry["created_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, model: str, version: str, fingerprint: str,
+            query_embedding: Sequence[float]) -> Optional[Dict]:
+        """
+        비슷한 질문에 대한 캐시된 답변 조회
+
+        Args:
+            model: Ollama 모델 이름
+            version: 프롬프트 버전
+            fingerprint: 대화 지문
+            query_embedding: 질문 임베딩
+
+        Returns:
+            {"answer", "query", "similarity"} 또는 None
+        """
+        query = self._normalize(query_embedding)
+        with self._lock:
+            self._expire(time.time())
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry["scope"] == (model, version, fingerprint)
+            ]
+            if candidates:
+                similarities = np.stack([entry["vector"] for _, entry in candidates]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return {
+                        "answer": entry["answer"],
+                        "query": entry["query"],
+                        "similarity": float(similarities[best])
+                    }
+            self.misses += 1
+            return None
+
+    def put(self, model: str, version: str, fingerprint: str,
+            query_embedding: Sequence[float], query: str, answer: str):
+        """
+        답변 저장
+
+        Args:
+            model: Ollama 모델 이름
+            version: 프롬프트 버전
+            fingerprint: 대화 지문
+            query_embedding: 질문 임베딩
+            query: 원래 질문
+            answer: 생성된 답변
+        """
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            self._entries[next(self._ids)] = {
+                "scope": (model, version, fingerprint),
+                "vector": self._normalize(query_embedding),
+                "query": query,
+                "answer": answer,
+                "created_at": now
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """캐시 비우기"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """항목 수와 적중률"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+_shared_cache: Optional[ResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    프로세스 전체에서 공유하는 답변 캐시 (RESPONSE_CACHE_ENABLED=false면 None)
+
+    Returns:
+        ResponseCache 또는 None
+    """
+    global _shared_cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
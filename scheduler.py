@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, Optional
+
+from config import OLLAMA_MAX_CONCURRENCY
+from metrics import LatencyStats
+
+# 대기 순번 알림 함수: 순번(1부터) → None
+PositionHook = Callable[[int], None]
+
+
+class Ticket:
+    def __init__(self, session_id: str, loop: asyncio.AbstractEventLoop, on_position: Optional[PositionHook]):
+        """스케줄러 대기표 (요청한 이벤트 루프의 Future로 차례를 알림)"""
+        self.session_id = session_id
+        self.loop = loop
+        self.future = loop.create_future()
+        self.on_position = on_position
+        self.position = 0
+        self.granted = False
+        self.enqueued = time.perf_counter()
+
+
+class InferenceScheduler:
+    def __init__(self, max_concurrency: int = OLLAMA_MAX_CONCURRENCY):
+        """
+        Ollama 호출 앞에 두는 프로세스 전체 스케줄러 (동시 실행 수 제한 + 세션별 공정 대기열)
+
+        동시에 max_concurrency개까지만 실행하고 나머지는 세션별 대기열에 넣은 뒤,
+        세션을 돌아가며 하나씩 꺼내므로(round-robin) 한 세션이 요청을 몰아 보내도
+        다른 세션이 그 뒤에 줄 서지 않습니다. 여러 이벤트 루프/스레드에서 함께 사용할 수 있습니다.
+
+        Args:
+            max_concurrency: 동시에 실행할 최대 요청 수
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.active = 0
+        self.completed = 0
+        self.max_depth = 0
+        self.wait_latency = LatencyStats()
+        # {세션: 대기표 큐} (앞쪽 세션부터 하나씩 꺼내고 꺼낸 세션은 맨 뒤로)
+        self._queues: "OrderedDict[str, Deque[Ticket]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, on_position: Optional[PositionHook] = None):
+        """
+        실행 차례를 기다렸다가 블록이 끝나면 반납하는 async with 컨텍스트
+
+            async with scheduler.slot(session_id):
+                stream = await client.chat(...)
+
+        Args:
+            session_id: 공정 대기열을 나눌 세션 ID
+            on_position: 대기 순번이 바뀔 때마다 호출할 함수 (요청한 이벤트 루프에서 호출)
+        """
+        ticket = await self.acquire(session_id, on_position)
+        try:
+            yield ticket
+        finally:
+            self.release()
+
+    async def acquire(self, session_id: str, on_position: Optional[PositionHook] = None) -> Ticket:
+        """
+        실행 차례 받기 (자리가 없으면 세션별 대기열에서 대기, 대기 중 취소되면 대기표 제거)
+
+        Args:
+            session_id: 세션 ID
+            on_position: 대기 순번 알림 함수
+
+        Returns:
+            차례를 받은 대기표 (끝나면 반드시 release 호출)
+        """
+        ticket = Ticket(session_id, asyncio.get_running_loop(), on_position)
+        with self._lock:
+            if self.active < self.max_concurrency and not self._queues:
+                self._grant(ticket)
+            else:
+                self._queues.setdefault(session_id, deque()).append(ticket)
+                self.max_depth = max(self.max_depth, self.depth())
+                self._notify_positions()
+        try:
+            await ticket.future
+        except BaseException:
+            with self._lock:
+                if ticket.granted:
+                    # 차례를 받은 직후 취소됨: 자리를 다음 요청에 넘김
+                    self.active -= 1
+                    self._dispatch()
+                else:
+                    queue = self._queues.get(session_id)
+                    if queue is not None and ticket in queue:
+                        queue.remove(ticket)
+                        if not queue:
+                            del self._queues[session_id]
+                    self._notify_positions()
+            raise
+        self.wait_latency.record(time.perf_counter() - ticket.enqueued)
+        return ticket
+
+    def release(self):
+        """실행 자리 반납 후 다음 세션의 요청에 차례 넘기기"""
+        with self._lock:
+            self.active -= 1
+            self.completed += 1
+            self._dispatch()
+
+    def depth(self) -> int:
+        """대기 중인 요청 수"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _grant(self, ticket: Ticket):
+        """대기표에 차례 주기 (lock을 잡은 상태에서 호출)"""
+        ticket.granted = True
+        self.active += 1
+        ticket.loop.call_soon_threadsafe(_resolve, ticket.future)
+
+    def _dispatch(self):
+        """빈 자리만큼 맨 앞 세션부터 하나씩 꺼내 실행 (lock을 잡은 상태에서 호출)"""
+        while self.active < self.max_concurrency and self._queues:
+            session_id, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            if queue:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+            self._grant(ticket)
+        self._notify_positions()
+
+    def _notify_positions(self):
+        """
+        대기 순번이 바뀐 대기표에 알림 (lock을 잡은 상태에서 호출)
+
+        세션을 돌아가며 꺼내므로 세션 s의 i번째(0부터) 대기표 앞에는
+        각 세션의 앞쪽 min(길이, i)개와, s보다 앞선 세션 중 i번째가 있는 세션의 i번째가 있습니다.
+        """
+        lengths = [len(queue) for queue in self._queues.values()]
+        for order, queue in enumerate(self._queues.values()):
+            for index, ticket in enumerate(queue):
+                ahead = sum(min(length, index) for length in lengths)
+                ahead += sum(1 for length in lengths[:order] if length > index)
+                position = ahead + 1
+                if ticket.on_position is not None and ticket.position != position:
+                    ticket.loop.call_soon_threadsafe(ticket.on_position, position)
+                ticket.position = position
+
+    def stats(self) -> Dict:
+        """동시 실행 수, 대기 중/최대 대기 요청 수, 대기 세션 수, 완료 수, 대기 시간 p50/p95/p99"""
+        with self._lock:
+            depth = self.depth()
+            sessions = len(self._queues)
+        wait = self.wait_latency.summary()
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "waiting": depth,
+            "waiting_sessions": sessions,
+            "max_waiting": self.max_depth,
+            "completed": self.completed,
+            "wait_p50_ms": wait["p50_ms"],
+            "wait_p95_ms": wait["p95_ms"],
+            "wait_p99_ms": wait["p99_ms"]
+        }
+
+
+def _resolve(future: asyncio.Future):
+    """취소되지 않은 Future만 완료 (요청한 이벤트 루프에서 실행)"""
+    if not future.done():
+        future.set_result(None)
+
+
+_scheduler: Optional[InferenceScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> InferenceScheduler:
+    """프로세스 전체에서 공유하는 추론 스케줄러 (모든 Streamlit 세션 공유)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InferenceScheduler()
+        return _scheduler
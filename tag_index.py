@@ -0,0 +1,169 @@
+import os
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from config import CHROMA_DB_PATH, TAG_INDEX_FILENAME, TAG_MAX_SHARE
+from documents import TAG_FIELDS, field_value, normalize_tags
+
+
+class TagIndex:
+    def __init__(self, doc_ids: Sequence[str], bitmaps: Dict[str, int], max_share: float = TAG_MAX_SHARE):
+        """
+        태그 → 문서 비트맵 역색인
+
+        문서 번호 i번째 비트가 켜진 파이썬 정수를 태그별 비트맵으로 사용하므로
+        여러 태그의 교집합/합집합이 정수 AND/OR 한 번으로 끝납니다.
+
+        Args:
+            doc_ids: 비트 번호 순서대로의 id
+            bitmaps: {정규화된 태그: 비트맵}
+            max_share: 질문에서 찾은 태그로 쓰지 않을 흔한 태그 기준 (전체 문서 대비 비율)
+        """
+        self.doc_ids = list(doc_ids)
+        self.bitmaps = bitmaps
+        self.max_share = max_share
+        self._nbytes = (len(self.doc_ids) + 7) // 8
+        self._counts = {tag: bin(bitmap).count("1") for tag, bitmap in bitmaps.items()}
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def bitmap(self, must: Optional[Sequence[str]] = None, nice: Optional[Sequence[str]] = None,
+               min_results: int = 1) -> Optional[int]:
+        """
+        필수 태그는 교집합, 선호 태그는 합집합으로 후보 비트맵 계산
+
+        선호 태그를 적용하면 min_results개보다 적어지는 경우에는 선호 태그를 무시합니다.
+
+        Args:
+            must: 모두 있어야 하는 태그
+            nice: 하나라도 있으면 좋은 태그
+            min_results: 선호 태그 적용 후 최소 후보 수
+
+        Returns:
+            후보 비트맵 (태그 조건이 없으면 None)
+        """
+        must = normalize_tags(",".join(must or []))
+        nice = normalize_tags(",".join(nice or []))
+        if not must and not nice:
+            return None
+
+        candidates = (1 << len(self.doc_ids)) - 1
+        for tag in must:
+            candidates &= self.bitmaps.get(tag, 0)
+
+        if nice:
+            preferred = 0
+            for tag in nice:
+                preferred |= self.bitmaps.get(tag, 0)
+            if bin(candidates & preferred).count("1") >= min_results:
+                candidates &= preferred
+            elif not must:
+                return None
+        return candidates
+
+    def ids(self, bitmap: int) -> Set[str]:
+        """비트맵의 켜진 비트에 해당하는 id 집합"""
+        bits = np.unpackbits(
+            np.frombuffer(bitmap.to_bytes(self._nbytes, "little"), dtype=np.uint8), bitorder="little"
+        )
+        return {self.doc_ids[i] for i in np.flatnonzero(bits[:len(self.doc_ids)])}
+
+    def filter(self, must: Optional[Sequence[str]] = None, nice: Optional[Sequence[str]] = None,
+               min_results: int = 1) -> Optional[Set[str]]:
+        """
+        태그 조건에 맞는 id 집합 (bitmap() 참고)
+
+        Returns:
+            id 집합 (태그 조건이 없으면 None)
+        """
+        bitmap = self.bitmap(must, nice, min_results)
+        return None if bitmap is None else self.ids(bitmap)
+
+    def match(self, query: str) -> List[str]:
+        """
+        질문 단어 중 색인에 있는 태그 찾기 (전체의 max_share 이상 문서에 붙은 흔한 태그는 제외)
+
+        Args:
+            query: 사용자 질문
+
+        Returns:
+            태그 리스트
+        """
+        limit = self.max_share * len(self.doc_ids)
+        tags = []
+        for word in re.findall(r"\w+", query.casefold()):
+            if 0 < self._counts.get(word, 0) <= limit and word not in tags:
+                tags.append(word)
+        return tags
+
+    def save(self, path: str):
+        """색인을 .npz 파일로 저장 (태그별 비트맵을 같은 길이의 바이트 행으로, 임시 파일에 쓴 뒤 교체)"""
+        tags = sorted(self.bitmaps)
+        rows = np.zeros((len(tags), self._nbytes), dtype=np.uint8)
+        for i, tag in enumerate(tags):
+            rows[i] = np.frombuffer(self.bitmaps[tag].to_bytes(self._nbytes, "little"), dtype=np.uint8)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            doc_ids=np.asarray(self.doc_ids, dtype=str),
+            tags=np.asarray(tags, dtype=str),
+            bitmaps=rows
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TagIndex":
+        """저장된 색인 불러오기"""
+        with np.load(path, allow_pickle=False) as data:
+            bitmaps = {
+                tag: int.from_bytes(row.tobytes(), "little")
+                for tag, row in zip(data["tags"].tolist(), data["bitmaps"])
+            }
+            return cls(data["doc_ids"].tolist(), bitmaps)
+
+
+def build_tag_index(store, db_path: str = CHROMA_DB_PATH) -> TagIndex:
+    """
+    레코드 저장소의 태그를 정규화해 태그 비트맵 색인을 만들어 저장
+
+    Args:
+        store: RecordStore
+        db_path: 저장할 ChromaDB 디렉토리
+
+    Returns:
+        TagIndex
+    """
+    doc_ids = []
+    bits: Dict[str, List[int]] = defaultdict(list)
+    for row_id, _, record in store.iter_all():
+        for tag in normalize_tags(field_value(record, TAG_FIELDS)):
+            bits[tag].append(len(doc_ids))
+        doc_ids.append(row_id)
+
+    nbytes = (len(doc_ids) + 7) // 8
+    bitmaps = {}
+    for tag, positions in bits.items():
+        packed = np.zeros(nbytes * 8, dtype=np.uint8)
+        packed[positions] = 1
+        bitmaps[tag] = int.from_bytes(np.packbits(packed, bitorder="little").tobytes(), "little")
+
+    index = TagIndex(doc_ids, bitmaps)
+    index.save(tag_index_path(db_path))
+    return index
+
+
+def tag_index_path(db_path: str = CHROMA_DB_PATH) -> str:
+    """ChromaDB 디렉토리 안의 태그 색인 파일 경로"""
+    return os.path.join(db_path, TAG_INDEX_FILENAME)
+
+
+def load_tag_index(db_path: str = CHROMA_DB_PATH) -> Optional[TagIndex]:
+    """저장된 태그 색인 불러오기 (없으면 None)"""
+    path = tag_index_path(db_path)
+    if not os.path.exists(path):
+        return None
+    return TagIndex.load(path)
@@ -0,0 +1,307 @@
+import json
+import os
+import threading
+from typing import Collection, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import CHROMA_DB_PATH, ROUTER_OVERSAMPLE, VECTOR_INDEX_DTYPE, VECTOR_INDEX_FILENAME
+
+# 검색 결과 한 건: (id, 메타데이터, 거리)
+Hit = Tuple[str, Dict, float]
+
+
+def _top_hits(scores: np.ndarray, k: int, ids: Sequence[str], metadatas: Sequence[Dict],
+              distances: np.ndarray) -> List[Hit]:
+    """점수 상위 k개를 (id, 메타데이터, 거리) 리스트로 (점수 내림차순)"""
+    k = min(k, int(np.isfinite(scores).sum()))
+    if k <= 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    ordered = top[np.argsort(-scores[top], kind="stable")]
+    return [(ids[i], metadatas[i], float(distances[i])) for i in ordered]
+
+
+def per_query_categories(categories, n_queries: int) -> List[Optional[Sequence[str]]]:
+    """
+    카테고리 인자를 질문별 리스트로 펼치기
+
+    Args:
+        categories: 모든 질문에 공통인 카테고리 리스트, 또는 질문별 카테고리 리스트(원소가 None이면 전체)
+        n_queries: 질문 수
+
+    Returns:
+        질문별 카테고리 리스트 (None이면 전체)
+    """
+    if categories and not isinstance(categories[0], str):
+        return [list(wanted) if wanted else None for wanted in categories]
+    return [list(categories) if categories else None] * n_queries
+
+
+def _category_where(categories: Sequence[str]) -> Dict:
+    """카테고리 목록에 해당하는 ChromaDB where 필터"""
+    return {"category": categories[0]} if len(categories) == 1 else {"category": {"$in": list(categories)}}
+
+
+def _collection_pages(collection, page_size: int = 1000) -> Iterator[Tuple[List[str], List[Dict], np.ndarray]]:
+    """ChromaDB 컬렉션을 page_size 행씩 (id, 메타데이터, 정규화된 float32 임베딩)으로 읽기"""
+    for offset in range(0, collection.count(), page_size):
+        page = collection.get(limit=page_size, offset=offset, include=["embeddings", "metadatas"])
+        vectors = np.asarray(page["embeddings"], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        yield page["ids"], page["metadatas"], vectors
+
+
+class ChromaBackend:
+    def __init__(self, collection):
+        """
+        ChromaDB 컬렉션 검색 백엔드
+
+        Args:
+            collection: ChromaDB 컬렉션
+        """
+        self.collection = collection
+        self._index: Optional["NumpyVectorIndex"] = None
+        self._lock = threading.Lock()
+
+    def _shared_index(self) -> "NumpyVectorIndex":
+        """
+        id 제한 검색용 인메모리 색인 (처음 필요할 때 컬렉션 전체를 한 번 읽어 만듦, 여러 스레드에서 호출 가능)
+
+        id 묶음마다 임베딩을 복사해 두지 않고 행렬 하나를 공유해 행 번호로 꺼내 쓰므로
+        지역/태그 조합이 늘어나도 메모리는 (문서 수 × 차원) 하나로 고정됩니다.
+        """
+        with self._lock:
+            if self._index is None:
+                ids, metadatas, blocks = [], [], []
+                for page_ids, page_metadatas, vectors in _collection_pages(self.collection):
+                    ids.extend(page_ids)
+                    metadatas.extend(page_metadatas)
+                    blocks.append(vectors)
+                matrix = np.concatenate(blocks) if blocks else np.zeros((0, 0), dtype=np.float32)
+                self._index = NumpyVectorIndex(matrix, ids, metadatas)
+            return self._index
+
+    def _query_subset(self, query_embeddings: List[List[float]], n_results: int,
+                      categories: List[Optional[Sequence[str]]], ids: Collection[str]) -> List[List[Hit]]:
+        """허용된 id의 행만 공유 행렬에서 꺼내 검색 (categories는 질문별)"""
+        if not ids:
+            return [[] for _ in query_embeddings]
+        return self._shared_index().query(query_embeddings, n_results, categories, ids)
+
+    def _query(self, query_embeddings: List[List[float]], n_results: int, where=None) -> List[List[Hit]]:
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where,
+            include=["metadatas", "distances"]
+        )
+        hits = []
+        for ids, metadatas, distances in zip(results['ids'], results['metadatas'], results['distances']):
+            hits.append(list(zip(ids, metadatas, distances)))
+        return hits
+
+    def query(self, query_embeddings: List[List[float]], n_results: int,
+              categories: Optional[Sequence[str]] = None,
+              ids: Optional[Collection[str]] = None) -> List[List[Hit]]:
+        """
+        질문 임베딩 여러 개를 한 번에 검색
+
+        ChromaDB의 where 필터는 조건에 맞는 id를 먼저 전부 읽어 오므로 카테고리가 크면 느립니다.
+        그래서 필터 없이 ROUTER_OVERSAMPLE배 후보를 가져와 질문별 카테고리로 거르고,
+        부족한 질문만 where 필터를 넣어 다시 검색합니다.
+        ids가 주어지면(지역 제한) 컬렉션 전체를 한 번 읽어 둔 공유 행렬에서 해당 행만 꺼내 직접 계산합니다.
+
+        Args:
+            query_embeddings: 질문 임베딩 리스트
+            n_results: 질문당 결과 개수
+            categories: 검색할 카테고리 (None이나 빈 리스트면 전체, 질문별로 다르면 질문별 리스트)
+            ids: 검색할 id 집합 (None이면 전체)
+
+        Returns:
+            질문별 (id, 메타데이터, 거리) 리스트
+        """
+        categories = per_query_categories(categories, len(query_embeddings))
+        if ids is not None:
+            return self._query_subset(query_embeddings, n_results, categories, ids)
+        if not any(categories):
+            return self._query(query_embeddings, n_results)
+
+        hits = [
+            [hit for hit in candidates if not wanted or hit[1].get('category') in wanted][:n_results]
+            for wanted, candidates in zip(categories, self._query(query_embeddings, n_results * ROUTER_OVERSAMPLE))
+        ]
+        for i, row in enumerate(hits):
+            if categories[i] and len(row) < n_results:
+                hits[i] = self._query([query_embeddings[i]], n_results, _category_where(categories[i]))[0]
+        return hits
+
+    def embeddings(self, ids: Sequence[str]) -> np.ndarray:
+        """
+        id 순서대로의 정규화된 임베딩 (재순위용, 없는 id는 0 벡터)
+
+        Args:
+            ids: id 리스트
+
+        Returns:
+            (id 수, 차원) float32 행렬
+        """
+        if not ids:
+            return np.zeros((0, 0), dtype=np.float32)
+        rows = self.collection.get(ids=list(ids), include=["embeddings"])
+        by_id = dict(zip(rows["ids"], rows["embeddings"]))
+        dim = len(rows["embeddings"][0]) if rows["embeddings"] else 0
+        vectors = np.asarray([by_id.get(row_id, [0.0] * dim) for row_id in ids], dtype=np.float32)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class NumpyVectorIndex:
+    def __init__(self, vectors: np.ndarray, ids: Sequence[str], metadatas: Sequence[Dict]):
+        """
+        정규화된 임베딩 행렬 하나로 검색하는 인메모리 백엔드
+
+        행렬은 .npy 파일을 메모리 맵으로 열어 필요한 페이지만 읽고,
+        top-k는 행렬 곱 한 번과 argpartition으로 구합니다.
+
+        Args:
+            vectors: (문서 수, 차원) 정규화된 임베딩 행렬 (float32 또는 float16)
+            ids: 행 순서대로의 id
+            metadatas: 행 순서대로의 메타데이터
+        """
+        self.vectors = vectors
+        self.ids = list(ids)
+        self.metadatas = list(metadatas)
+        self.categories = np.asarray([metadata.get('category', '') for metadata in self.metadatas])
+        self._category_masks: Dict[str, np.ndarray] = {
+            category: self.categories == category for category in np.unique(self.categories)
+        }
+        self._rows = {row_id: i for i, row_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _similarities(self, queries: np.ndarray, chunk_rows: int = 8192) -> np.ndarray:
+        """(질문 수, 문서 수) 코사인 유사도 (float16이면 구간별로 float32로 바꿔 계산)"""
+        if self.vectors.dtype == np.float32:
+            return queries @ self.vectors.T
+        scores = np.empty((len(queries), len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), chunk_rows):
+            block = np.asarray(self.vectors[start:start + chunk_rows], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    def mask(self, categories: Optional[Sequence[str]] = None) -> Optional[np.ndarray]:
+        """카테고리에 해당하는 행의 불리언 마스크 (None이면 전체)"""
+        if not categories:
+            return None
+        mask = np.zeros(len(self.ids), dtype=bool)
+        for category in categories:
+            if category in self._category_masks:
+                mask |= self._category_masks[category]
+        return mask
+
+    def rows_for(self, ids: Collection[str]) -> np.ndarray:
+        """id 집합에 해당하는 행 번호 (정렬됨)"""
+        return np.asarray(sorted(self._rows[row_id] for row_id in ids if row_id in self._rows), dtype=np.int64)
+
+    def embeddings(self, ids: Sequence[str]) -> np.ndarray:
+        """id 순서대로의 정규화된 임베딩 (재순위용, 없는 id는 0 벡터)"""
+        vectors = np.zeros((len(ids), self.vectors.shape[1] if self.ids else 0), dtype=np.float32)
+        found = [(i, self._rows[row_id]) for i, row_id in enumerate(ids) if row_id in self._rows]
+        if found:
+            positions, rows = zip(*found)
+            vectors[list(positions)] = self.vectors[list(rows)]
+        return vectors
+
+    def query(self, query_embeddings: List[List[float]], n_results: int,
+              categories: Optional[Sequence[str]] = None,
+              ids: Optional[Collection[str]] = None) -> List[List[Hit]]:
+        """
+        질문 임베딩 여러 개를 한 번에 검색 (ChromaDB와 같은 제곱 L2 거리 = 2 - 2·cos)
+
+        ids가 주어지면(지역 제한) 해당 행만 꺼내 행렬 곱을 계산합니다.
+
+        Args:
+            query_embeddings: 질문 임베딩 리스트
+            n_results: 질문당 결과 개수
+            categories: 검색할 카테고리 (None이나 빈 리스트면 전체, 질문별로 다르면 질문별 리스트)
+            ids: 검색할 id 집합 (None이면 전체)
+
+        Returns:
+            질문별 (id, 메타데이터, 거리) 리스트
+        """
+        if not self.ids or not query_embeddings:
+            return [[] for _ in query_embeddings]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        rows = None
+        if ids is not None:
+            rows = self.rows_for(ids)
+            scores = queries @ np.asarray(self.vectors[rows], dtype=np.float32).T
+            row_ids = [self.ids[i] for i in rows]
+            row_metadatas = [self.metadatas[i] for i in rows]
+        else:
+            scores = self._similarities(queries)
+            row_ids, row_metadatas = self.ids, self.metadatas
+        for i, wanted in enumerate(per_query_categories(categories, len(queries))):
+            mask = self.mask(wanted)
+            if mask is not None:
+                scores[i, ~(mask if rows is None else mask[rows])] = -np.inf
+        return [_top_hits(row, n_results, row_ids, row_metadatas, 2 - 2 * row) for row in scores]
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyVectorIndex":
+        """저장된 색인을 메모리 맵으로 열기"""
+        with open(f"{path}.json", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(np.load(path, mmap_mode='r'), meta["ids"], meta["metadatas"])
+
+
+def vector_index_path(db_path: str = CHROMA_DB_PATH) -> str:
+    """ChromaDB 디렉토리 안의 벡터 색인 파일 경로 (메타데이터는 같은 이름 + .json)"""
+    return os.path.join(db_path, VECTOR_INDEX_FILENAME)
+
+
+def build_vector_index(collection, db_path: str = CHROMA_DB_PATH, dtype: str = VECTOR_INDEX_DTYPE,
+                       page_size: int = 1000) -> NumpyVectorIndex:
+    """
+    ChromaDB 컬렉션의 임베딩을 정규화해 메모리 맵 행렬로 내보내기
+
+    Args:
+        collection: ChromaDB 컬렉션
+        db_path: 저장할 ChromaDB 디렉토리
+        dtype: 저장 자료형 (float32 또는 float16)
+        page_size: 한 번에 읽을 행 수
+
+    Returns:
+        NumpyVectorIndex
+    """
+    path = vector_index_path(db_path)
+    tmp_path = f"{path}.tmp.npy"
+    total = collection.count()
+    ids, metadatas, matrix = [], [], None
+    for page_ids, page_metadatas, vectors in _collection_pages(collection, page_size):
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(total, vectors.shape[1]))
+        matrix[len(ids):len(ids) + len(vectors)] = vectors
+        ids.extend(page_ids)
+        metadatas.extend(page_metadatas)
+    if matrix is None:
+        matrix = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(0, 0))
+    matrix.flush()
+    del matrix
+
+    with open(f"{path}.json.tmp", 'w', encoding='utf-8') as f:
+        json.dump({"ids": ids, "metadatas": metadatas}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    os.replace(f"{path}.json.tmp", f"{path}.json")
+    return NumpyVectorIndex.load(path)
+
+
+def load_vector_index(db_path: str = CHROMA_DB_PATH) -> Optional[NumpyVectorIndex]:
+    """저장된 벡터 색인 불러오기 (없으면 None)"""
+    path = vector_index_path(db_path)
+    if not os.path.exists(path) or not os.path.exists(f"{path}.json"):
+        return None
+    return NumpyVectorIndex.load(path)